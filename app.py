@@ -1,494 +1,631 @@
-<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>植感生活 Diary - Mobile UI Concept</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+TC:wght@400;500;700&display=swap');
-        body { font-family: 'Noto Sans TC', sans-serif; background-color: #f0f2f5; display: flex; justify-content: center; align-items: center; min-height: 100vh; margin: 0; }
-
-        /* 手機外框模擬 */
-        .phone-frame {
-            width: 375px;
-            height: 812px;
-            background-color: #ffffff;
-            border-radius: 40px;
-            box-shadow: 0 20px 50px rgba(0,0,0,0.2);
-            border: 12px solid #1a1a1a;
-            position: relative;
-            overflow: hidden;
-            display: flex;
-            flex-direction: column;
+"""植感生活 Diary — Streamlit 入口。"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from diary import trace
+from diary.backfill import Backfill
+from diary.foods import CONFIDENT_SCORE, FoodIndex
+from diary.images import ImageCache, prepare_upload
+from diary.goals import ACTIVITY, GOALS, SEXES, GoalEngine, Goals, Profile
+from diary.local import LocalDatabase, LocalDiaryStore, LocalProfileStore, LocalReportStore, LocalWeightStore, SheetSync
+from diary.models import MEALS, Entry
+from diary.recipes import FILTERS, RecipeCatalog, RecipeRecommender
+from diary.recognition import FoodRecognizer, GeminiModel, StubModel, split_text
+from diary.reports import WeeklyReportJob
+from diary.rollups import MealRollups
+from diary.session import SessionState, UserVersions
+from diary.streaks import StreakTracker
+from diary.storage import (
+    ENTRIES_WORKSHEET,
+    WEIGHTS_WORKSHEET,
+    GSheetsBackend,
+    InMemoryBackend,
+    SheetBackend,
+    entries_to_frame,
+    weigh_ins_to_frame,
+)
+from diary.summary import DailySummary, SummaryEngine
+from diary.tabs import LazyTabs
+from diary.transfer import detect_format, export_bytes, import_entries, import_weigh_ins
+from diary.views import (
+    TABS,
+    home_context,
+    log_context,
+    meal_chart_context,
+    recipe_context,
+    render_page,
+    render_screen,
+    stats_context,
+    streak_context,
+)
+from diary.weights import WeighIn, WeightSeries
+from diary.writer import BackgroundWrites, EntryStatus, MealLogger, WriteBehindQueue
+
+# cProfile 取樣比例 (0-1)；除錯面板也可以手動要求下一次 rerun 取樣
+PROFILE_SAMPLE_RATE = float(os.environ.get("DIARY_PROFILE_SAMPLE", "0"))
+# 超過此毫秒數的 rerun 以 WARNING 記錄並列入「慢 rerun」
+SLOW_RERUN_MS = float(os.environ.get("DIARY_SLOW_RERUN_MS", trace.SLOW_RERUN_MS))
+
+# 沒有登入時的示範使用者
+DEMO_USER_ID = "demo"
+DEMO_NAME = "小明"
+
+# 本機沒有 Sheets 憑證時使用的示範資料
+SAMPLE_ENTRIES = [
+    Entry("sample-1", DEMO_USER_ID, date.today(), "breakfast", "無糖豆漿", 135, 11),
+    Entry("sample-2", DEMO_USER_ID, date.today(), "breakfast", "地瓜 (中)", 315, 4),
+    Entry("sample-3", DEMO_USER_ID, date.today(), "lunch", "素食便當 (一般)", 700, 25),
+    Entry("sample-4", DEMO_USER_ID, date.today(), "exercise", "快走 60 分鐘", 350),
+]
+SAMPLE_WEIGH_INS = [
+    WeighIn(DEMO_USER_ID, date.today() - timedelta(days=ago), weight, 24.5 if ago == 0 else None)
+    for ago, weight in [(23, 60.0), (16, 59.5), (9, 59.2), (2, 58.8), (0, 58.5)]
+]
+
+
+def has_gsheets_secrets() -> bool:
+    try:
+        return "gsheets" in st.secrets.get("connections", {})
+    except Exception:
+        return False
+
+
+def gemini_api_key() -> str | None:
+    try:
+        return st.secrets.get("GEMINI_API_KEY")
+    except Exception:
+        return None
+
+
+def debug_token() -> str | None:
+    """除錯面板的通行碼；沒有設定 DIARY_DEBUG_TOKEN 時整個面板關閉。"""
+    token = os.environ.get("DIARY_DEBUG_TOKEN")
+    if token:
+        return token
+    try:
+        return st.secrets.get("DIARY_DEBUG_TOKEN")
+    except Exception:
+        return None
+
+
+def debug_enabled() -> bool:
+    """網址的 ?debug= 要等於 DIARY_DEBUG_TOKEN 才開啟 (面板含所有 session 的 trace)。"""
+    token, given = debug_token(), st.query_params.get("debug")
+    return bool(token and given) and hmac.compare_digest(given.encode(), token.encode())
+
+
+def current_user() -> tuple[str, str]:
+    """(user_id, 顯示名稱)；有設定 st.login 時用登入帳號，否則是示範使用者。"""
+    try:
+        if st.user.is_logged_in:
+            return st.user.email, st.user.get("name") or st.user.email
+    except Exception:
+        pass
+    return DEMO_USER_ID, DEMO_NAME
+
+
+# ---- 程序層：所有 session 共用，各自有容量上限 ----
+
+
+@st.cache_resource
+def setup_trace_log() -> None:
+    """有設定 DIARY_TRACE_LOG 時，每次 rerun 的追蹤以 JSON 一行一筆寫進該檔案。"""
+    path = os.environ.get("DIARY_TRACE_LOG")
+    if not path:
+        return
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    trace.log.addHandler(handler)
+    trace.log.setLevel(logging.INFO)
+
+
+@st.cache_resource
+def get_backend() -> SheetBackend:
+    if has_gsheets_secrets():
+        from streamlit_gsheets import GSheetsConnection
+
+        return GSheetsBackend(st.connection("gsheets", type=GSheetsConnection))
+    return InMemoryBackend(
+        {
+            ENTRIES_WORKSHEET: entries_to_frame(SAMPLE_ENTRIES),
+            WEIGHTS_WORKSHEET: weigh_ins_to_frame(SAMPLE_WEIGH_INS),
         }
+    )
 
-        /* 瀏海 */
-        .notch {
-            position: absolute;
-            top: 0;
-            left: 50%;
-            transform: translateX(-50%);
-            width: 150px;
-            height: 30px;
-            background-color: #1a1a1a;
-            border-bottom-left-radius: 20px;
-            border-bottom-right-radius: 20px;
-            z-index: 50;
-        }
 
-        /* 內容區域 */
-        .app-content {
-            flex: 1;
-            overflow-y: auto;
-            padding-bottom: 80px; /* 避開底部導航 */
-            -ms-overflow-style: none;
-            scrollbar-width: none;
-        }
-        .app-content::-webkit-scrollbar { display: none; }
-
-        /* 底部導航列 */
-        .bottom-nav {
-            position: absolute;
-            bottom: 0;
-            width: 100%;
-            height: 80px;
-            background: white;
-            border-top: 1px solid #eee;
-            display: flex;
-            justify-content: space-around;
-            align-items: center;
-            padding-bottom: 20px; /* 適應 iPhone 底部橫條 */
-            z-index: 40;
-        }
+@st.cache_resource
+def get_database() -> LocalDatabase:
+    return LocalDatabase()
 
-        .nav-item {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            color: #9ca3af;
-            font-size: 12px;
-            cursor: pointer;
-            transition: 0.3s;
-        }
 
-        .nav-item.active {
-            color: #2E7D32;
-            font-weight: bold;
-        }
+@st.cache_resource
+def get_store() -> LocalDiaryStore:
+    return LocalDiaryStore(get_database())
 
-        .nav-item i { font-size: 24px; margin-bottom: 4px; }
-
-        /* FAB (新增按鈕) */
-        .fab {
-            position: absolute;
-            bottom: 90px;
-            right: 20px;
-            width: 56px;
-            height: 56px;
-            background: #2E7D32;
-            color: white;
-            border-radius: 50%;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            font-size: 24px;
-            box-shadow: 0 4px 10px rgba(46, 125, 50, 0.4);
-            cursor: pointer;
-            transition: 0.2s;
-            z-index: 30;
-        }
-        .fab:active { transform: scale(0.95); }
-
-        /* 卡片樣式 */
-        .card {
-            background: white;
-            border-radius: 20px;
-            padding: 20px;
-            margin: 16px;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.03);
-        }
 
-        /* 進度環 */
-        .progress-ring { transform: rotate(-90deg); transform-origin: 50% 50%; }
-        .progress-ring__circle {
-            stroke-dasharray: 326;
-            stroke-dashoffset: 326; /* Full is 0 */
-            transition: stroke-dashoffset 0.35s;
-            transform: rotate(-90deg);
-            transform-origin: 50% 50%;
-        }
+@st.cache_resource
+def get_weight_store() -> LocalWeightStore:
+    return LocalWeightStore(get_database())
 
-        /* 畫面切換 */
-        .screen { display: none; animation: fadeIn 0.3s; }
-        .screen.active { display: block; }
 
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
+@st.cache_resource
+def get_profile_store() -> LocalProfileStore:
+    return LocalProfileStore(get_database())
+
+
+@st.cache_resource
+def get_sync() -> SheetSync:
+    versions = get_user_versions()
+    recommender = get_recommender()
+
+    def pulled(user_ids: set[str]) -> None:
+        # 工作表上有別處寫入的變更：讓這些使用者的 session 重新載入
+        for user_id in user_ids:
+            versions.bump(user_id, "sync")
+            recommender.invalidate_user(user_id)
+
+    sync = SheetSync(get_database(), get_backend(), on_change=pulled)
+    if get_database().query("SELECT 1 FROM entries LIMIT 1"):
+        # 本機已有資料 (程序重啟)：先用本機資料畫第一個畫面，背景執行緒馬上同步
+        return sync.start()
+    try:
+        # 全新的容器：先同步一次，第一個畫面就有資料；失敗就先用本機的資料
+        sync.sync()
+    except Exception as exc:
+        sync.last_error = str(exc)
+    return sync.start()
+
+
+@st.cache_resource
+def get_user_versions() -> UserVersions:
+    return UserVersions()
+
+
+@st.cache_resource
+def get_writer() -> WriteBehindQueue:
+    versions = get_user_versions()
+    recommender = get_recommender()
+
+    def written(entry: Entry, origin: str) -> None:
+        versions.bump(entry.user_id, origin)
+        recommender.invalidate_user(entry.user_id)
+
+    return WriteBehindQueue(get_store(), on_write=written)
+
+
+@st.cache_resource
+def get_recognizer() -> FoodRecognizer:
+    api_key = gemini_api_key()
+    return FoodRecognizer(GeminiModel(api_key) if api_key else StubModel())
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="recognize")
+
+
+@st.cache_resource
+def get_weight_writes() -> BackgroundWrites:
+    return BackgroundWrites(get_executor())
+
+
+@st.cache_resource
+def get_backfill() -> Backfill:
+    return Backfill(get_recognizer(), get_store())
+
+
+@st.cache_resource
+def get_report_store() -> LocalReportStore:
+    return LocalReportStore(get_database())
+
+
+@st.cache_resource
+def get_report_job() -> WeeklyReportJob:
+    # 每小時檢查一次上週的週報是否已產生
+    return WeeklyReportJob(get_database()).start()
+
+
+@st.cache_resource
+def get_food_index() -> FoodIndex:
+    return FoodIndex.from_csv()
+
+
+@st.cache_resource
+def get_recommender() -> RecipeRecommender:
+    return RecipeRecommender(RecipeCatalog.from_csv())
+
+
+@st.cache_resource
+def get_image_cache() -> ImageCache:
+    return ImageCache()
+
+
+# ---- session 層：只放目前使用者的資料 ----
+
+
+def get_session() -> SessionState:
+    user_id, display_name = current_user()
+    session = st.session_state.get("diary_session")
+    if session is None or session.user_id != user_id:
+        # 換了使用者就整個丟掉，不在同一個 session 裡累積多人的資料
+        session = st.session_state.diary_session = SessionState(user_id, display_name, get_user_versions())
+    return session
+
+
+def get_engine() -> SummaryEngine:
+    # 每個 session 只從儲存層載入一次，之後由新增/刪除紀錄增量更新
+    session = get_session()
+    return session.get("summary_engine", lambda: SummaryEngine(get_store().user_entries(session.user_id)))
+
+
+def new_rollups() -> MealRollups:
+    rollups = MealRollups()
+    get_engine().subscribe(rollups.apply, init=rollups.rebuild)
+    return rollups
+
+
+def get_rollups() -> MealRollups:
+    return get_session().get("meal_rollups", new_rollups)
+
+
+def get_weights() -> WeightSeries:
+    session = get_session()
+    return session.get("weight_series", lambda: WeightSeries(get_weight_store().user_weigh_ins(session.user_id)))
+
+
+def save_weigh_in(weigh_in: WeighIn, origin: str) -> None:
+    store = get_weight_store()
+    store.add([weigh_in])
+    store.flush()
+    get_user_versions().bump(weigh_in.user_id, origin)
+
+
+def get_profile() -> Profile | None:
+    session = get_session()
+    return session.get("profile", lambda: get_profile_store().get(session.user_id))
+
+
+def current_goals() -> Goals:
+    """熱量與蛋白質目標；只有新體重或修改個人資料時才重算。"""
+    session = get_session()
+    engine = session.get("goal_engine", lambda: GoalEngine(get_store().logged_intake))
+    return engine.goals(session.user_id, get_profile(), get_weights())
+
+
+def day_summary(day: date) -> DailySummary:
+    goals = current_goals()
+    return get_engine().summary(get_session().user_id, day, goals.target_kcal, goals.protein_goal)
 
-        .tag-pill {
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 12px;
-            font-weight: 500;
-        }
-        .tag-vegan { background: #E8F5E9; color: #2E7D32; }
-    </style>
-</head>
-<body>
-
-    <div class="phone-frame">
-        <div class="notch"></div>
-
-        <!-- 狀態列模擬 -->
-        <div class="flex justify-between px-6 pt-3 pb-2 text-xs font-bold text-gray-800 z-10 bg-white">
-            <span>09:41</span>
-            <div class="flex gap-1">
-                <i class="fas fa-signal"></i>
-                <i class="fas fa-wifi"></i>
-                <i class="fas fa-battery-full"></i>
-            </div>
-        </div>
-
-        <!-- ================= 畫面 1: 首頁 (Dashboard) ================= -->
-        <div id="home-screen" class="app-content screen active">
-            <!-- Header -->
-            <div class="px-6 pt-4 pb-2 flex justify-between items-center">
-                <div>
-                    <p class="text-gray-500 text-sm">早安, 小明 👋</p>
-                    <h1 class="text-2xl font-bold text-gray-800">今日概況</h1>
-                </div>
-                <div class="w-10 h-10 rounded-full bg-green-100 flex items-center justify-center text-green-700">
-                    <i class="fas fa-user"></i>
-                </div>
-            </div>
-
-            <!-- 熱量大圈圈 (核心視覺) -->
-            <div class="card flex flex-col items-center relative">
-                <h3 class="text-gray-500 text-sm mb-2 w-full text-left">剩餘熱量</h3>
-
-                <!-- 模擬 SVG 環形進度條 -->
-                <div class="relative w-48 h-48 flex items-center justify-center">
-                    <svg class="w-full h-full" viewBox="0 0 120 120">
-                        <circle cx="60" cy="60" r="52" fill="none" stroke="#eee" stroke-width="8" />
-                        <!-- 這是綠色的進度條 (模擬剩餘) -->
-                        <circle cx="60" cy="60" r="52" fill="none" stroke="#2E7D32" stroke-width="8"
-                                stroke-dasharray="326" stroke-dashoffset="100" stroke-linecap="round"
-                                style="transform: rotate(-90deg); transform-origin: 50% 50%;"/>
-                    </svg>
-                    <div class="absolute text-center">
-                        <!-- 如果超標，這裡文字變紅 -->
-                        <span class="text-4xl font-bold text-gray-800 block">885</span>
-                        <span class="text-xs text-gray-400">Kcal Left</span>
-                    </div>
-                </div>
-
-                <div class="flex justify-between w-full mt-6 px-4">
-                    <div class="text-center">
-                        <p class="text-xs text-gray-400">目標</p>
-                        <p class="font-bold text-gray-800">2114</p>
-                    </div>
-                    <div class="text-center">
-                        <p class="text-xs text-gray-400">已攝取</p>
-                        <p class="font-bold text-green-600">1229</p>
-                    </div>
-                    <div class="text-center">
-                        <p class="text-xs text-gray-400">燃燒</p>
-                        <p class="font-bold text-orange-500">350</p>
-                    </div>
-                </div>
-            </div>
-
-            <!-- 蛋白質進度 -->
-            <div class="px-6 mb-2">
-                <div class="flex justify-between text-sm mb-1">
-                    <span class="font-bold text-gray-700">蛋白質</span>
-                    <span class="text-green-600 font-bold">100g / 138g</span>
-                </div>
-                <div class="w-full bg-gray-200 rounded-full h-2.5">
-                    <div class="bg-green-600 h-2.5 rounded-full" style="width: 72%"></div>
-                </div>
-                <p class="text-xs text-right text-gray-400 mt-1">加油！還差 38g</p>
-            </div>
-
-            <!-- 餐別甜甜圈 (取代折線圖) -->
-            <div class="card">
-                <div class="flex justify-between items-center mb-4">
-                    <h3 class="font-bold text-gray-800">熱量來源</h3>
-                    <i class="fas fa-ellipsis-h text-gray-400"></i>
-                </div>
-                <div class="flex items-center gap-4">
-                    <div class="w-1/2">
-                        <canvas id="mealDoughnutChart"></canvas>
-                    </div>
-                    <div class="w-1/2 space-y-3">
-                        <div class="flex items-center justify-between text-xs">
-                            <div class="flex items-center gap-2"><div class="w-2 h-2 rounded-full bg-green-500"></div>早餐</div>
-                            <span class="font-bold">35%</span>
-                        </div>
-                        <div class="flex items-center justify-between text-xs">
-                            <div class="flex items-center gap-2"><div class="w-2 h-2 rounded-full bg-green-300"></div>午餐</div>
-                            <span class="font-bold">45%</span>
-                        </div>
-                        <div class="flex items-center justify-between text-xs">
-                            <div class="flex items-center gap-2"><div class="w-2 h-2 rounded-full bg-green-100"></div>晚餐</div>
-                            <span class="font-bold">20%</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-
-            <div class="h-12"></div> <!-- Spacer -->
-        </div>
-
-        <!-- ================= 畫面 2: 飲食紀錄 (Log) ================= -->
-        <div id="log-screen" class="app-content screen">
-            <div class="px-6 pt-4 pb-4 bg-white sticky top-0 z-20 shadow-sm">
-                <h1 class="text-xl font-bold text-gray-800">飲食日記</h1>
-                <!-- 日期選擇器 -->
-                <div class="flex justify-between items-center mt-4 bg-gray-50 p-2 rounded-xl">
-                    <i class="fas fa-chevron-left text-gray-400 p-2"></i>
-                    <span class="font-bold text-gray-700">今天, 11月 24日</span>
-                    <i class="fas fa-chevron-right text-gray-400 p-2"></i>
-                </div>
-            </div>
-
-            <div class="p-4 space-y-4">
-                <!-- 早餐區塊 -->
-                <div class="bg-white rounded-2xl p-4 shadow-sm">
-                    <div class="flex justify-between items-center mb-3">
-                        <div class="flex items-center gap-2">
-                            <div class="bg-yellow-100 p-2 rounded-lg text-yellow-600"><i class="fas fa-sun"></i></div>
-                            <span class="font-bold text-gray-800">早餐</span>
-                        </div>
-                        <span class="text-sm text-gray-500">450 kcal</span>
-                    </div>
-                    <div class="border-l-2 border-gray-100 pl-3 space-y-3">
-                        <div class="flex justify-between text-sm">
-                            <span>無糖豆漿</span>
-                            <span class="text-gray-500">135 kcal</span>
-                        </div>
-                        <div class="flex justify-between text-sm">
-                            <span>地瓜 (中)</span>
-                            <span class="text-gray-500">315 kcal</span>
-                        </div>
-                    </div>
-                    <button class="w-full mt-3 py-2 text-green-600 text-sm font-bold border border-green-200 rounded-xl hover:bg-green-50">+ 新增早餐</button>
-                </div>
-
-                <!-- 午餐區塊 -->
-                <div class="bg-white rounded-2xl p-4 shadow-sm">
-                    <div class="flex justify-between items-center mb-3">
-                        <div class="flex items-center gap-2">
-                            <div class="bg-orange-100 p-2 rounded-lg text-orange-600"><i class="fas fa-utensils"></i></div>
-                            <span class="font-bold text-gray-800">午餐</span>
-                        </div>
-                        <span class="text-sm text-gray-500">700 kcal</span>
-                    </div>
-                    <div class="border-l-2 border-gray-100 pl-3 space-y-3">
-                        <div class="flex justify-between text-sm">
-                            <span>素食便當 (一般)</span>
-                            <span class="text-gray-500">700 kcal</span>
-                        </div>
-                    </div>
-                    <button class="w-full mt-3 py-2 text-green-600 text-sm font-bold border border-green-200 rounded-xl hover:bg-green-50">+ 新增午餐</button>
-                </div>
-            </div>
-        </div>
-
-        <!-- ================= 畫面 3: 體態 (Stats) ================= -->
-        <div id="stats-screen" class="app-content screen">
-            <div class="px-6 pt-4 pb-2">
-                <h1 class="text-xl font-bold text-gray-800">體態追蹤</h1>
-            </div>
-
-            <!-- 體重卡片 -->
-            <div class="card bg-green-600 text-white">
-                <p class="text-green-100 text-sm">目前體重</p>
-                <div class="flex items-end gap-2 mt-1">
-                    <h2 class="text-4xl font-bold">58.5</h2>
-                    <span class="text-lg mb-1">kg</span>
-                </div>
-                <div class="mt-4 flex gap-2">
-                    <span class="bg-white/20 px-3 py-1 rounded-full text-xs">體脂 24.5%</span>
-                    <span class="bg-white/20 px-3 py-1 rounded-full text-xs">↓ 1.5kg (本月)</span>
-                </div>
-            </div>
-
-            <!-- 體重圖表 -->
-            <div class="card">
-                <div class="flex justify-between items-center mb-4">
-                    <h3 class="font-bold text-gray-800">變化趨勢</h3>
-                    <div class="flex gap-2 text-xs">
-                        <span class="px-2 py-1 bg-gray-100 rounded-md text-gray-500">週</span>
-                        <span class="px-2 py-1 bg-green-100 rounded-md text-green-700 font-bold">月</span>
-                    </div>
-                </div>
-                <canvas id="weightChart" height="200"></canvas>
-            </div>
-
-            <!-- 輸入按鈕 -->
-            <div class="px-4">
-                <button class="w-full bg-gray-800 text-white py-4 rounded-2xl font-bold shadow-lg hover:bg-gray-900 transition">
-                    <i class="fas fa-weight mr-2"></i> 紀錄今日體重
-                </button>
-            </div>
-        </div>
-
-        <!-- ================= 畫面 4: 靈感 (Recipes) ================= -->
-        <div id="recipe-screen" class="app-content screen">
-            <div class="px-6 pt-4 pb-2">
-                <h1 class="text-xl font-bold text-gray-800">靈感廚房</h1>
-                <div class="flex gap-3 mt-4 overflow-x-auto pb-2 no-scrollbar">
-                    <span class="bg-green-600 text-white px-4 py-2 rounded-full text-sm font-bold whitespace-nowrap">全素推薦</span>
-                    <span class="bg-white border border-gray-200 text-gray-600 px-4 py-2 rounded-full text-sm whitespace-nowrap">蛋奶素</span>
-                    <span class="bg-white border border-gray-200 text-gray-600 px-4 py-2 rounded-full text-sm whitespace-nowrap">低卡輕食</span>
-                </div>
-            </div>
-
-            <div class="p-4 grid grid-cols-2 gap-4">
-                <!-- 食譜卡片 1 -->
-                <div class="bg-white rounded-2xl overflow-hidden shadow-sm">
-                    <div class="h-32 bg-gray-200 relative">
-                        <img src="https://images.unsplash.com/photo-1512621776951-a57141f2eefd?w=400&auto=format&fit=crop&q=60" class="w-full h-full object-cover" alt="Salad">
-                        <span class="absolute top-2 left-2 bg-white/90 px-2 py-1 rounded-md text-xs font-bold">早餐</span>
-                    </div>
-                    <div class="p-3">
-                        <h3 class="font-bold text-gray-800 text-sm">酪梨全麥吐司</h3>
-                        <div class="flex justify-between mt-2 text-xs text-gray-500">
-                            <span>400 kcal</span>
-                            <span>15g 蛋白</span>
-                        </div>
-                    </div>
-                </div>
-
-                <!-- 食譜卡片 2 -->
-                <div class="bg-white rounded-2xl overflow-hidden shadow-sm">
-                    <div class="h-32 bg-gray-200 relative">
-                        <img src="https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&auto=format&fit=crop&q=60" class="w-full h-full object-cover" alt="Bowl">
-                        <span class="absolute top-2 left-2 bg-white/90 px-2 py-1 rounded-md text-xs font-bold">午餐</span>
-                    </div>
-                    <div class="p-3">
-                        <h3 class="font-bold text-gray-800 text-sm">鷹嘴豆藜麥沙拉</h3>
-                        <div class="flex justify-between mt-2 text-xs text-gray-500">
-                            <span>350 kcal</span>
-                            <span>18g 蛋白</span>
-                        </div>
-                    </div>
-                </div>
-                 <!-- 食譜卡片 3 -->
-                 <div class="bg-white rounded-2xl overflow-hidden shadow-sm">
-                    <div class="h-32 bg-gray-200 relative">
-                        <img src="https://images.unsplash.com/photo-1547592180-85f173990554?w=400&auto=format&fit=crop&q=60" class="w-full h-full object-cover" alt="Soup">
-                        <span class="absolute top-2 left-2 bg-white/90 px-2 py-1 rounded-md text-xs font-bold">晚餐</span>
-                    </div>
-                    <div class="p-3">
-                        <h3 class="font-bold text-gray-800 text-sm">味噌豆腐湯</h3>
-                        <div class="flex justify-between mt-2 text-xs text-gray-500">
-                            <span>200 kcal</span>
-                            <span>12g 蛋白</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- FAB 懸浮按鈕 -->
-        <div class="fab">
-            <i class="fas fa-plus"></i>
-        </div>
-
-        <!-- 底部導航 -->
-        <div class="bottom-nav">
-            <div class="nav-item active" onclick="switchTab('home')">
-                <i class="fas fa-home"></i>
-                <span>首頁</span>
-            </div>
-            <div class="nav-item" onclick="switchTab('log')">
-                <i class="fas fa-book-open"></i>
-                <span>日記</span>
-            </div>
-            <div class="nav-item" onclick="switchTab('stats')">
-                <i class="fas fa-chart-line"></i>
-                <span>追蹤</span>
-            </div>
-            <div class="nav-item" onclick="switchTab('recipe')">
-                <i class="fas fa-utensils"></i>
-                <span>靈感</span>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // 簡單的分頁切換邏輯
-        function switchTab(tabName) {
-            // 隱藏所有畫面
-            document.querySelectorAll('.screen').forEach(el => el.classList.remove('active'));
-            // 移除所有 nav active
-            document.querySelectorAll('.nav-item').forEach(el => el.classList.remove('active'));
-
-            // 顯示目標畫面
-            document.getElementById(tabName + '-screen').classList.add('active');
-
-            // 設定 Nav 狀態 (這裡簡單用 index 對應，實際開發可用 ID)
-            const navs = document.querySelectorAll('.nav-item');
-            if(tabName === 'home') navs[0].classList.add('active');
-            if(tabName === 'log') navs[1].classList.add('active');
-            if(tabName === 'stats') navs[2].classList.add('active');
-            if(tabName === 'recipe') navs[3].classList.add('active');
-        }
 
-        // 繪製圖表 (Chart.js)
-        // 1. 甜甜圈圖
-        const ctxDoughnut = document.getElementById('mealDoughnutChart').getContext('2d');
-        new Chart(ctxDoughnut, {
-            type: 'doughnut',
-            data: {
-                labels: ['早餐', '午餐', '晚餐'],
-                datasets: [{
-                    data: [35, 45, 20],
-                    backgroundColor: ['#22c55e', '#86efac', '#dcfce7'],
-                    borderWidth: 0
-                }]
-            },
-            options: {
-                cutout: '70%',
-                plugins: { legend: { display: false } }
-            }
-        });
-
-        // 2. 體重折線圖
-        const ctxLine = document.getElementById('weightChart').getContext('2d');
-        new Chart(ctxLine, {
-            type: 'line',
-            data: {
-                labels: ['11/01', '11/08', '11/15', '11/22', '11/24'],
-                datasets: [{
-                    label: '體重',
-                    data: [60, 59.5, 59.2, 58.8, 58.5],
-                    borderColor: '#16a34a',
-                    backgroundColor: 'rgba(22, 163, 74, 0.1)',
-                    tension: 0.4,
-                    fill: true,
-                    pointRadius: 4,
-                    pointBackgroundColor: '#ffffff',
-                    pointBorderColor: '#16a34a',
-                    pointBorderWidth: 2
-                }]
-            },
-            options: {
-                responsive: true,
-                plugins: { legend: { display: false } },
-                scales: {
-                    y: { min: 57, max: 61, grid: { display: false } },
-                    x: { grid: { display: false } }
-                }
-            }
-        });
-    </script>
-</body>
-</html>
\ No newline at end of file
+def new_streaks() -> StreakTracker:
+    tracker = StreakTracker(get_engine(), get_session().user_id, current_goals())
+    get_engine().subscribe(tracker.apply, init=tracker.rebuild)
+    return tracker
+
+
+def get_streaks() -> StreakTracker:
+    tracker = get_session().get("streaks", new_streaks)
+    # 新體重或修改個人資料讓目標改變時，重算以前的判定
+    tracker.set_goals(current_goals())
+    return tracker
+
+
+def get_logger() -> MealLogger:
+    session = get_session()
+    return session.get(
+        "meal_logger",
+        lambda: MealLogger(
+            get_engine(), get_writer(), get_recognizer(), get_executor(),
+            origin=session.session_id, current_engine=lambda: session.peek("summary_engine"),
+        ),
+    )
+
+
+def log_form(day: date) -> None:
+    with st.form("log_meal", clear_on_submit=True):
+        meal = st.selectbox("餐別", list(MEALS), format_func=MEALS.get)
+        name = st.text_input("食物", placeholder="例如：無糖豆漿、地瓜 (中)")
+        kcal = st.number_input("熱量 (kcal，留空由 AI 估算)", min_value=0.0, value=None, step=10.0)
+        photo = st.file_uploader("餐點照片", type=["jpg", "jpeg", "png"])
+        if not st.form_submit_button("+ 新增") or not (name or photo):
+            return
+    protein = 0.0
+    if kcal is None and photo is None:
+        # 每一項都和內建食物表的名稱完全或幾乎相符才直接用，不必等模型；「無糖豆漿 + 地瓜(中)」各記一筆。
+        # 只是部分相符 (「地瓜」對「地瓜葉」) 或打錯字時保留使用者輸入的文字，交給模型辨識
+        foods = [get_food_index().search(part, limit=1, fuzzy=False) for part in split_text(name)]
+        if foods and all(m and m[0].score >= CONFIDENT_SCORE for m in foods):
+            for matches in foods[1:]:
+                food = matches[0].food
+                get_logger().log(get_session().user_id, day, meal, food.name, food.kcal, food.protein)
+            food = foods[0][0].food
+            name, kcal, protein = food.name, food.kcal, food.protein
+    image = None
+    if photo is not None:
+        # 先縮圖再送模型，省上傳頻寬與模型 token
+        try:
+            image = prepare_upload(photo.getvalue())
+        except Exception:
+            st.error("無法讀取這張照片")
+            return
+    get_logger().log(get_session().user_id, day, meal, name or "餐點照片", kcal, protein, image)
+
+
+def weight_form(day: date) -> None:
+    with st.form("log_weight", clear_on_submit=True):
+        weight = st.number_input("紀錄今日體重 (kg)", min_value=20.0, max_value=300.0, value=None, step=0.1)
+        body_fat = st.number_input("體脂 (%)", min_value=1.0, max_value=70.0, value=None, step=0.1)
+        if not st.form_submit_button("紀錄") or weight is None:
+            return
+    session = get_session()
+    weigh_in = WeighIn(session.user_id, day, weight, body_fat)
+    get_weights().add(weigh_in)
+    get_weight_writes().submit((session.user_id, day), partial(save_weigh_in, weigh_in, session.session_id))
+
+
+def weight_notice(day: date) -> None:
+    writes = get_weight_writes()
+    key = (get_session().user_id, day)
+    status = writes.status(key)
+    if status is EntryStatus.PENDING:
+        st.caption("體重同步中…")
+        st.button("重新整理", key="refresh-weight")
+    elif status is EntryStatus.FAILED:
+        st.warning(f"今日體重同步失敗：{writes.error(key)}")
+        st.button("重試", key="retry-weight", on_click=writes.retry, args=(key,))
+
+
+def profile_form() -> None:
+    session = get_session()
+    profile = get_profile()
+    with st.expander("個人資料與目標"):
+        with st.form("profile"):
+            sex = st.radio(
+                "性別", list(SEXES), format_func=SEXES.get, horizontal=True,
+                index=list(SEXES).index(profile.sex) if profile else 0,
+            )
+            age = st.number_input("年齡", min_value=10, max_value=100, value=profile.age if profile else 30)
+            height = st.number_input(
+                "身高 (cm)", min_value=100.0, max_value=230.0, value=profile.height if profile else 165.0, step=0.5
+            )
+            activity = st.selectbox(
+                "活動量", list(ACTIVITY), format_func=lambda key: ACTIVITY[key][1],
+                index=list(ACTIVITY).index(profile.activity) if profile else 1,
+            )
+            goal = st.selectbox(
+                "目標", list(GOALS), format_func=lambda key: GOALS[key][2],
+                index=list(GOALS).index(profile.goal) if profile else 1,
+            )
+            if st.form_submit_button("儲存"):
+                profile = Profile(session.user_id, sex, int(age), float(height), activity, goal)
+                get_profile_store().save(profile)
+                session.set("profile", profile)
+                # 同一使用者的其他 session 下次 rerun 重新載入，目標跟著更新
+                get_user_versions().bump(session.user_id, session.session_id)
+        goals = current_goals()
+        if goals.tdee is None:
+            st.caption(
+                f"目前使用預設目標 {goals.target_kcal:.0f} kcal / 蛋白質 {goals.protein_goal:.0f}g；"
+                "填寫個人資料並紀錄體重後會自動計算。"
+            )
+        else:
+            line = f"BMR {goals.bmr:.0f} kcal · TDEE {goals.tdee:.0f} kcal"
+            if goals.adaptive_tdee is not None:
+                line += f" · 依近期體重趨勢校正為 {goals.adaptive_tdee:.0f} kcal"
+            st.caption(f"{line}\n\n每日目標 {goals.target_kcal:.0f} kcal / 蛋白質 {goals.protein_goal:.0f}g")
+
+
+def build_home(day: date) -> str:
+    session = get_session()
+    summary = day_summary(day)
+    return render_screen(
+        "home",
+        {
+            **home_context(summary, session.display_name),
+            **meal_chart_context(get_rollups().breakdown(session.user_id, day)),
+        },
+    )
+
+
+def build_log(day: date) -> str:
+    entries = get_engine().entries_for(get_session().user_id, day)
+    return render_screen("log", log_context(day, entries, get_writer().status))
+
+
+def build_stats(day: date) -> str:
+    report = get_report_store().latest(get_session().user_id)
+    return render_screen("stats", {**stats_context(get_weights()), **streak_context(get_streaks(), day, report)})
+
+
+def build_recipe(day: date) -> str:
+    user_id = get_session().user_id
+    summary = day_summary(day)
+    recommendations = {
+        key: get_recommender().recommend(user_id, summary.remaining, summary.protein_left, key)
+        for key in FILTERS
+    }
+    return render_screen("recipe", recipe_context(recommendations, image_src=get_image_cache().thumbnail_src))
+
+
+def get_tabs(day: date) -> LazyTabs:
+    session = get_session()
+    tabs = session.get("lazy_tabs", LazyTabs)
+    engine = get_engine()
+    writer = get_writer()
+    user_id = session.user_id
+    # 問候語依時段變化，所以 key 帶上小時
+    tabs.register(
+        "home", lambda: build_home(day), lambda: (day, datetime.now().hour, engine.version, current_goals())
+    )
+    tabs.register(
+        "log",
+        lambda: build_log(day),
+        # 背景同步狀態改變時也要重畫
+        lambda: (day, engine.version, tuple(writer.status(e.entry_id) for e in engine.entries_for(user_id, day))),
+    )
+    tabs.register(
+        "stats",
+        lambda: build_stats(day),
+        # 週報由背景工作產生，最新一份的週別也放進 key
+        lambda: (day, get_weights().version, get_streaks().version, get_report_store().latest_week(user_id)),
+    )
+    # 背景產生的縮圖完成後換掉原始圖片網址
+    images = get_image_cache()
+    tabs.register("recipe", lambda: build_recipe(day), lambda: (day, engine.version, current_goals(), images.version))
+    return tabs
+
+
+def sync_notice(day: date) -> None:
+    writer = get_writer()
+    if not get_sync().online:
+        st.caption("離線中：紀錄已存在本機，恢復連線後會自動同步到 Google Sheets")
+    entries = get_engine().entries_for(get_session().user_id, day)
+    if any(writer.status(e.entry_id) is EntryStatus.PENDING for e in entries):
+        st.caption("同步中…")
+        st.button("重新整理")
+    for entry in entries:
+        if writer.status(entry.entry_id) is EntryStatus.FAILED:
+            st.warning(f"「{entry.name}」同步失敗：{writer.error(entry.entry_id)}")
+            st.button("重試", key=f"retry-{entry.entry_id}", on_click=get_logger().retry, args=(entry.entry_id,))
+
+
+def history_changed(user_id: str) -> None:
+    """大量匯入後：讓所有 session (包括自己) 重新載入，並清掉這位使用者的推薦快取。"""
+    get_user_versions().bump(user_id, "import")
+    get_recommender().invalidate_user(user_id)
+    get_session().refresh()
+
+
+def transfer_panel() -> None:
+    user_id = get_session().user_id
+    with st.expander("匯入 / 匯出歷史紀錄"):
+        kind = st.radio("資料", ["entries", "weights"], format_func={"entries": "餐點", "weights": "體重"}.get, horizontal=True)
+        upload = st.file_uploader("從其他 App 匯入 (CSV / JSON / JSONL)", type=["csv", "jsonl", "ndjson", "json"])
+        if upload is not None and st.button("開始匯入"):
+            try:
+                fmt = detect_format(upload.name)
+                if kind == "entries":
+                    result = import_entries(get_store().sheet, upload, user_id, fmt)
+                else:
+                    result = import_weigh_ins(get_weight_store().sheet, upload, user_id, fmt)
+            except Exception as exc:
+                st.error(f"匯入失敗：{exc}")
+            else:
+                st.success(f"匯入 {result.rows} 筆，略過 {result.skipped} 筆無效、{result.duplicates} 筆重複")
+                if result.rows:
+                    history_changed(user_id)
+        sheet = (get_store() if kind == "entries" else get_weight_store()).sheet
+        st.download_button(
+            "下載 Parquet 備份",
+            data=lambda: export_bytes(sheet.user_frame(user_id)),
+            file_name=f"{kind}.parquet",
+            mime="application/vnd.apache.parquet",
+        )
+
+
+def get_unparsed() -> list[Entry]:
+    """缺熱量的紀錄；和分頁一樣以紀錄的版本記住，只有紀錄變動時才重新查詢。
+
+    其他 session 寫入、匯入或補齊後 ``SessionState.refresh`` 會清掉整個 session，這裡也跟著重查。
+    """
+    session = get_session()
+    key = get_engine().version
+    memo = session.peek("unparsed")
+    if memo is None or memo[0] != key:
+        memo = (key, get_store().unparsed(session.user_id))
+        session.set("unparsed", memo)
+    return memo[1]
+
+
+def backfill_panel() -> None:
+    user_id = get_session().user_id
+    missing = get_unparsed()
+    if not missing:
+        return
+    if st.button(f"以 AI 補齊 {len(missing)} 筆缺少熱量的紀錄"):
+        with st.spinner("辨識中…"):
+            result = get_backfill().run(missing)
+        if result.stopped:
+            st.warning(f"無法連線到 AI 服務，已補齊 {result.updated} 筆，其餘請稍後再試")
+        else:
+            st.success(f"已補齊 {result.updated} 筆 (拆出 {result.added} 筆)，{result.failed} 筆無法辨識")
+        if result.updated:
+            history_changed(user_id)
+
+
+def debug_panel(current: trace.Trace) -> None:
+    """網址加上 ?debug=<DIARY_DEBUG_TOKEN> 才顯示：這次 rerun 的各階段耗時、快取命中、慢 rerun 與指標匯出。"""
+    with st.expander(f"🔧 rerun {current.total_ms:.0f} ms", expanded=True):
+        st.dataframe(
+            [{"階段": "　" * s.depth + s.name, "開始 ms": round(s.start_ms, 1), "耗時 ms": round(s.duration_ms, 2)} for s in current.spans],
+            hide_index=True,
+        )
+        if current.counters:
+            st.json(dict(current.counters), expanded=False)
+        st.checkbox("下一次 rerun 以 cProfile 取樣", key="profile_next")
+        if current.profile:
+            st.code(current.profile, language="text")
+        if trace.SLOW:
+            st.caption(f"最近的慢 rerun (≥ {SLOW_RERUN_MS:.0f} ms)")
+            st.dataframe(
+                [{"時間": datetime.fromtimestamp(t.started_at).strftime("%H:%M:%S"), "ms": round(t.total_ms), **t.attrs} for t in trace.SLOW],
+                hide_index=True,
+            )
+        left, right = st.columns(2)
+        left.download_button("指標 (Prometheus)", trace.METRICS.prometheus(), "diary-metrics.txt", "text/plain")
+        right.download_button(
+            "最近 rerun (JSONL)",
+            lambda: "\n".join(json.dumps(t.to_dict(), ensure_ascii=False) for t in trace.RECENT),
+            "diary-reruns.jsonl",
+            "application/x-ndjson",
+        )
+
+
+st.set_page_config(page_title="植感生活 Diary", page_icon="🌱", layout="centered")
+setup_trace_log()
+
+today = date.today()
+debug = debug_enabled()
+# 手動取樣只接受通過除錯驗證的 session
+profile = (st.session_state.pop("profile_next", False) and debug) or random.random() < PROFILE_SAMPLE_RATE
+with trace.rerun(slow_ms=SLOW_RERUN_MS, profile=profile) as current:
+    # 啟動背景同步與週報排程 (每個程序一次)
+    get_sync()
+    get_report_job()
+    # 同一位使用者在其他 session 寫入過，就重新載入這個 session 的資料
+    get_session().refresh()
+    tab = st.radio("分頁", list(TABS), format_func=TABS.get, horizontal=True, label_visibility="collapsed", key="tab")
+    current.attrs.update(tab=tab, session=get_session().session_id[:8])
+    # 先處理表單再畫手機畫面，新增的紀錄這次 rerun 就看得到
+    frame = st.container()
+    if tab in ("home", "log"):
+        log_form(today)
+        sync_notice(today)
+    elif tab == "stats":
+        weight_form(today)
+        weight_notice(today)
+        profile_form()
+        transfer_panel()
+        backfill_panel()
+
+    # 只建置目前分頁；其他分頁等被打開時才建置
+    with frame:
+        screen = get_tabs(today).render(tab)
+        with trace.span("render.page"):
+            page = render_page(tab, screen)
+        components.html(page, height=880)
+
+if debug:
+    debug_panel(current)
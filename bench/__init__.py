@@ -0,0 +1,8 @@
+"""效能基準與負載測試。
+
+以假的 Sheets 後端與假的 Gemini 模型，在 1、100、10k 位使用者 (多年紀錄) 的合成資料上
+量測熱路徑的延遲百分位數與吞吐量，並和 ``bench/baseline.json`` 比較：
+
+    python -m bench --scale 1 --scale 100          # 量測並與基準比較
+    python -m bench --scale 10k --save             # 更新基準
+"""
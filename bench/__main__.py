@@ -0,0 +1,63 @@
+"""python -m bench [--scale 1|100|10k ...] [--only dashboard ...] [--startup] [--save] [--quick]"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from .harness import compare, load_baseline, report, save_baseline
+from . import startup
+from .scenarios import SCENARIOS, Context
+from .synthetic import SCALES, build_database
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="diary 熱路徑的效能基準")
+    parser.add_argument("--scale", action="append", choices=list(SCALES), help="可重複；預設 1 與 100")
+    parser.add_argument("--only", action="append", choices=list(SCENARIOS), help="只跑指定的情境")
+    parser.add_argument("--save", action="store_true", help="把這次結果寫成新的基準")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="p95/吞吐量可接受的變動比例")
+    parser.add_argument("--quick", action="store_true", help="減少迭代次數，用於快速檢查")
+    parser.add_argument("--rebuild", action="store_true", help="重新產生合成資料")
+    parser.add_argument("--startup", action="store_true", help="量測冷啟動與第一次繪製 (不跑資料規模的情境，除非也指定 --scale)")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    regressions = []
+    if args.startup:
+        results, notes = startup.run(runs=1 if args.quick else 3)
+        print(report("startup", results))
+        print("\n".join(notes))
+        if args.save:
+            baseline["startup"] = {r.name: r.summary() for r in results}
+        else:
+            regressions += compare("startup", results, baseline, args.tolerance)
+    for name in args.scale or ([] if args.startup else ["1", "100"]):
+        scale = SCALES[name]
+        started = time.perf_counter()
+        db = build_database(name, scale, rebuild=args.rebuild)
+        print(f"scale {name}: {scale.users} users, {scale.entries} entries (ready in {time.perf_counter() - started:.1f}s)")
+        ctx = Context(scale, db, quick=args.quick)
+        results = []
+        for key in args.only or list(SCENARIOS):
+            results.extend(SCENARIOS[key](ctx))
+        print(report(name, results))
+        db.close()
+        if args.save:
+            baseline.setdefault(name, {}).update({r.name: r.summary() for r in results})
+        else:
+            regressions += compare(name, results, baseline, args.tolerance)
+
+    if args.save:
+        save_baseline(baseline)
+        print("baseline saved")
+    if regressions:
+        print("\nREGRESSIONS:")
+        print("\n".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
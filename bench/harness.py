@@ -0,0 +1,125 @@
+"""計時、百分位數、負載測試與基準比較。"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Sequence
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+@dataclass
+class Result:
+    name: str
+    # 每次呼叫的耗時 (ns)
+    samples: list[int] = field(repr=False)
+    # 整段量測的實際經過時間 (s)；負載測試時多執行緒同時進行，吞吐量以此計算
+    wall: float = 0.0
+
+    def percentile(self, q: float) -> float:
+        """第 q 百分位數 (µs)，最近秩法。"""
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index] / 1000
+
+    @property
+    def ops_per_sec(self) -> float:
+        wall = self.wall or sum(self.samples) / 1e9
+        return len(self.samples) / wall if wall else 0.0
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "n": len(self.samples),
+            "p50_us": round(self.percentile(50), 2),
+            "p95_us": round(self.percentile(95), 2),
+            "p99_us": round(self.percentile(99), 2),
+            "ops_per_sec": round(self.ops_per_sec, 1),
+        }
+
+
+def measure(name: str, fn: Callable[[], object], iterations: int = 1000, warmup: int = 10) -> Result:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t)
+    return Result(name, samples, time.perf_counter() - start)
+
+
+def load_test(
+    name: str,
+    mix: Sequence[tuple[float, Callable[[random.Random], object]]],
+    users: int,
+    duration: float,
+    seed: int = 0,
+) -> Result:
+    """locust 式的負載測試：``users`` 個執行緒在 ``duration`` 秒內依權重隨機執行操作。"""
+    weights = [w for w, _ in mix]
+    ops = [op for _, op in mix]
+    samples: list[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(i: int) -> None:
+        rng = random.Random(seed + i)
+        local = []
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, weights)[0]
+            t = time.perf_counter_ns()
+            op(rng)
+            local.append(time.perf_counter_ns() - t)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=user, args=(i,), name=f"bench-user-{i}") for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Result(name, samples, time.perf_counter() - start)
+
+
+def report(scale: str, results: Sequence[Result]) -> str:
+    lines = [f"== scale {scale} ==", f"{'scenario':<28}{'n':>8}{'p50 µs':>12}{'p95 µs':>12}{'p99 µs':>12}{'ops/s':>12}"]
+    for result in results:
+        s = result.summary()
+        lines.append(
+            f"{result.name:<28}{s['n']:>8}{s['p50_us']:>12.1f}{s['p95_us']:>12.1f}{s['p99_us']:>12.1f}{s['ops_per_sec']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict[str, dict[str, dict[str, float]]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(baseline: dict[str, dict[str, dict[str, float]]], path: Path = BASELINE_PATH) -> None:
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(scale: str, results: Sequence[Result], baseline: dict, tolerance: float) -> list[str]:
+    """p95 變慢或吞吐量下降超過 ``tolerance`` 的情境。"""
+    regressions = []
+    for result in results:
+        base = baseline.get(scale, {}).get(result.name)
+        if base is None:
+            continue
+        now = result.summary()
+        if now["p95_us"] > base["p95_us"] * (1 + tolerance):
+            regressions.append(f"{scale}/{result.name}: p95 {base['p95_us']:.1f} -> {now['p95_us']:.1f} µs")
+        if now["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{scale}/{result.name}: throughput {base['ops_per_sec']:.1f} -> {now['ops_per_sec']:.1f} ops/s"
+            )
+    return regressions
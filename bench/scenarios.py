@@ -0,0 +1,227 @@
+"""各熱路徑的量測情境。每個情境回傳一個或多個 ``Result``。"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from diary.foods import FoodIndex
+from diary.local import ENTRIES, LocalDatabase, LocalDiaryStore, LocalTable, LocalWeightStore, SheetSync
+from diary.models import MEALS, Entry
+from diary.recipes import RecipeRecommender
+from diary.recognition import FoodRecognizer, StubModel
+from diary.rollups import MealRollups
+from diary.storage import ENTRIES_WORKSHEET, InMemoryBackend
+from diary.summary import SummaryEngine
+from diary.weights import WeighIn, WeightSeries
+from diary.writer import MealLogger, WriteBehindQueue
+
+from .harness import Result, load_test, measure
+from .synthetic import END_DAY, Scale, food_queries, recipe_catalog, user_id
+
+# 假 Gemini 的回應時間
+GEMINI_DELAY = 0.05
+# 假 Sheets 每次整張讀寫的延遲
+SHEETS_LATENCY = 0.05
+# 同步情境的工作表列數上限 (Sheets 單張約 1000 萬格)；超過時只取前面的使用者
+SYNC_MAX_ROWS = 50_000
+
+
+@dataclass
+class Context:
+    scale: Scale
+    db: LocalDatabase
+    quick: bool = False
+
+    def __post_init__(self):
+        self.store = LocalDiaryStore(self.db)
+        self.weights = LocalWeightStore(self.db)
+        self.rng = random.Random(42)
+
+    def iterations(self, n: int) -> int:
+        return max(5, n // 10) if self.quick else n
+
+    def random_user(self, rng: random.Random | None = None) -> str:
+        return user_id((rng or self.rng).randrange(self.scale.users))
+
+    def random_day(self, rng: random.Random | None = None):
+        return END_DAY - timedelta(days=(rng or self.rng).randrange(self.scale.days))
+
+
+def dashboard(ctx: Context) -> list[Result]:
+    """首頁：session 開始時載入使用者紀錄，之後每次 rerun 只讀累計值。"""
+    user = ctx.random_user()
+    entries = ctx.store.user_entries(user)
+    engine = SummaryEngine(entries)
+    rollups = MealRollups(entries)
+    return [
+        measure("dashboard.session_load", lambda: SummaryEngine(ctx.store.user_entries(ctx.random_user())), ctx.iterations(20), 2),
+        measure("dashboard.summary", lambda: engine.summary(user, ctx.random_day()), ctx.iterations(20_000)),
+        measure("dashboard.breakdown", lambda: rollups.breakdown(user, ctx.random_day(), "week"), ctx.iterations(20_000)),
+        measure(
+            "dashboard.daily_totals_28d",
+            lambda: ctx.store.daily_totals(ctx.random_user(), END_DAY - timedelta(days=27), END_DAY),
+            ctx.iterations(500),
+        ),
+    ]
+
+
+def meal_logging(ctx: Context) -> list[Result]:
+    """記錄餐點：log() 的延遲 (應不受網路影響) 與寫入本機的吞吐量。"""
+    writer = WriteBehindQueue(ctx.store)
+    recognizer = FoodRecognizer(StubModel({"食物": [{"name": "食物", "kcal": 300, "protein": 10}]}, delay=GEMINI_DELAY))
+    executor = ThreadPoolExecutor(max_workers=8)
+    logger = MealLogger(SummaryEngine(), writer, recognizer, executor)
+    meals = list(MEALS)
+
+    def log_known():
+        logger.log(ctx.random_user(), END_DAY, ctx.rng.choice(meals), "豆漿", 135.0, 11.0)
+
+    def log_unknown():
+        # 每次不同的文字，避開辨識快取
+        logger.log(ctx.random_user(), END_DAY, ctx.rng.choice(meals), f"食物 {ctx.rng.random()}")
+
+    known = measure("log.meal", log_known, ctx.iterations(2000))
+    unknown = measure("log.meal_ai", log_unknown, ctx.iterations(200))
+    executor.shutdown(wait=True)
+    writer.join()
+    # 背景寫入的端到端吞吐量：連續送出 n 筆後等佇列清空；延遲欄位是平均每筆的耗時
+    n = ctx.iterations(5000)
+    total = measure("log.write_behind", lambda: [log_known() for _ in range(n)] and writer.join(), 1, 0)
+    batch = Result("log.write_behind", [total.samples[0] // n] * n, total.wall)
+    # 清掉這次新增的紀錄，下次量測的資料量相同
+    ctx.db.write([("DELETE FROM entries WHERE dirty = 1", [()])], notify=False)
+    return [known, unknown, batch]
+
+
+def food_search(ctx: Context) -> list[Result]:
+    index = FoodIndex.from_csv()
+    queries = food_queries(index)
+    return [measure("foods.search", lambda: index.search(ctx.rng.choice(queries), limit=5), ctx.iterations(20_000))]
+
+
+def recipe_ranking(ctx: Context) -> list[Result]:
+    catalog = recipe_catalog()
+    recommender = RecipeRecommender(catalog)
+
+    def state(rng: random.Random) -> tuple[float, float]:
+        return rng.uniform(-300, 1500), rng.uniform(0, 80)
+
+    def user_state() -> tuple[str, float, float]:
+        # 同一位使用者在兩次紀錄之間重繪多次，狀態大多落在同一個快取區間
+        user = ctx.random_user()
+        day_rng = random.Random(f"{user}-{ctx.rng.randrange(3)}")
+        return (user, *state(day_rng))
+
+    return [
+        measure("recipes.top_k_20k", lambda: catalog.top_k(*state(ctx.rng), "vegan"), ctx.iterations(500)),
+        measure(
+            "recipes.recommend",
+            lambda: recommender.recommend(*user_state(), "vegan"),
+            ctx.iterations(5000),
+        ),
+    ]
+
+
+def weight_chart(ctx: Context) -> list[Result]:
+    user = ctx.random_user()
+    series = WeightSeries(ctx.weights.user_weigh_ins(user))
+    day = [series.latest_day]
+
+    def add_and_chart():
+        day[0] += timedelta(days=1)
+        series.add(WeighIn(user, day[0], 60.0 + ctx.rng.random()))
+        series.chart("month")
+        series.chart("week")
+
+    return [
+        measure("weights.series_load", lambda: WeightSeries(ctx.weights.user_weigh_ins(ctx.random_user())), ctx.iterations(50)),
+        measure("weights.chart_after_add", add_and_chart, ctx.iterations(2000)),
+        measure("weights.chart_cached", lambda: series.chart("month"), ctx.iterations(20_000)),
+    ]
+
+
+def sheet_sync(ctx: Context) -> list[Result]:
+    """背景同步 (SheetSync) 對假 Sheets 後端：初次推送、沒有變更、推送一筆、拉回另一個程序改的一筆。
+
+    在暫存的資料庫副本上進行，不動到這個規模的共用資料庫。
+    """
+    with tempfile.TemporaryDirectory(prefix="diary-sync-") as tmp:
+        db = LocalDatabase(Path(tmp) / "sync.sqlite3")
+        table = LocalTable(db, ENTRIES)
+        table.bulk_insert(
+            ctx.db.query(
+                f"SELECT {', '.join(ENTRIES.columns)} FROM entries WHERE deleted = 0 ORDER BY user_id LIMIT ?",
+                (SYNC_MAX_ROWS,),
+            )
+        )
+        backend = InMemoryBackend(latency=SHEETS_LATENCY)
+        sync = SheetSync(db, backend, tables=[table])
+        store = LocalDiaryStore(db)
+        ids = itertools.count()
+
+        def push_one():
+            store.add([Entry(f"bench-sync-{next(ids)}", ctx.random_user(), END_DAY, "lunch", "豆漿", 135.0, 11.0)])
+            sync.sync()
+
+        def pull_one():
+            sheet = backend.sheets[ENTRIES_WORKSHEET]
+            sheet.loc[ctx.rng.randrange(len(sheet)), "kcal"] = float(ctx.rng.randrange(100, 900))
+            sync.sync()
+
+        n = ctx.iterations(5)
+        results = [
+            measure("sync.initial_push", sync.sync, 1, 0),
+            measure("sync.noop", sync.sync, n, 1),
+            measure("sync.push_one", push_one, n, 1),
+            measure("sync.pull_one", pull_one, n, 1),
+        ]
+        db.close()
+    return results
+
+
+def mixed_load(ctx: Context, duration: float = 5.0) -> list[Result]:
+    """多位使用者同時操作：看首頁、搜尋食物、看食譜、看體重圖。"""
+    users = min(ctx.scale.users, 32)
+    sessions = {}
+    for i in range(users):
+        uid = user_id(i)
+        entries = ctx.store.user_entries(uid)
+        sessions[uid] = (SummaryEngine(entries), WeightSeries(ctx.weights.user_weigh_ins(uid)))
+    index = FoodIndex.from_csv()
+    queries = food_queries(index)
+    recommender = RecipeRecommender(recipe_catalog())
+    uids = list(sessions)
+
+    def home(rng):
+        uid = rng.choice(uids)
+        summary = sessions[uid][0].summary(uid, END_DAY)
+        recommender.recommend(uid, summary.remaining, summary.protein_left)
+
+    def search(rng):
+        index.search(rng.choice(queries), limit=5)
+
+    def stats(rng):
+        sessions[rng.choice(uids)][1].chart("month")
+
+    def history(rng):
+        ctx.store.daily_totals(rng.choice(uids), END_DAY - timedelta(days=27), END_DAY)
+
+    mix = [(50, home), (20, search), (20, stats), (10, history)]
+    return [load_test(f"load.mixed_{users}u", mix, users, duration / 5 if ctx.quick else duration)]
+
+
+SCENARIOS = {
+    "dashboard": dashboard,
+    "log": meal_logging,
+    "foods": food_search,
+    "recipes": recipe_ranking,
+    "weights": weight_chart,
+    "sync": sheet_sync,
+    "load": mixed_load,
+}
@@ -0,0 +1,129 @@
+"""冷啟動與第一次繪製。
+
+- ``startup.cold``：全新的 Python 程序，本機 SQLite 是空的 (剛擴充出來的容器)，
+  從啟動程序到第一次 rerun 畫完的時間。每次都開新程序，量到的是真正的冷啟動。
+- ``startup.restart``：同上，但本機已有資料 (程序重啟)。
+- ``startup.rerun``：同一個程序的下一次 rerun，對照用。
+- ``paint.<分頁>``：以慢速行動網路 (RTT 150ms、1.6 Mbps) 推估的第一次繪製時間：
+  下載頁面 HTML，加上第一次繪製前必須等待的外部資源 (沒有 defer/async 的 script、
+  沒有延後載入的 stylesheet、@import) 的連線往返 (各來源平行連線)。沒有瀏覽器可量，外部資源本身的
+  大小與執行時間也不計，數字用來比較改動前後，不是實際的毫秒數。
+
+重量級模組 (``LAZY_MODULES``) 如果在第一次 rerun 就被載入，會列在報告裡。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .harness import Result
+
+APP = Path(__file__).parent.parent / "app.py"
+# 只在第一次用到時才載入的模組
+LAZY_MODULES = ("google.generativeai", "streamlit_gsheets", "PIL.Image", "pyarrow.parquet")
+TABS = ("home", "log", "stats", "recipe")
+
+# 慢速 4G
+RTT_MS = 150.0
+BANDWIDTH_BPS = 1.6e6
+# DNS + TCP + TLS + 請求
+ROUNDTRIPS_PER_ORIGIN = 4
+
+# 在子程序裡執行：載入 App、跑第一次 rerun、逐一打開各分頁取得 HTML
+CHILD = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+app.run()
+first = time.time()
+loaded = [m for m in sys.argv[3:] if m in sys.modules]
+started = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - started
+pages = {}
+for tab in filter(None, sys.argv[2].split(",")):
+    app.radio(key="tab").set_value(tab).run()
+    pages[tab] = app.get("iframe")[0].proto.srcdoc
+print(json.dumps({
+    "ok": not app.exception,
+    "first": first,
+    "rerun_ms": rerun * 1000,
+    "loaded": loaded,
+    "pages": pages,
+}))
+"""
+
+BLOCKING = [
+    # 沒有 defer/async 的外部 script
+    re.compile(r"<script\b(?![^>]*\b(?:defer|async)\b)[^>]*\bsrc=[\"']([^\"']+)"),
+    # 沒有以 media="print" 延後載入的 stylesheet
+    re.compile(r"<link\b(?=[^>]*\brel=[\"']stylesheet)(?![^>]*\bmedia=[\"']print)[^>]*\bhref=[\"']([^\"']+)"),
+    re.compile(r"@import\s+url\([\"']?([^\"')]+)"),
+]
+
+
+def _child(env: dict[str, str], tabs: tuple[str, ...] = ()) -> tuple[float, dict]:
+    started = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(APP), ",".join(tabs), *LAZY_MODULES],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=APP.parent,
+    )
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    if not data["ok"]:
+        raise RuntimeError(f"app raised during startup:\n{out.stderr[-2000:]}")
+    return (data["first"] - started) * 1000, data
+
+
+def blocking_resources(html: str) -> list[str]:
+    return [url for pattern in BLOCKING for url in pattern.findall(html)]
+
+
+def first_paint_ms(html: str) -> float:
+    """HTML 下載 + 擋住繪製的外部資源 (不同來源平行連線，取最慢的一個來源)。"""
+    ms = RTT_MS + len(html.encode()) * 8 / BANDWIDTH_BPS * 1000
+    if blocking_resources(html):
+        ms += ROUNDTRIPS_PER_ORIGIN * RTT_MS
+    return ms
+
+
+def run(runs: int = 3) -> tuple[list[Result], list[str]]:
+    """回傳量測結果與報告的附註 (各分頁的頁面大小、被提早載入的模組)。"""
+    cold, restart, rerun = [], [], []
+    notes: list[str] = []
+    pages: dict[str, str] = {}
+    loaded: set[str] = set()
+    for i in range(runs):
+        with tempfile.TemporaryDirectory(prefix="diary-startup-") as tmp:
+            env = {**os.environ, "DIARY_DB": str(Path(tmp) / "diary.sqlite3"), "DIARY_IMAGE_CACHE": str(Path(tmp) / "images")}
+            ms, data = _child(env, TABS if i == 0 else ())
+            cold.append(ms)
+            rerun.append(data["rerun_ms"])
+            loaded.update(data["loaded"])
+            pages = pages or data["pages"]
+            ms, data = _child(env)
+            restart.append(ms)
+
+    results = [
+        Result("startup.cold", [int(ms * 1e6) for ms in cold]),
+        Result("startup.restart", [int(ms * 1e6) for ms in restart]),
+        Result("startup.rerun", [int(ms * 1e6) for ms in rerun]),
+    ]
+    for tab, html in pages.items():
+        results.append(Result(f"paint.{tab}", [int(first_paint_ms(html) * 1e6)]))
+        blocking = blocking_resources(html)
+        notes.append(f"paint.{tab}: {len(html.encode()) / 1024:.1f} KB html, {len(blocking)} blocking: {', '.join(blocking) or '-'}")
+    if loaded:
+        notes.append(f"loaded before first use: {', '.join(sorted(loaded))}")
+    return results, notes
@@ -0,0 +1,123 @@
+"""合成資料：多位使用者、多年的日記與體重紀錄，以及大型食譜庫。
+
+資料以固定的亂數種子產生，同一個規模每次都相同；SQLite 檔案產生一次後重複使用。
+"""
+
+from __future__ import annotations
+
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from diary.foods import FoodIndex
+from diary.local import ENTRIES, WEIGH_INS, LocalDatabase, LocalTable
+from diary.models import EXERCISE, MEALS
+from diary.recipes import DIETS, RecipeCatalog, Recipe
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "diary-bench"
+END_DAY = date(2026, 1, 1)
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    days: int
+    meals_per_day: int = 4
+    # 每隔幾天量一次體重
+    weigh_every: int = 2
+
+    @property
+    def entries(self) -> int:
+        return self.users * self.days * self.meals_per_day
+
+
+SCALES = {
+    "1": Scale(users=1, days=5 * 365),
+    "100": Scale(users=100, days=3 * 365),
+    # 1460 萬筆紀錄；每天兩筆以控制產生時間與檔案大小
+    "10k": Scale(users=10_000, days=2 * 365, meals_per_day=2, weigh_every=7),
+}
+
+MEAL_KEYS = list(MEALS)
+
+
+def user_id(i: int) -> str:
+    return f"user-{i:05d}"
+
+
+def entry_rows(scale: Scale, seed: int = 0) -> Iterator[tuple]:
+    rng = random.Random(seed)
+    start = END_DAY - timedelta(days=scale.days - 1)
+    for u in range(scale.users):
+        uid = user_id(u)
+        for d in range(scale.days):
+            day = (start + timedelta(days=d)).isoformat()
+            for m in range(scale.meals_per_day):
+                meal = EXERCISE if m == scale.meals_per_day - 1 and rng.random() < 0.2 else MEAL_KEYS[m % 4]
+                kcal = float(rng.randrange(50, 800))
+                protein = float(rng.randrange(0, 40))
+                yield (f"{uid}-{d}-{m}", uid, day, meal, f"食物 {rng.randrange(500)}", kcal, protein)
+
+
+def weigh_in_rows(scale: Scale, seed: int = 0) -> Iterator[tuple]:
+    rng = random.Random(seed + 1)
+    start = END_DAY - timedelta(days=scale.days - 1)
+    for u in range(scale.users):
+        weight = rng.uniform(50, 90)
+        for d in range(0, scale.days, scale.weigh_every):
+            weight += rng.gauss(-0.01, 0.2)
+            yield (user_id(u), (start + timedelta(days=d)).isoformat(), round(weight, 1), None)
+
+
+def build_database(name: str, scale: Scale, rebuild: bool = False) -> LocalDatabase:
+    """產生 (或重複使用) 該規模的 SQLite 檔案。"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"diary-{name}.sqlite3"
+    if rebuild:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+    db = LocalDatabase(path)
+    if db.query("SELECT COUNT(*) FROM entries")[0][0] != scale.entries:
+        db.write([("DELETE FROM entries", [()]), ("DELETE FROM weigh_ins", [()])], notify=False)
+        LocalTable(db, ENTRIES).bulk_insert(entry_rows(scale))
+        LocalTable(db, WEIGH_INS).bulk_insert(weigh_in_rows(scale))
+        # 產生的資料視為已同步
+        db.write([("UPDATE entries SET dirty = 0", [()]), ("UPDATE weigh_ins SET dirty = 0", [()])], notify=False)
+    db.changed.clear()
+    return db
+
+
+def recipe_catalog(size: int = 20_000, seed: int = 0) -> RecipeCatalog:
+    rng = random.Random(seed)
+    return RecipeCatalog(
+        [
+            Recipe(
+                f"食譜 {i}",
+                rng.choice(MEAL_KEYS),
+                float(rng.randrange(100, 900)),
+                float(rng.randrange(2, 45)),
+                rng.choice(DIETS),
+            )
+            for i in range(size)
+        ]
+    )
+
+
+def food_queries(index: FoodIndex, seed: int = 0) -> list[str]:
+    """完整名稱、前半段、拼音、拼音縮寫與錯字 (相鄰兩字對調) 各佔一部分。"""
+    queries = []
+    for food in index.foods:
+        syllables = food.pinyin.split()
+        name = food.name
+        queries += [
+            name,
+            name[: max(1, len(name) // 2)],
+            "".join(syllables),
+            "".join(s[0] for s in syllables),
+            name[1] + name[0] + name[2:] if len(name) > 2 else name,
+        ]
+    random.Random(seed).shuffle(queries)
+    return queries
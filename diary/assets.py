@@ -0,0 +1,335 @@
+"""預先編譯、只含用到的 class 的 Tailwind CSS。
+
+頁面原本每次都載入 Tailwind 的 CDN JIT (一百多 KB 的 script，還要在手機上即時編譯)。
+這裡掃描 templates/ 與 views.py 裡出現的 token (和 Tailwind 的 content 掃描相同：
+class 名稱必須完整出現在原始碼裡)，只為其中屬於 Tailwind 的 utility 產生規則，
+數值沿用 Tailwind v3 預設的 spacing、色票與字級。結果存成 ``static/tailwind.css``，
+由 ``views.render_page`` 內嵌到頁面，不必再下載或編譯。
+
+修改模板後重新產生::
+
+    python -m diary.assets          # 寫入 static/tailwind.css
+    python -m diary.assets --check  # 內容過期或有編譯不出規則的 class 時結束碼為 1 (CI 用)
+
+``--check`` 也會找出 class 屬性裡看起來像 utility、卻沒有產生任何規則的名稱
+(例如打錯字的 ``bg-green-650`` 或這裡還沒支援的 ``tracking-wide``)，免得樣式無聲無息地消失。
+Font Awesome 的 class 與模板 ``<style>`` 裡自訂的 class 不算。
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Iterable
+
+ROOT = Path(__file__).parent.parent
+CSS_PATH = ROOT / "static" / "tailwind.css"
+# 要掃描 class 名稱的檔案
+CONTENT = [*sorted((ROOT / "templates").glob("*.html")), Path(__file__).parent / "views.py"]
+
+PREFLIGHT = """\
+*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}
+html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,sans-serif}
+body{margin:0;line-height:inherit}
+hr{height:0;color:inherit;border-top-width:1px}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+small{font-size:80%}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}
+button,select{text-transform:none}
+button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role=button]{cursor:pointer}
+:disabled{cursor:default}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%;height:auto}
+[hidden]{display:none}
+"""
+
+# Tailwind v3 預設色票 (只列模板會用到的色系)
+_SHADES = (50, 100, 200, 300, 400, 500, 600, 700, 800, 900)
+PALETTE: dict[str, str] = {"white": "#ffffff", "black": "#000000", "transparent": "transparent"}
+for _hue, _hexes in {
+    "gray": "f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827",
+    "red": "fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d",
+    "orange": "fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12",
+    "yellow": "fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12",
+    "green": "f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d",
+    "emerald": "ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b",
+    "blue": "eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a",
+    "indigo": "eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81",
+    "pink": "fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843",
+}.items():
+    PALETTE.update({f"{_hue}-{shade}": f"#{h}" for shade, h in zip(_SHADES, _hexes.split())})
+
+FONT_SIZES = {
+    "xs": ".75rem;line-height:1rem",
+    "sm": ".875rem;line-height:1.25rem",
+    "base": "1rem;line-height:1.5rem",
+    "lg": "1.125rem;line-height:1.75rem",
+    "xl": "1.25rem;line-height:1.75rem",
+    "2xl": "1.5rem;line-height:2rem",
+    "3xl": "1.875rem;line-height:2.25rem",
+    "4xl": "2.25rem;line-height:2.5rem",
+    "5xl": "3rem;line-height:1",
+}
+FONT_WEIGHTS = {"normal": 400, "medium": 500, "semibold": 600, "bold": 700, "extrabold": 800}
+RADII = {"": ".25rem", "sm": ".125rem", "md": ".375rem", "lg": ".5rem", "xl": ".75rem", "2xl": "1rem", "3xl": "1.5rem", "full": "9999px"}
+SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0/.05)",
+    "": "0 1px 3px 0 rgb(0 0 0/.1),0 1px 2px -1px rgb(0 0 0/.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0/.1),0 2px 4px -2px rgb(0 0 0/.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0/.1),0 4px 6px -4px rgb(0 0 0/.1)",
+    "xl": "0 20px 25px -5px rgb(0 0 0/.1),0 8px 10px -6px rgb(0 0 0/.1)",
+    "none": "0 0 #0000",
+}
+SIDES = {"t": ("top",), "r": ("right",), "b": ("bottom",), "l": ("left",), "x": ("left", "right"), "y": ("top", "bottom")}
+VARIANTS = {"hover": ":hover", "focus": ":focus", "active": ":active"}
+
+
+def spacing(value: str) -> str | None:
+    """Tailwind 的 spacing 級距：1 = .25rem。"""
+    if value == "0":
+        return "0px"
+    if value == "px":
+        return "1px"
+    if value == "full":
+        return "100%"
+    if value == "auto":
+        return "auto"
+    if "/" in value:
+        num, _, den = value.partition("/")
+        if num.isdigit() and den.isdigit() and int(den):
+            return f"{int(num) / int(den) * 100:g}%"
+        return None
+    try:
+        return f"{float(value) / 4:g}rem"
+    except ValueError:
+        return None
+
+
+def color(value: str) -> str | None:
+    name, _, alpha = value.partition("/")
+    hexa = PALETTE.get(name)
+    if hexa is None or not alpha:
+        return hexa
+    if not alpha.isdigit() or hexa == "transparent":
+        return None
+    r, g, b = (int(hexa[i : i + 2], 16) for i in (1, 3, 5))
+    return f"rgb({r} {g} {b}/{int(alpha) / 100:g})"
+
+
+def _sided(prop: str, sides: str, value: str | None) -> str | None:
+    if value is None:
+        return None
+    if not sides:
+        return f"{prop}:{value}"
+    return ";".join(f"{prop}-{side}:{value}" for side in SIDES[sides])
+
+
+def _border_width(sides: str, width: str) -> str:
+    value = f"{width or 1}px"
+    if not sides:
+        return f"border-width:{value}"
+    return ";".join(f"border-{side}-width:{value}" for side in SIDES[sides])
+
+
+# (pattern, 產生宣告的函式)；順序即輸出順序，後面的規則覆蓋前面的 (例如 px-4 覆蓋 p-2)
+Rule = tuple[re.Pattern, Callable[[re.Match], "str | None"]]
+RULES: list[Rule] = [
+    (re.compile(r"(static|fixed|absolute|relative|sticky)"), lambda m: f"position:{m[1]}"),
+    (re.compile(r"inset-(.+)"), lambda m: (v := spacing(m[1])) and f"inset:{v}"),
+    (re.compile(r"(top|right|bottom|left)-(.+)"), lambda m: (v := spacing(m[2])) and f"{m[1]}:{v}"),
+    (re.compile(r"z-(\d+|auto)"), lambda m: f"z-index:{m[1]}"),
+    (re.compile(r"m-(.+)"), lambda m: _sided("margin", "", spacing(m[1]))),
+    (re.compile(r"m([xy])-(.+)"), lambda m: _sided("margin", m[1], spacing(m[2]))),
+    (re.compile(r"m([trbl])-(.+)"), lambda m: _sided("margin", m[1], spacing(m[2]))),
+    (
+        re.compile(r"(block|inline-block|inline|flex|inline-flex|grid|table|hidden)"),
+        lambda m: "display:none" if m[1] == "hidden" else f"display:{m[1]}",
+    ),
+    (re.compile(r"h-(.+)"), lambda m: (v := spacing(m[1])) and f"height:{v}"),
+    (re.compile(r"min-h-(0|full|screen)"), lambda m: f"min-height:{'100vh' if m[1] == 'screen' else spacing(m[1])}"),
+    (re.compile(r"w-(.+)"), lambda m: (v := spacing(m[1])) and f"width:{v}"),
+    (re.compile(r"min-w-(0|full)"), lambda m: f"min-width:{spacing(m[1])}"),
+    (re.compile(r"flex-(1|auto|none)"), lambda m: {"1": "flex:1 1 0%", "auto": "flex:1 1 auto", "none": "flex:none"}[m[1]]),
+    (re.compile(r"(?:flex-)?shrink-0"), lambda m: "flex-shrink:0"),
+    (re.compile(r"cursor-(pointer|default)"), lambda m: f"cursor:{m[1]}"),
+    (re.compile(r"grid-cols-(\d+)"), lambda m: f"grid-template-columns:repeat({m[1]},minmax(0,1fr))"),
+    (re.compile(r"flex-(row|col)"), lambda m: f"flex-direction:{'column' if m[1] == 'col' else 'row'}"),
+    (re.compile(r"flex-wrap"), lambda m: "flex-wrap:wrap"),
+    (re.compile(r"items-(start|end|center|baseline|stretch)"), lambda m: f"align-items:{'flex-' + m[1] if m[1] in ('start', 'end') else m[1]}"),
+    (
+        re.compile(r"justify-(start|end|center|between|around)"),
+        lambda m: f"justify-content:{ {'start': 'flex-start', 'end': 'flex-end', 'between': 'space-between', 'around': 'space-around'}.get(m[1], m[1])}",
+    ),
+    (re.compile(r"gap-(.+)"), lambda m: (v := spacing(m[1])) and f"gap:{v}"),
+    (re.compile(r"gap-([xy])-(.+)"), lambda m: (v := spacing(m[2])) and f"{'column' if m[1] == 'x' else 'row'}-gap:{v}"),
+    (re.compile(r"overflow-(auto|hidden|scroll|visible)"), lambda m: f"overflow:{m[1]}"),
+    (re.compile(r"overflow-([xy])-(auto|hidden|scroll|visible)"), lambda m: f"overflow-{m[1]}:{m[2]}"),
+    (re.compile(r"truncate"), lambda m: "overflow:hidden;text-overflow:ellipsis;white-space:nowrap"),
+    (re.compile(r"whitespace-(nowrap|normal)"), lambda m: f"white-space:{m[1]}"),
+    (re.compile(r"rounded(?:-(\w+))?"), lambda m: (v := RADII.get(m[1] or "")) and f"border-radius:{v}"),
+    (re.compile(r"border(?:-([trblxy]))?(?:-(\d))?"), lambda m: _border_width(m[1] or "", m[2] or "")),
+    (re.compile(r"border-(.+)"), lambda m: (v := color(m[1])) and f"border-color:{v}"),
+    (re.compile(r"bg-(.+)"), lambda m: (v := color(m[1])) and f"background-color:{v}"),
+    (re.compile(r"object-(cover|contain)"), lambda m: f"object-fit:{m[1]}"),
+    (re.compile(r"p-(.+)"), lambda m: _sided("padding", "", spacing(m[1]))),
+    (re.compile(r"p([xy])-(.+)"), lambda m: _sided("padding", m[1], spacing(m[2]))),
+    (re.compile(r"p([trbl])-(.+)"), lambda m: _sided("padding", m[1], spacing(m[2]))),
+    (re.compile(r"text-(left|center|right)"), lambda m: f"text-align:{m[1]}"),
+    (re.compile(r"text-(\w+)"), lambda m: (v := FONT_SIZES.get(m[1])) and f"font-size:{v}"),
+    (re.compile(r"font-(\w+)"), lambda m: (v := FONT_WEIGHTS.get(m[1])) and f"font-weight:{v}"),
+    (re.compile(r"(uppercase|lowercase|capitalize)"), lambda m: f"text-transform:{m[1]}"),
+    (re.compile(r"leading-(none|tight|snug|normal|relaxed)"), lambda m: f"line-height:{ {'none': 1, 'tight': 1.25, 'snug': 1.375, 'normal': 1.5, 'relaxed': 1.625}[m[1]]}"),
+    (re.compile(r"text-(.+)"), lambda m: (v := color(m[1])) and f"color:{v}"),
+    (re.compile(r"opacity-(\d+)"), lambda m: f"opacity:{int(m[1]) / 100:g}"),
+    (re.compile(r"shadow(?:-(\w+))?"), lambda m: (v := SHADOWS.get(m[1] or "")) and f"box-shadow:{v}"),
+    (
+        re.compile(r"transition"),
+        lambda m: "transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,opacity,box-shadow,transform,filter;"
+        "transition-timing-function:cubic-bezier(.4,0,.2,1);transition-duration:150ms",
+    ),
+]
+# space-y-3 之類要作用在子元素上
+SPACE = re.compile(r"space-([xy])-(.+)")
+
+TOKEN = re.compile(r"[A-Za-z0-9_:/.\-]+")
+
+# ---- --check：找出編譯不出規則的 class ----
+
+CLASS_ATTR = re.compile(r"""class="([^"]*)"|class='([^']*)'""")
+CLASS_LIST = re.compile(r"classList\.(?:add|remove|toggle)\(([^)]*)\)")
+QUOTED = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+STYLE = re.compile(r"<style>(.*?)</style>", re.S)
+SELECTOR = re.compile(r"\.(-?[A-Za-z_][\w-]*)")
+ICON = re.compile(r"fa[srb]?|fa-[\w-]+")
+# views.py 裡整個字串就是 class 的常數，例如 ("bg-yellow-100", "text-yellow-600")
+CLASS_STRING = re.compile(r"[a-z0-9:/.\- ]+")
+# 看起來像 Tailwind utility 的名稱 (可帶 hover: 等變體)
+UTILITY_LIKE = re.compile(
+    r"(?:[a-z-]+:)*-?(?:"
+    r"(?:[mp][trblxy]?|text|bg|border|rounded|shadow|font|w|h|min-w|min-h|max-w|max-h|flex|grid-cols|grid-rows|gap|space|"
+    r"items|justify|self|place|order|col|row|top|right|bottom|left|inset|z|opacity|overflow|leading|tracking|whitespace|"
+    r"break|object|cursor|transition|duration|ease|delay|translate|rotate|scale|ring|outline|divide|from|via|to|fill|"
+    r"stroke|aspect|line-clamp|animate|blur|decoration|underline|list|align|select|pointer-events)(?:-[\w./]+)+"
+    r"|block|inline|inline-block|inline-flex|flex|grid|table|hidden|static|fixed|absolute|relative|sticky|truncate|"
+    r"italic|uppercase|lowercase|capitalize|grow|shrink|border|rounded|shadow|transition|underline|ring|sr-only|container)"
+)
+
+
+def scan(paths: Iterable[Path] = CONTENT) -> set[str]:
+    tokens: set[str] = set()
+    for path in paths:
+        tokens.update(TOKEN.findall(path.read_text(encoding="utf-8")))
+    return tokens
+
+
+def _escape(cls: str) -> str:
+    return re.sub(r"([:/.])", r"\\\1", cls)
+
+
+def _declarations(utility: str) -> tuple[int, str, str] | None:
+    """(規則順序, selector 後綴, 宣告)；不是 utility 時回傳 None。"""
+    match = SPACE.fullmatch(utility)
+    if match:
+        value = spacing(match[2])
+        side = "left" if match[1] == "x" else "top"
+        return (len(RULES), ">:not([hidden])~:not([hidden])", f"margin-{side}:{value}") if value else None
+    for order, (pattern, build) in enumerate(RULES):
+        match = pattern.fullmatch(utility)
+        if match:
+            decls = build(match)
+            if decls:
+                return order, "", decls
+    return None
+
+
+def compile_css(tokens: Iterable[str]) -> str:
+    """只為用到的 utility 產生規則；有 hover: 等變體的排在最後，和 Tailwind 相同。"""
+    rules = []
+    for token in set(tokens):
+        variant, _, utility = token.rpartition(":")
+        if variant and variant not in VARIANTS:
+            continue
+        found = _declarations(utility)
+        if found is None:
+            continue
+        order, suffix, decls = found
+        pseudo = VARIANTS.get(variant, "")
+        rules.append((bool(variant), order, token, f".{_escape(token)}{pseudo}{suffix}{{{decls}}}"))
+    rules.sort()
+    return PREFLIGHT + "\n".join(rule for *_, rule in rules) + "\n"
+
+
+def build(paths: Iterable[Path] = CONTENT) -> str:
+    return compile_css(scan(paths))
+
+
+def _class_strings(path: Path) -> Iterable[str]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".py":
+        # f-string 的固定部分也是 Constant
+        for node in ast.walk(ast.parse(text)):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                if CLASS_STRING.fullmatch(node.value):
+                    yield node.value
+                yield from (a or b for a, b in CLASS_ATTR.findall(node.value))
+        return
+    yield from (a or b for a, b in CLASS_ATTR.findall(text))
+    for args in CLASS_LIST.findall(text):
+        yield from (a or b for a, b in QUOTED.findall(args))
+
+
+def unknown_classes(paths: Iterable[Path] = CONTENT) -> set[str]:
+    """class 屬性裡看起來像 utility、卻編譯不出規則的名稱。"""
+    paths = list(paths)
+    custom: set[str] = set()
+    classes: set[str] = set()
+    for path in paths:
+        for style in STYLE.findall(path.read_text(encoding="utf-8")):
+            custom.update(SELECTOR.findall(style))
+        for value in _class_strings(path):
+            # $nav_home、{cls} 之類的模板變數在執行時才代換
+            classes.update(c for c in value.split() if not any(ch in c for ch in "${}"))
+    unknown = set()
+    for cls in classes:
+        if cls in custom or ICON.fullmatch(cls) or not UTILITY_LIKE.fullmatch(cls):
+            continue
+        variant, _, utility = cls.rpartition(":")
+        if (variant and variant not in VARIANTS) or _declarations(utility) is None:
+            unknown.add(cls)
+    return unknown
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m diary.assets", description="產生只含用到的 class 的 Tailwind CSS")
+    parser.add_argument("--check", action="store_true", help="只檢查 static/tailwind.css 是否為最新、class 是否都編譯得出規則")
+    args = parser.parse_args(argv)
+    css = build(CONTENT)
+    if args.check:
+        status = 0
+        unknown = unknown_classes(CONTENT)
+        if unknown:
+            print(f"no Tailwind rule for: {' '.join(sorted(unknown))}", file=sys.stderr)
+            status = 1
+        current = CSS_PATH.read_text(encoding="utf-8") if CSS_PATH.exists() else ""
+        if current != css:
+            print(f"{CSS_PATH} is out of date; run python -m diary.assets", file=sys.stderr)
+            status = 1
+        return status
+    CSS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    CSS_PATH.write_text(css, encoding="utf-8")
+    print(f"wrote {CSS_PATH} ({len(css.encode()) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
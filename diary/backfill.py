@@ -0,0 +1,156 @@
+"""批次補齊缺少營養資料的紀錄。
+
+手動輸入、從其他 App 匯入的紀錄常常只有名稱 (0 kcal)。逐筆呼叫模型既慢又耗配額，
+這裡把不重複的名稱每 ``batch_size`` 筆合成一個 prompt，以最多 ``concurrency`` 個
+執行緒送出：
+
+- 遇到速率限制 (429) 或連線錯誤、逾時時所有執行緒一起暫停，指數退避後重送整批；
+  連線一直失敗就停止這次執行，斷線時不會一直打 API；
+- 回應無法解析或請求太大時把批次對半拆開重試，壞掉的那一筆不連累其他筆；
+- 模型漏掉或沒辨識出食物的紀錄保持原狀，下次執行再補。
+
+含多項食物的紀錄 (例如「無糖豆漿 + 地瓜(中)」) 依辨識結果拆成多筆。
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from . import trace
+from .models import Entry
+from .recognition import FoodItem, FoodRecognizer, RateLimitError, RecognitionError
+from .writer import Sink, split_entry
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BackfillResult:
+    # 需要補齊的紀錄數
+    scanned: int = 0
+    updated: int = 0
+    # 多項食物拆出來的新紀錄數
+    added: int = 0
+    # 模型漏掉、辨識不出或一直失敗的紀錄數
+    failed: int = 0
+    calls: int = 0
+    rate_limited: int = 0
+    # 連線一直失敗而提早停止；沒送出的紀錄算在 failed
+    stopped: bool = False
+    users: set[str] = field(default_factory=set)
+
+
+def needs_backfill(entry: Entry) -> bool:
+    return not entry.is_exercise and entry.kcal == 0 and entry.protein == 0 and bool(entry.name.strip())
+
+
+class Backfill:
+    """把缺熱量的紀錄分批送模型，結果寫回 ``sink`` (LocalDiaryStore 即符合)。"""
+
+    def __init__(
+        self,
+        recognizer: FoodRecognizer,
+        sink: Sink,
+        batch_size: int = 25,
+        concurrency: int = 2,
+        retries: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.recognizer = recognizer
+        self.sink = sink
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        # 速率限制時所有執行緒都等到這個時間點
+        self._resume_at = 0.0
+
+    def run(self, entries: Iterable[Entry]) -> BackfillResult:
+        todo = [entry for entry in entries if needs_backfill(entry)]
+        result = BackfillResult(scanned=len(todo))
+        if not todo:
+            return result
+        names = list(dict.fromkeys(entry.name for entry in todo))
+        batches = [names[i : i + self.batch_size] for i in range(0, len(names), self.batch_size)]
+        found: dict[str, list[FoodItem]] = {}
+        with trace.span("backfill.run"), ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="backfill"
+        ) as pool:
+            for items in pool.map(lambda batch: self._batch(batch, result), batches):
+                found.update(items)
+
+        rows: list[Entry] = []
+        for entry in todo:
+            items = found.get(entry.name)
+            if not items:
+                result.failed += 1
+                continue
+            parts = split_entry(entry, items)
+            rows.extend(parts)
+            result.updated += 1
+            result.added += len(parts) - 1
+            result.users.add(entry.user_id)
+        if rows:
+            # 整批一次寫回，不逐筆觸發同步
+            self.sink.add(rows)
+            self.sink.flush()
+        log.info(
+            "backfill: %d scanned, %d updated (+%d split), %d failed, %d calls, %d rate-limited",
+            result.scanned, result.updated, result.added, result.failed, result.calls, result.rate_limited,
+        )
+        return result
+
+    def _batch(self, names: list[str], result: BackfillResult) -> dict[str, list[FoodItem]]:
+        for attempt in range(self.retries + 1):
+            self._wait()
+            with self._lock:
+                if result.stopped:
+                    return {}
+                result.calls += 1
+            try:
+                return self.recognizer.recognize_batch(names)
+            except RecognitionError as exc:
+                # 只有回應壞掉或請求太大才拆批；拆小可能就解析得了
+                if len(names) == 1:
+                    log.warning("backfill failed for %r: %s", names[0], exc)
+                    return {}
+                mid = len(names) // 2
+                return {**self._batch(names[:mid], result), **self._batch(names[mid:], result)}
+            except Exception as exc:
+                limited = isinstance(exc, RateLimitError)
+                if limited:
+                    with self._lock:
+                        result.rate_limited += 1
+                if attempt == self.retries:
+                    if limited:
+                        log.warning("backfill gave up on %d names after rate limiting: %s", len(names), exc)
+                    else:
+                        # 斷線、逾時：拆批只會多打幾次 API，整次執行停下來，下次再補
+                        log.warning("backfill stopped after %d failed attempts: %s", attempt + 1, exc)
+                        with self._lock:
+                            result.stopped = True
+                    return {}
+                delay = min(self.backoff * 2**attempt, self.max_backoff)
+                # 加一點隨機，免得所有執行緒同時醒來又一起撞上限制
+                self._pause(delay * (1 + random.random() / 4))
+        return {}
+
+    def _pause(self, delay: float) -> None:
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def _wait(self) -> None:
+        wait = self._resume_at - time.monotonic()
+        if wait > 0:
+            self.sleep(wait)
@@ -0,0 +1,85 @@
+"""執行緒安全的 LRU 快取。"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+from . import trace
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class LRUCache(Generic[V]):
+    """有容量上限、可選 TTL 的 LRU 快取。"""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        name: str | None = None,
+    ):
+        self.maxsize = maxsize
+        # 有名稱的快取會把命中/未命中記進 trace 指標
+        self.name = name
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                stored_at, value = item
+                if self.ttl is None or self.clock() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    hit = True
+                else:
+                    del self._data[key]
+                    hit = False
+            else:
+                hit = False
+            if not hit:
+                self.misses += 1
+        if self.name is not None:
+            trace.count(f"cache.{self.name}.{'hit' if hit else 'miss'}")
+        return value if hit else default
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            return default if item is _MISSING else item[1]
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """移除所有符合條件的鍵 (例如某位使用者的項目)；回傳移除的數量。"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
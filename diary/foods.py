@@ -0,0 +1,196 @@
+"""內建的食物營養表與查詢索引。
+
+記錄餐點時先查這裡，名稱完全或幾乎相符就直接用表上的熱量，不必等 Gemini。
+中文以單字/雙字的 n-gram 倒排索引查詢 (「豆」→ 無糖豆漿、豆腐…)，
+拼音以排序好的鍵做前綴查詢 (全拼與首字母)，打錯字時以 n-gram 相似度模糊比對。
+命中的分數是查詢涵蓋名稱的比例 (「地瓜」對「地瓜 (中)」是 1.0、對「地瓜葉」約 0.67)，
+只有完全或幾乎相符 (``CONFIDENT_SCORE``) 才算有把握；其餘交給模型辨識。
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from . import trace
+from .recognition import FoodItem
+
+FOODS_CSV = Path(__file__).parent / "data" / "foods.csv"
+
+# 分數 >= 此值才算有把握 (完全或幾乎相符)，不必再問模型
+CONFIDENT_SCORE = 0.8
+# 模糊比對的最低分數
+FUZZY_MIN_SCORE = 0.4
+
+
+@dataclass(frozen=True)
+class Food:
+    name: str
+    pinyin: str
+    serving: str
+    kcal: float
+    protein: float
+    diet: str
+
+    def to_item(self) -> FoodItem:
+        return FoodItem(self.name, self.kcal, self.protein)
+
+
+@dataclass(frozen=True)
+class Match:
+    food: Food
+    score: float
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip().lower()
+
+
+def is_pinyin(query: str) -> bool:
+    return query.replace(" ", "").isascii()
+
+
+def _core(name: str) -> str:
+    """比對用的名稱：去掉份量標示 (「地瓜 (中)」→「地瓜」) 與空白。"""
+    return re.sub(r"\(.*?\)|\s", "", name)
+
+
+def _name_grams(text: str) -> set[str]:
+    chars = [c for c in text if not c.isspace() and c not in "()"]
+    return set(chars) | {a + b for a, b in zip(chars, chars[1:])}
+
+
+def _pinyin_grams(text: str) -> set[str]:
+    padded = f"^{text}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class FoodIndex:
+    """記憶體中的食物索引。"""
+
+    def __init__(self, foods: Iterable[Food]):
+        self.foods: tuple[Food, ...] = tuple(foods)
+        name_postings: dict[str, list[int]] = {}
+        pinyin_postings: dict[str, list[int]] = {}
+        pinyin_keys: list[tuple[str, int, int]] = []
+        self._name_grams: list[frozenset[str]] = []
+        self._pinyin_grams: list[frozenset[str]] = []
+        for i, food in enumerate(self.foods):
+            grams = _name_grams(normalize(food.name))
+            self._name_grams.append(frozenset(grams))
+            for gram in grams:
+                name_postings.setdefault(gram, []).append(i)
+
+            # 拼音鍵：全拼、首字母，以及從每個音節開始的後綴 (「doujiang」→ 無糖豆漿)
+            syllables = food.pinyin.split()
+            full = "".join(syllables)
+            pinyin_keys.append((full, i, 0))
+            pinyin_keys.append(("".join(s[0] for s in syllables), i, 1))
+            for start in range(1, len(syllables)):
+                pinyin_keys.append(("".join(syllables[start:]), i, 2))
+            grams = _pinyin_grams(full)
+            self._pinyin_grams.append(frozenset(grams))
+            for gram in grams:
+                pinyin_postings.setdefault(gram, []).append(i)
+
+        self._name_postings = {k: tuple(v) for k, v in name_postings.items()}
+        self._pinyin_postings = {k: tuple(v) for k, v in pinyin_postings.items()}
+        pinyin_keys.sort()
+        self._pinyin_keys = [k for k, _, _ in pinyin_keys]
+        self._pinyin_ids = [i for _, i, _ in pinyin_keys]
+        self._pinyin_ranks = [r for _, _, r in pinyin_keys]
+        self._names = [normalize(food.name) for food in self.foods]
+        self._cores = [_core(name) or name for name in self._names]
+        # 子字串比對忽略空白 (「地瓜(小)」= 「地瓜 (小)」)
+        self._compact = [name.replace(" ", "") for name in self._names]
+        self._pinyin_full = [food.pinyin.replace(" ", "") for food in self.foods]
+        self._pinyin_initials = ["".join(s[0] for s in food.pinyin.split()) for food in self.foods]
+
+    @classmethod
+    def from_csv(cls, path: Path = FOODS_CSV) -> FoodIndex:
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(
+                Food(
+                    name=row["name"],
+                    pinyin=row["pinyin"],
+                    serving=row["serving"],
+                    kcal=float(row["kcal"]),
+                    protein=float(row["protein"]),
+                    diet=row["diet"],
+                )
+                for row in csv.DictReader(f)
+            )
+
+    def __len__(self) -> int:
+        return len(self.foods)
+
+    @trace.traced("foods.search")
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> list[Match]:
+        query = normalize(query)
+        if not query:
+            return []
+        if is_pinyin(query):
+            query = query.replace(" ", "")
+            hits = self._pinyin_prefix(query)
+        else:
+            hits = self._name_substring(query)
+        if hits:
+            return [Match(self.foods[i], score) for score, i in hits[:limit]]
+        if not fuzzy:
+            return []
+        return self._fuzzy(query, limit)
+
+    def _name_substring(self, query: str) -> list[tuple[float, int]]:
+        # 先用單字倒排表取交集，再確認是否為子字串
+        # 括號不在 n-gram 裡 (「地瓜 (中)」)，只看其他字
+        postings = [self._name_postings.get(c) for c in set(query) if not c.isspace() and c not in "()"]
+        if not postings or any(p is None for p in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        compact = query.replace(" ", "")
+        hits = [i for i in candidates if compact in self._compact[i]]
+        core = _core(query) or query
+        scored = [(min(1.0, len(core) / len(self._cores[i])), i) for i in hits]
+        # 涵蓋比例高的優先，其次開頭相符、名稱越短越前面
+        scored.sort(key=lambda item: (-item[0], not self._compact[item[1]].startswith(compact), len(self._names[item[1]]), item[1]))
+        return scored
+
+    def _pinyin_prefix(self, query: str) -> list[tuple[float, int]]:
+        ranks: dict[int, int] = {}
+        pos = bisect_left(self._pinyin_keys, query)
+        while pos < len(self._pinyin_keys) and self._pinyin_keys[pos].startswith(query):
+            food_id = self._pinyin_ids[pos]
+            ranks[food_id] = min(ranks.get(food_id, 2), self._pinyin_ranks[pos])
+            pos += 1
+        scored = [(self._pinyin_score(query, i, rank), i) for i, rank in ranks.items()]
+        scored.sort(key=lambda item: (-item[0], ranks[item[1]], len(self._names[item[1]]), item[1]))
+        return scored
+
+    def _pinyin_score(self, query: str, food_id: int, rank: int) -> float:
+        # 首字母只和首字母比；全拼與從中間音節開始的比對都以整個全拼計算
+        key = self._pinyin_initials[food_id] if rank == 1 else self._pinyin_full[food_id]
+        return min(1.0, len(query) / len(key))
+
+    def _fuzzy(self, query: str, limit: int) -> list[Match]:
+        if is_pinyin(query):
+            grams, postings, food_grams = _pinyin_grams(query), self._pinyin_postings, self._pinyin_grams
+        else:
+            grams, postings, food_grams = _name_grams(query), self._name_postings, self._name_grams
+        candidates = {i for gram in grams for i in postings.get(gram, ())}
+        scored = [(_dice(grams, food_grams[i]), i) for i in candidates]
+        scored = [(score, i) for score, i in scored if score >= FUZZY_MIN_SCORE]
+        scored.sort(key=lambda item: (-item[0], len(self.foods[item[1]].name), item[1]))
+        return [Match(self.foods[i], score) for score, i in scored[:limit]]
+
@@ -0,0 +1,153 @@
+"""每日熱量目標 (TDEE) 與蛋白質目標。
+
+由個人資料與最新體重以 Mifflin-St Jeor 公式估算 BMR，乘上活動係數得到 TDEE，
+再依目標 (減重/維持/增重) 調整。紀錄夠多時改用實際資料校正：
+期間內平均攝取 - 體重變化換算的熱量 = 實際消耗 (adaptive TDEE)。
+
+結果依 (個人資料, 體重序列版本) 記住；只有新體重或修改個人資料時才重算，
+首頁、食譜推薦等每個用到目標的地方每次 rerun 都直接拿現成的值。
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Sequence
+
+from . import trace
+from .summary import DEFAULT_PROTEIN_GOAL, DEFAULT_TARGET_KCAL
+from .weights import WeightSeries
+
+SEXES = {"female": "女", "male": "男"}
+# 活動係數 (key -> (係數, 顯示名稱))
+ACTIVITY = {
+    "sedentary": (1.2, "久坐"),
+    "light": (1.375, "輕度 (每週 1-3 天運動)"),
+    "moderate": (1.55, "中度 (每週 3-5 天)"),
+    "active": (1.725, "高度 (每週 6-7 天)"),
+    "very_active": (1.9, "體力勞動 / 一天兩練"),
+}
+# 目標 (key -> (熱量調整比例, 每公斤體重的蛋白質 g, 顯示名稱))
+GOALS = {
+    "lose": (-0.20, 2.0, "減脂"),
+    "maintain": (0.0, 1.6, "維持"),
+    "gain": (0.10, 1.8, "增肌"),
+}
+# 每公斤脂肪約 7700 kcal
+KCAL_PER_KG = 7700
+# 校正用的期間與最少資料量
+ADAPTIVE_DAYS = 28
+ADAPTIVE_MIN_LOGGED_DAYS = 14
+ADAPTIVE_MIN_WEIGH_INS = 4
+# 實際消耗與公式差太多通常是漏記，校正幅度以公式值的 ±25% 為限
+ADAPTIVE_MAX_SHIFT = 0.25
+# 熱量目標不低於此值
+MIN_TARGET_KCAL = 1200
+
+# (使用者, 起, 迄) -> 有紀錄的每一天的攝取熱量
+IntakeSource = Callable[[str, date, date], Sequence[float]]
+
+
+@dataclass(frozen=True)
+class Profile:
+    user_id: str
+    sex: str
+    age: int
+    height: float
+    activity: str = "light"
+    goal: str = "maintain"
+
+
+@dataclass(frozen=True)
+class Goals:
+    target_kcal: float
+    protein_goal: float
+    bmr: float | None = None
+    tdee: float | None = None
+    # 校正後的實際消耗；資料不足時為 None
+    adaptive_tdee: float | None = None
+
+
+DEFAULT_GOALS = Goals(DEFAULT_TARGET_KCAL, DEFAULT_PROTEIN_GOAL)
+
+
+def bmr(profile: Profile, weight: float) -> float:
+    """Mifflin-St Jeor 基礎代謝率。"""
+    base = 10 * weight + 6.25 * profile.height - 5 * profile.age
+    return base + (5 if profile.sex == "male" else -161)
+
+
+def tdee(profile: Profile, weight: float) -> float:
+    return bmr(profile, weight) * ACTIVITY[profile.activity][0]
+
+
+def weight_slope(days: Sequence[date], values: Sequence[float]) -> float:
+    """最小平方法的體重變化 (kg/天)。"""
+    xs = [d.toordinal() for d in days]
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(values) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, values)) / var
+
+
+def adaptive_tdee(series: WeightSeries, intake: Sequence[float], estimate: float) -> float | None:
+    """以實際攝取與體重趨勢反推的每日消耗；資料不足時回傳 None。"""
+    days, values = series.window(ADAPTIVE_DAYS)
+    if len(values) < ADAPTIVE_MIN_WEIGH_INS or len(intake) < ADAPTIVE_MIN_LOGGED_DAYS:
+        return None
+    observed = sum(intake) / len(intake) - weight_slope(days, values) * KCAL_PER_KG
+    low, high = estimate * (1 - ADAPTIVE_MAX_SHIFT), estimate * (1 + ADAPTIVE_MAX_SHIFT)
+    return min(max(observed, low), high)
+
+
+def compute_goals(profile: Profile, series: WeightSeries, intake: Sequence[float] = ()) -> Goals:
+    weight = series.latest
+    if weight is None:
+        return DEFAULT_GOALS
+    base = bmr(profile, weight)
+    estimate = base * ACTIVITY[profile.activity][0]
+    observed = adaptive_tdee(series, intake, estimate)
+    shift, protein_per_kg, _ = GOALS[profile.goal]
+    target = (observed if observed is not None else estimate) * (1 + shift)
+    return Goals(
+        target_kcal=round(max(target, MIN_TARGET_KCAL)),
+        protein_goal=round(weight * protein_per_kg),
+        bmr=round(base),
+        tdee=round(estimate),
+        adaptive_tdee=round(observed) if observed is not None else None,
+    )
+
+
+class GoalEngine:
+    """記住每位使用者最近一次算出的目標，輸入沒變就不重算。"""
+
+    def __init__(self, intake: IntakeSource | None = None):
+        self.intake = intake
+        self._lock = threading.Lock()
+        self._memo: dict[str, tuple[tuple, Goals]] = {}
+        self.computes = 0
+
+    def goals(self, user_id: str, profile: Profile | None, series: WeightSeries) -> Goals:
+        if profile is None:
+            return DEFAULT_GOALS
+        key = (profile, series.version)
+        with self._lock:
+            memo = self._memo.get(user_id)
+            if memo is not None and memo[0] == key:
+                trace.count("goals.hit")
+                return memo[1]
+        trace.count("goals.miss")
+        with trace.span("goals.compute"):
+            intake: Sequence[float] = ()
+            latest = series.latest_day
+            if self.intake is not None and latest is not None:
+                intake = self.intake(user_id, latest - timedelta(days=ADAPTIVE_DAYS - 1), latest)
+            goals = compute_goals(profile, series, intake)
+        with self._lock:
+            self._memo[user_id] = (key, goals)
+            self.computes += 1
+        return goals
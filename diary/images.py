@@ -0,0 +1,228 @@
+"""圖片處理：上傳縮圖、食譜卡片縮圖與本機圖片快取。
+
+手機照片在送給模型或寫入儲存前先縮小並重新壓縮成 JPEG；
+食譜卡片用固定尺寸的縮圖，存在以內容雜湊命名的磁碟快取 (LRU 淘汰)，
+同一張圖第二次之後不必再下載或重新縮圖。縮圖在背景執行緒下載與產生，還沒好之前
+頁面先用原始網址；快取目錄在 ``static/`` 底下時以 Streamlit 靜態檔案 (``app/static/…``)
+提供，不把圖片以 base64 塞進每次 rerun 的頁面。
+Pillow 在第一次處理圖片時才載入，不拖慢 App 啟動。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from . import trace
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+log = logging.getLogger(__name__)
+
+# Streamlit 靜態檔案目錄 (.streamlit/config.toml 開啟 enableStaticServing)
+STATIC_DIR = Path(__file__).parent.parent / "static"
+DEFAULT_CACHE_DIR = Path(os.environ.get("DIARY_IMAGE_CACHE", STATIC_DIR / "thumbs"))
+# 下載或縮圖失敗的網址，這段時間內不再重試
+FAILURE_TTL = 3600.0
+
+# 上傳給模型的最長邊；Gemini 對更大的圖不會辨識得更好，只是更貴
+UPLOAD_MAX_SIDE = 1024
+UPLOAD_QUALITY = 80
+# 食譜卡片 (h-32、兩欄) 的 2x 縮圖
+THUMBNAIL_SIZE = (320, 256)
+THUMBNAIL_QUALITY = 70
+
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _open(data: bytes) -> Image.Image:
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # 手機照片的方向寫在 EXIF 裡，轉正後 EXIF 就不需要了
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGB")
+
+
+def prepare_upload(data: bytes, max_side: int = UPLOAD_MAX_SIDE, quality: int = UPLOAD_QUALITY) -> bytes:
+    """縮小並重新壓縮上傳的照片；同一張照片每次都得到相同的位元組。"""
+    from PIL import Image
+
+    image = _open(data)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return _encode(image, quality)
+
+
+def make_thumbnail(data: bytes, size: tuple[int, int] = THUMBNAIL_SIZE, quality: int = THUMBNAIL_QUALITY) -> bytes:
+    """裁切成固定尺寸的縮圖。"""
+    from PIL import Image, ImageOps
+
+    return _encode(ImageOps.fit(_open(data), size, Image.LANCZOS), quality)
+
+
+def fetch(url: str, timeout: float = 10.0) -> bytes:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+class ImageCache:
+    """以內容雜湊命名的磁碟快取，總大小超過 ``max_bytes`` 時淘汰最久沒用的檔案。
+
+    食譜圖片的網址對應到內容雜湊的紀錄存在 ``<網址雜湊>.ref``，重啟後不必重新下載。
+    """
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = 64 * 1024 * 1024,
+        executor: Executor | None = None,
+        failure_ttl: float = FAILURE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+        self.failure_ttl = failure_ttl
+        self.clock = clock
+        self.base_url = _static_url(self.root)
+        self._lock = threading.Lock()
+        files = sorted(self.root.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        self._files: OrderedDict[str, int] = OrderedDict((p.stem, p.stat().st_size) for p in files)
+        self._size = sum(self._files.values())
+        # 網址 -> 縮圖的內容雜湊
+        self._refs: dict[str, str] = {}
+        # 網址 -> 失敗時間；排程中的網址
+        self._failed: dict[str, float] = {}
+        self._pending: set[str] = set()
+        # 有新縮圖完成時遞增，供畫面判斷是否要重畫
+        self.version = 0
+
+    @staticmethod
+    def key(source: str | bytes) -> str:
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        return hashlib.sha256(source).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.jpg"
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._files:
+                return None
+            self._files.move_to_end(key)
+        try:
+            path = self._path(key)
+            os.utime(path)
+            return path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._files.pop(key, 0)
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        # 先寫暫存檔再改名，其他執行緒不會讀到寫一半的檔案
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        with self._lock:
+            self._size += len(data) - self._files.pop(key, 0)
+            self._files[key] = len(data)
+            while self._size > self.max_bytes and len(self._files) > 1:
+                old, size = self._files.popitem(last=False)
+                self._size -= size
+                self._path(old).unlink(missing_ok=True)
+
+    def get_or_create(self, source: str | bytes, produce: Callable[[], bytes]) -> bytes:
+        key = self.key(source)
+        data = self.get(key)
+        if data is None:
+            data = produce()
+            self.put(key, data)
+        return data
+
+    # ---- 食譜縮圖 ----
+
+    @trace.traced("images.thumbnail")
+    def thumbnail_src(self, url: str) -> str:
+        """食譜圖片的 ``src``：縮圖已在快取中就回傳它的靜態網址，否則排入背景產生並先用原始網址。
+
+        不會在呼叫端的執行緒下載；失敗的網址 ``failure_ttl`` 秒內不再重試。
+        """
+        if not url or self.base_url is None:
+            return url
+        key = self._ref(url)
+        if key is not None:
+            with self._lock:
+                ready = key in self._files
+                if ready:
+                    self._files.move_to_end(key)
+            if ready:
+                return f"{self.base_url}/{key}.jpg"
+        with self._lock:
+            failed = self._failed.get(url)
+            if failed is not None and self.clock() - failed < self.failure_ttl:
+                return url
+            if url in self._pending:
+                return url
+            self._pending.add(url)
+        trace.count("images.scheduled")
+        self.executor.submit(self._make_thumbnail, url)
+        return url
+
+    def _make_thumbnail(self, url: str) -> None:
+        try:
+            data = make_thumbnail(fetch(url))
+        except Exception as exc:
+            log.warning("thumbnail failed for %s: %s", url, exc)
+            with self._lock:
+                self._failed[url] = self.clock()
+                self._pending.discard(url)
+            return
+        key = self.key(data)
+        if self.get(key) is None:
+            self.put(key, data)
+        ref = self.root / f"{self.key(url)}.ref"
+        tmp = ref.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(key)
+        tmp.replace(ref)
+        with self._lock:
+            self._refs[url] = key
+            self._failed.pop(url, None)
+            self._pending.discard(url)
+            self.version += 1
+
+    def _ref(self, url: str) -> str | None:
+        key = self._refs.get(url)
+        if key is None:
+            try:
+                key = (self.root / f"{self.key(url)}.ref").read_text().strip()
+            except FileNotFoundError:
+                return None
+            self._refs[url] = key
+        return key
+
+
+def _static_url(root: Path) -> str | None:
+    """``root`` 在 ``static/`` 底下時，Streamlit 提供它的相對網址；否則無法從頁面存取。"""
+    try:
+        relative = root.resolve().relative_to(STATIC_DIR.resolve())
+    except ValueError:
+        return None
+    return "/".join(("app/static", *relative.parts))
@@ -0,0 +1,745 @@
+"""本機 SQLite 儲存與背景同步到 Google Sheets。
+
+所有讀寫都走本機的 SQLite (以 (使用者, 日期, 餐別) 建索引)，畫面重繪不必等網路，
+Sheets 斷線時 App 照常運作。``SheetSync`` 在背景把本機變更推上工作表、
+把工作表上的變更拉回本機。
+
+衝突偵測：每列記下上次同步時的內容雜湊 (``synced``)。本機有未同步的修改，
+而工作表上同一列的內容也和 ``synced`` 不同，就是兩邊都改過；這時保留本機版本
+(使用者在這台裝置上最後的操作)，並把兩邊的內容記到 ``conflicts`` 表。
+
+多個程序 (各自有本機 SQLite) 共用同一張工作表：
+
+- 整張寫回前重讀一次，工作表在合併期間被其他程序改過就重新合併，不蓋掉對方剛寫的列；
+- 刪除以 ``TOMBSTONE`` 標記留在工作表上，只有看到標記才刪除本機的列。工作表上少了一列
+  (例如兩個程序同時寫入、其中一個被蓋掉) 不算刪除，由本機補寫回去並記到 ``conflicts``；
+- 刪除標記保留 ``TOMBSTONE_TTL`` 秒後從工作表清掉。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable
+
+import pandas as pd
+
+from . import trace
+from .goals import Profile
+from .models import EXERCISE, Entry
+from .storage import (
+    ENTRIES_WORKSHEET,
+    ENTRY_COLUMNS,
+    PROFILE_COLUMNS,
+    PROFILES_WORKSHEET,
+    WEIGHT_COLUMNS,
+    WEIGHTS_WORKSHEET,
+    TOMBSTONE,
+    SheetBackend,
+    entries_to_frame,
+    frame_to_entries,
+    frame_to_profiles,
+    frame_to_weigh_ins,
+    profiles_to_frame,
+    weigh_ins_to_frame,
+)
+from .streaks import WeeklyReport
+from .weights import WeighIn
+
+log = logging.getLogger(__name__)
+
+# 刪除標記在工作表上保留的時間；離線超過這麼久的程序可能把已刪除的列補寫回去
+TOMBSTONE_TTL = 30 * 86400.0
+# 寫入前重讀發現工作表被改過時，重新合併的次數上限
+SYNC_ATTEMPTS = 3
+# 一次 IN (...) 查詢的主鍵數 (SQLite 參數數量有上限)
+OWNER_BATCH = 500
+
+DEFAULT_DB_PATH = Path(os.environ.get("DIARY_DB", Path(tempfile.gettempdir()) / "diary.sqlite3"))
+
+def _mark_stale(day: str) -> str:
+    """``day`` 所在的週 (或之後) 已有報告時，把那一週記為需要重產。"""
+    week = f"date({day}, 'weekday 0', '-6 days')"
+    return (
+        f"INSERT OR REPLACE INTO stale_reports (week) SELECT {week} "
+        f"WHERE EXISTS (SELECT 1 FROM weekly_reports WHERE week >= {week});"
+    )
+
+
+def _stale_triggers(table: str, columns: list[str]) -> str:
+    """``table`` 影響報告的欄位有變動時 (新增、修改、刪除、同步拉回) 標記報告過期。"""
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in ["day", "deleted", *columns])
+    return f"""
+CREATE TRIGGER IF NOT EXISTS {table}_stale_insert AFTER INSERT ON {table} WHEN NEW.deleted = 0
+BEGIN {_mark_stale("NEW.day")} END;
+CREATE TRIGGER IF NOT EXISTS {table}_stale_update AFTER UPDATE ON {table} WHEN {changed}
+BEGIN {_mark_stale("OLD.day")} {_mark_stale("NEW.day")} END;
+CREATE TRIGGER IF NOT EXISTS {table}_stale_delete AFTER DELETE ON {table} WHEN OLD.deleted = 0
+BEGIN {_mark_stale("OLD.day")} END;
+"""
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS entries (
+    entry_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    meal TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    kcal REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    rev INTEGER NOT NULL DEFAULT 1,
+    dirty INTEGER NOT NULL DEFAULT 1,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    synced TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_user_day_meal ON entries (user_id, day, meal);
+CREATE INDEX IF NOT EXISTS entries_dirty ON entries (dirty) WHERE dirty = 1;
+
+CREATE TABLE IF NOT EXISTS weigh_ins (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    weight REAL NOT NULL,
+    body_fat REAL,
+    rev INTEGER NOT NULL DEFAULT 1,
+    dirty INTEGER NOT NULL DEFAULT 1,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    synced TEXT,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS weigh_ins_dirty ON weigh_ins (dirty) WHERE dirty = 1;
+
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    sex TEXT NOT NULL,
+    age REAL NOT NULL,
+    height REAL NOT NULL,
+    activity TEXT NOT NULL,
+    goal TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 1,
+    dirty INTEGER NOT NULL DEFAULT 1,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    synced TEXT
+);
+
+CREATE VIEW IF NOT EXISTS daily_totals AS
+SELECT
+    user_id,
+    day,
+    SUM(CASE WHEN meal = '{EXERCISE}' THEN 0 ELSE kcal END) AS intake,
+    SUM(CASE WHEN meal = '{EXERCISE}' THEN kcal ELSE 0 END) AS burned,
+    SUM(CASE WHEN meal = '{EXERCISE}' THEN 0 ELSE protein END) AS protein,
+    COUNT(*) AS count
+FROM entries
+WHERE deleted = 0
+GROUP BY user_id, day;
+
+-- 每週報告：由每日累計算出的衍生資料，只存在本機、不同步，隨時可以重算
+CREATE TABLE IF NOT EXISTS weekly_reports (
+    week TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    days_logged INTEGER NOT NULL,
+    days_under_target INTEGER NOT NULL,
+    protein_days INTEGER NOT NULL,
+    avg_intake REAL NOT NULL,
+    avg_protein REAL NOT NULL,
+    weight_change REAL,
+    streak INTEGER NOT NULL,
+    protein_streak INTEGER NOT NULL,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (week, user_id)
+);
+CREATE INDEX IF NOT EXISTS weekly_reports_user ON weekly_reports (user_id, week);
+
+-- 已有報告的週又有紀錄變動 (補登、修改、同步拉回)：從最早的一週起重產，連續天數才會接得上
+-- 序號不重複使用 (AUTOINCREMENT)，重產期間又被標記的週不會被一起清掉
+CREATE TABLE IF NOT EXISTS stale_reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    week TEXT NOT NULL UNIQUE
+);
+{_stale_triggers("entries", ["user_id", "meal", "kcal", "protein"])}
+{_stale_triggers("weigh_ins", ["weight"])}
+
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY,
+    worksheet TEXT NOT NULL,
+    key TEXT NOT NULL,
+    local TEXT,
+    remote TEXT,
+    detected_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    worksheet: str
+    columns: list[str]
+    key: list[str]
+    numeric: frozenset[str]
+    # 可以是空值的數字欄位；其他數字欄位空值視為 0
+    optional: frozenset[str] = frozenset()
+
+
+ENTRIES = TableSpec("entries", ENTRIES_WORKSHEET, ENTRY_COLUMNS, ["entry_id"], frozenset({"kcal", "protein"}))
+WEIGH_INS = TableSpec(
+    "weigh_ins",
+    WEIGHTS_WORKSHEET,
+    WEIGHT_COLUMNS,
+    ["user_id", "day"],
+    frozenset({"weight", "body_fat"}),
+    frozenset({"body_fat"}),
+)
+PROFILES = TableSpec("profiles", PROFILES_WORKSHEET, PROFILE_COLUMNS, ["user_id"], frozenset({"age", "height"}))
+
+
+def _canonical(spec: TableSpec, values: Iterable) -> tuple:
+    """統一本機與工作表的值 (Sheets 讀回來的數字可能是字串或整數)。"""
+    out = []
+    for column, value in zip(spec.columns, values):
+        if isinstance(value, str):
+            missing = not value.strip()
+        else:
+            missing = value is None or pd.isna(value)
+        if column in spec.numeric:
+            if missing:
+                out.append(None if column in spec.optional else 0.0)
+            else:
+                out.append(float(value))
+        elif missing:
+            out.append("")
+        elif column == "day":
+            out.append(str(value)[:10])
+        else:
+            out.append(str(value))
+    return tuple(out)
+
+
+def _row_hash(values: tuple) -> str:
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LocalDatabase:
+    """單一 SQLite 連線，所有執行緒共用並以鎖串行化。"""
+
+    def __init__(self, path: str | Path = DEFAULT_DB_PATH):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        # 有本機寫入時喚醒同步 worker
+        self.changed = threading.Event()
+
+    def query(self, sql: str, params: Iterable = ()) -> list[tuple]:
+        with self.lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def write(self, statements: Iterable[tuple[str, Iterable[tuple]]], notify: bool = True) -> None:
+        """在同一個交易裡執行 (sql, 多組參數)。"""
+        with self.lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        if notify:
+            self.changed.set()
+
+    def close(self) -> None:
+        with self.lock:
+            self._conn.close()
+
+
+class LocalTable:
+    """一張本機表；匯入 (``diary.transfer``) 也直接寫到這裡。"""
+
+    def __init__(self, db: LocalDatabase, spec: TableSpec):
+        self.db = db
+        self.spec = spec
+        columns = ", ".join(spec.columns)
+        marks = ", ".join("?" for _ in spec.columns)
+        keys = ", ".join(spec.key)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in spec.columns if c not in spec.key)
+        self._where_key = " AND ".join(f"{k} = ?" for k in spec.key)
+        self._select = f"SELECT {columns} FROM {spec.name}"
+        # 本機寫入：標記為未同步、版本加一
+        self._upsert = (
+            f"INSERT INTO {spec.name} ({columns}) VALUES ({marks}) ON CONFLICT ({keys}) DO UPDATE SET "
+            f"{updates}, rev = rev + 1, dirty = 1, deleted = 0"
+        )
+        # 從工作表拉回：只覆蓋本機沒有未同步修改的列
+        self._pull = (
+            f"INSERT INTO {spec.name} ({columns}, dirty, synced) VALUES ({marks}, 0, ?) ON CONFLICT ({keys}) "
+            f"DO UPDATE SET {updates}, deleted = 0, synced = excluded.synced WHERE dirty = 0"
+        )
+
+    # ---- 讀取 ----
+
+    def frame(self) -> pd.DataFrame:
+        rows = self.db.query(f"{self._select} WHERE deleted = 0")
+        return pd.DataFrame(rows, columns=self.spec.columns)
+
+    def user_frame(self, user_id: str, start: date | None = None, end: date | None = None) -> pd.DataFrame:
+        sql = f"{self._select} WHERE deleted = 0 AND user_id = ?"
+        params: list = [user_id]
+        if start is not None:
+            sql += " AND day >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            sql += " AND day <= ?"
+            params.append(end.isoformat())
+        order = " ORDER BY day, rowid" if "day" in self.spec.columns else ""
+        return pd.DataFrame(self.db.query(sql + order, params), columns=self.spec.columns)
+
+    def owners(self, keys: Iterable[str]) -> dict[str, str]:
+        """單欄主鍵 -> 該列的 user_id (含已刪除、還沒同步的墓碑)。"""
+        keys = list(keys)
+        out: dict[str, str] = {}
+        for i in range(0, len(keys), OWNER_BATCH):
+            batch = keys[i : i + OWNER_BATCH]
+            marks = ", ".join("?" for _ in batch)
+            key = self.spec.key[0]
+            out.update(self.db.query(f"SELECT {key}, user_id FROM {self.spec.name} WHERE {key} IN ({marks})", batch))
+        return out
+
+    # ---- 本機寫入 ----
+
+    def upsert(self, frame: pd.DataFrame) -> None:
+        rows = [_canonical(self.spec, row) for row in frame[self.spec.columns].itertuples(index=False)]
+        if rows:
+            self.db.write([(self._upsert, rows)])
+
+    def bulk_insert(self, rows: Iterable[tuple]) -> None:
+        """大量載入已是標準格式 (欄位順序同 ``spec.columns``) 的值，跳過逐列整理。"""
+        self.db.write([(self._upsert, rows)])
+
+    def delete(self, keys: Iterable[tuple]) -> None:
+        keys = [tuple(k) for k in keys]
+        if not keys:
+            return
+        name = self.spec.name
+        self.db.write(
+            [
+                # 從未同步過的列直接刪掉；同步過的留下墓碑，等同步時從工作表刪除
+                (f"DELETE FROM {name} WHERE {self._where_key} AND synced IS NULL", keys),
+                (f"UPDATE {name} SET deleted = 1, dirty = 1, rev = rev + 1 WHERE {self._where_key}", keys),
+            ]
+        )
+
+    def pending(self) -> int:
+        return self.db.query(f"SELECT COUNT(*) FROM {self.spec.name} WHERE dirty = 1")[0][0]
+
+    # ---- 同步 ----
+
+    def snapshot(self) -> dict[tuple, tuple[tuple, int, bool, bool, str | None]]:
+        """key -> (值, rev, dirty, deleted, synced)。"""
+        rows = self.db.query(f"SELECT {', '.join(self.spec.columns)}, rev, dirty, deleted, synced FROM {self.spec.name}")
+        n = len(self.spec.columns)
+        index = [self.spec.columns.index(k) for k in self.spec.key]
+        out = {}
+        for row in rows:
+            values = _canonical(self.spec, row[:n])
+            out[tuple(values[i] for i in index)] = (values, row[n], bool(row[n + 1]), bool(row[n + 2]), row[n + 3])
+        return out
+
+    def key_of(self, values: tuple) -> tuple:
+        return tuple(values[self.spec.columns.index(k)] for k in self.spec.key)
+
+    def apply_sync(
+        self,
+        pulled: list[tuple],
+        removed: list[tuple],
+        synced: list[tuple[tuple, int, str | None]],
+        conflicts: list[tuple[tuple, tuple | None, tuple | None]],
+    ) -> None:
+        name = self.spec.name
+        where = self._where_key
+        self.db.write(
+            [
+                (self._pull, [values + (_row_hash(values),) for values in pulled]),
+                # 工作表上已刪除、本機也沒有修改的列
+                (f"DELETE FROM {name} WHERE {where} AND dirty = 0", removed),
+                # 推送期間又被修改的列 (rev 變了) 維持未同步
+                (f"DELETE FROM {name} WHERE {where} AND rev = ? AND deleted = 1", [k + (rev,) for k, rev, h in synced if h is None]),
+                (
+                    f"UPDATE {name} SET dirty = 0, synced = ? WHERE {where} AND rev = ?",
+                    [(h,) + k + (rev,) for k, rev, h in synced if h is not None],
+                ),
+                (
+                    "INSERT INTO conflicts (worksheet, key, local, remote, detected_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (self.spec.worksheet, json.dumps(k, ensure_ascii=False), json.dumps(l, ensure_ascii=False), json.dumps(r, ensure_ascii=False), time.time())
+                        for k, l, r in conflicts
+                    ],
+                ),
+            ],
+            notify=False,
+        )
+
+
+class LocalDiaryStore:
+    """日記紀錄的本機存取。"""
+
+    def __init__(self, db: LocalDatabase):
+        self.sheet = LocalTable(db, ENTRIES)
+
+    def entries(self, user_id: str, day: date) -> list[Entry]:
+        return frame_to_entries(self.sheet.user_frame(user_id, day, day))
+
+    @trace.traced("store.entries")
+    def user_entries(self, user_id: str) -> list[Entry]:
+        return frame_to_entries(self.sheet.user_frame(user_id))
+
+    @trace.traced("store.daily_totals")
+    def daily_totals(self, user_id: str, start: date, end: date) -> pd.DataFrame:
+        rows = self.sheet.db.query(
+            "SELECT day, intake, burned, protein, count FROM daily_totals WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (user_id, start.isoformat(), end.isoformat()),
+        )
+        return pd.DataFrame(rows, columns=["day", "intake", "burned", "protein", "count"])
+
+    def logged_intake(self, user_id: str, start: date, end: date) -> list[float]:
+        """有記錄飲食的每一天的攝取熱量 (只有運動的日子不算)。"""
+        totals = self.daily_totals(user_id, start, end)
+        return totals.loc[totals["intake"] > 0, "intake"].tolist()
+
+    @trace.traced("store.all_daily_totals")
+    def all_daily_totals(self, start: date | None, end: date) -> pd.DataFrame:
+        """所有使用者 [start, end] 的每日累計，給批次工作用；``start`` 為 None 時從頭開始。"""
+        rows = self.sheet.db.query(
+            "SELECT user_id, day, intake, burned, protein FROM daily_totals WHERE day BETWEEN ? AND ?",
+            ((start or date.min).isoformat(), end.isoformat()),
+        )
+        return pd.DataFrame(rows, columns=["user_id", "day", "intake", "burned", "protein"])
+
+    def unparsed(self, user_id: str | None = None) -> list[Entry]:
+        """缺營養資料 (0 kcal、沒有蛋白質) 的飲食紀錄，給批次辨識補齊。"""
+        sql = f"{self.sheet._select} WHERE deleted = 0 AND kcal = 0 AND protein = 0 AND meal != ? AND name != ''"
+        params: list = [EXERCISE]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        return frame_to_entries(pd.DataFrame(self.sheet.db.query(sql, params), columns=ENTRY_COLUMNS))
+
+    def add(self, entries: Iterable[Entry]) -> None:
+        self.sheet.upsert(entries_to_frame(entries))
+
+    def remove(self, entry_ids: Iterable[str]) -> None:
+        self.sheet.delete((entry_id,) for entry_id in entry_ids)
+
+    def flush(self) -> None:
+        # 已寫入本機；推上工作表由 SheetSync 負責
+        pass
+
+
+class LocalWeightStore:
+    """體重紀錄的本機存取。"""
+
+    def __init__(self, db: LocalDatabase):
+        self.sheet = LocalTable(db, WEIGH_INS)
+
+    @trace.traced("store.weigh_ins")
+    def user_weigh_ins(self, user_id: str) -> list[WeighIn]:
+        return frame_to_weigh_ins(self.sheet.user_frame(user_id))
+
+    def all_weigh_ins(self, end: date) -> list[WeighIn]:
+        """所有使用者到 ``end`` 為止的體重，給批次工作用。"""
+        rows = self.sheet.db.query(f"{self.sheet._select} WHERE deleted = 0 AND day <= ?", (end.isoformat(),))
+        return frame_to_weigh_ins(pd.DataFrame(rows, columns=WEIGHT_COLUMNS))
+
+    def add(self, weigh_ins: Iterable[WeighIn]) -> None:
+        self.sheet.upsert(weigh_ins_to_frame(weigh_ins))
+
+    def flush(self) -> None:
+        pass
+
+
+class LocalProfileStore:
+    """個人資料 (計算熱量/蛋白質目標用)。"""
+
+    def __init__(self, db: LocalDatabase):
+        self.sheet = LocalTable(db, PROFILES)
+
+    @trace.traced("store.profile")
+    def get(self, user_id: str) -> Profile | None:
+        profiles = frame_to_profiles(self.sheet.user_frame(user_id))
+        return profiles[0] if profiles else None
+
+    def all(self) -> list[Profile]:
+        return frame_to_profiles(self.sheet.frame())
+
+    def save(self, profile: Profile) -> None:
+        self.sheet.upsert(profiles_to_frame([profile]))
+
+
+class LocalReportStore:
+    """每週報告 (``diary.reports`` 產生)。"""
+
+    COLUMNS = [
+        "week", "user_id", "days_logged", "days_under_target", "protein_days",
+        "avg_intake", "avg_protein", "weight_change", "streak", "protein_streak",
+    ]
+
+    def __init__(self, db: LocalDatabase):
+        self.db = db
+        self._select = f"SELECT {', '.join(self.COLUMNS)} FROM weekly_reports"
+
+    def save(self, reports: Iterable[WeeklyReport]) -> None:
+        now = time.time()
+        rows = [
+            (
+                r.week.isoformat(), r.user_id, r.days_logged, r.days_under_target, r.protein_days,
+                r.avg_intake, r.avg_protein, r.weight_change, r.streak, r.protein_streak, now,
+            )
+            for r in reports
+        ]
+        marks = ", ".join("?" for _ in range(len(self.COLUMNS) + 1))
+        self.db.write(
+            [(f"INSERT OR REPLACE INTO weekly_reports ({', '.join(self.COLUMNS)}, computed_at) VALUES ({marks})", rows)],
+            notify=False,
+        )
+
+    def week(self, week: date) -> dict[str, WeeklyReport]:
+        rows = self.db.query(f"{self._select} WHERE week = ?", (week.isoformat(),))
+        return {row[1]: self._report(row) for row in rows}
+
+    def has_week(self, week: date) -> bool:
+        return bool(self.db.query("SELECT 1 FROM weekly_reports WHERE week = ? LIMIT 1", (week.isoformat(),)))
+
+    def latest(self, user_id: str) -> WeeklyReport | None:
+        rows = self.db.query(f"{self._select} WHERE user_id = ? ORDER BY week DESC LIMIT 1", (user_id,))
+        return self._report(rows[0]) if rows else None
+
+    def stale(self) -> tuple[date | None, int]:
+        """(需要重產的最早一週, 標記序號)；重產完以序號呼叫 ``clear_stale``。"""
+        week, marker = self.db.query("SELECT MIN(week), MAX(id) FROM stale_reports")[0]
+        return (date.fromisoformat(week) if week else None), marker or 0
+
+    def clear_stale(self, marker: int) -> None:
+        """清掉 ``marker`` (含) 之前的標記；重產期間新標記的週留到下一次。"""
+        self.db.write([("DELETE FROM stale_reports WHERE id <= ?", [(marker,)])], notify=False)
+
+    def latest_week(self, user_id: str) -> date | None:
+        rows = self.db.query("SELECT MAX(week) FROM weekly_reports WHERE user_id = ?", (user_id,))
+        return date.fromisoformat(rows[0][0]) if rows[0][0] else None
+
+    @staticmethod
+    def _report(row: tuple) -> WeeklyReport:
+        week, user_id, *values = row
+        return WeeklyReport(user_id, date.fromisoformat(week), *values)
+
+
+@dataclass
+class SyncResult:
+    pushed: int = 0
+    pulled: int = 0
+    removed: int = 0
+    # 工作表上不見了 (沒有刪除標記) 而由本機補寫回去的列
+    restored: int = 0
+    conflicts: int = 0
+
+
+@dataclass
+class _SyncPlan:
+    """一張表合併的結果：要套用到本機的變更，與要整張寫回工作表的內容 (不需寫入時為 None)。"""
+
+    pulled: list[tuple] = field(default_factory=list)
+    removed: list[tuple] = field(default_factory=list)
+    synced: list[tuple] = field(default_factory=list)
+    conflicts: list[tuple] = field(default_factory=list)
+    users: set[str] = field(default_factory=set)
+    restored: int = 0
+    out: pd.DataFrame | None = None
+
+
+class SheetSync:
+    """背景同步。本機有寫入時等 ``delay`` 秒把同一波變更一起推送；
+    沒有寫入時每 ``interval`` 秒拉一次工作表。Sheets 失敗時指數退避，本機照常讀寫。"""
+
+    def __init__(
+        self,
+        db: LocalDatabase,
+        backend: SheetBackend,
+        tables: Iterable[LocalTable] | None = None,
+        interval: float = 60.0,
+        delay: float = 2.0,
+        max_backoff: float = 300.0,
+        on_change: Callable[[set[str]], None] | None = None,
+    ):
+        self.db = db
+        self.backend = backend
+        self.tables = list(tables) if tables is not None else [LocalTable(db, spec) for spec in (ENTRIES, WEIGH_INS, PROFILES)]
+        self.interval = interval
+        self.delay = delay
+        self.max_backoff = max_backoff
+        # 拉回工作表上的變更後，以受影響的 user_id 呼叫
+        self.on_change = on_change
+        self.last_error: str | None = None
+        self.last_sync: float | None = None
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def start(self) -> SheetSync:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="sheet-sync", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.db.changed.set()
+
+    @property
+    def online(self) -> bool:
+        return self.last_error is None
+
+    def sync(self) -> SyncResult:
+        """同步所有表一次；工作表讀寫失敗時拋出例外。"""
+        total = SyncResult()
+        changed: set[str] = set()
+        error: Exception | None = None
+        for table in self.tables:
+            # 一張表失敗 (例如工作表不存在) 不影響其他表
+            try:
+                with trace.span(f"sync.{table.spec.worksheet}"):
+                    result = self._sync_table(table, changed)
+            except Exception as exc:
+                trace.count("sync.errors")
+                error = error or exc
+                continue
+            total.pushed += result.pushed
+            total.pulled += result.pulled
+            total.removed += result.removed
+            total.restored += result.restored
+            total.conflicts += result.conflicts
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+        if error is not None:
+            raise error
+        self.last_error = None
+        self.last_sync = time.time()
+        return total
+
+    def _run(self) -> None:
+        backoff = self.delay
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                backoff = self.delay
+                timeout = self.interval
+            except Exception as exc:
+                self.last_error = str(exc)
+                log.warning("sheet sync failed, retrying in %.0fs: %s", backoff, exc)
+                timeout = backoff
+                backoff = min(backoff * 2, self.max_backoff)
+            if self.db.changed.wait(timeout):
+                # 等一小段時間，讓連續的寫入併成一次推送
+                self._stop.wait(self.delay)
+                self.db.changed.clear()
+
+    def _sync_table(self, table: LocalTable, changed: set[str]) -> SyncResult:
+        spec = table.spec
+        for attempt in range(SYNC_ATTEMPTS):
+            remote = self._remote(table, self.backend.read(spec.worksheet))
+            plan = self._merge(table, remote)
+            if plan.out is not None:
+                # 合併期間其他程序寫過工作表：重新合併，不蓋掉對方的列
+                if self._remote(table, self.backend.read(spec.worksheet)) != remote:
+                    trace.count("sync.retries")
+                    continue
+                self.backend.write(spec.worksheet, plan.out)
+            table.apply_sync(plan.pulled, plan.removed, plan.synced, plan.conflicts)
+            changed.update(plan.users)
+            if plan.conflicts:
+                log.warning("%d sync conflicts in %s; kept local versions", len(plan.conflicts), spec.worksheet)
+            return SyncResult(
+                pushed=len(plan.synced),
+                pulled=len(plan.pulled),
+                removed=len(plan.removed),
+                restored=plan.restored,
+                conflicts=len(plan.conflicts),
+            )
+        raise RuntimeError(f"worksheet {spec.worksheet} kept changing during sync; will retry")
+
+    @staticmethod
+    def _remote(table: LocalTable, frame: pd.DataFrame) -> dict[tuple, tuple[tuple, float | None]]:
+        """工作表的列：key -> (值, 刪除時間)。"""
+        spec = table.spec
+        frame = frame.dropna(how="all").reindex(columns=[*spec.columns, TOMBSTONE])
+        deleted = pd.to_numeric(frame[TOMBSTONE], errors="coerce")
+        remote = {}
+        for row, tombstone in zip(frame[spec.columns].itertuples(index=False), deleted):
+            values = _canonical(spec, row)
+            remote[table.key_of(values)] = (values, None if pd.isna(tombstone) else float(tombstone))
+        return remote
+
+    @staticmethod
+    def _merge(table: LocalTable, remote: dict[tuple, tuple[tuple, float | None]]) -> _SyncPlan:
+        spec = table.spec
+        local = table.snapshot()
+        user = spec.columns.index("user_id")
+        now = time.time()
+
+        plan = _SyncPlan()
+        # 要寫回工作表的列：key -> (值, 刪除時間)
+        merged: dict[tuple, tuple[tuple, float | None]] = {}
+        pulled, removed, synced, conflicts, users = plan.pulled, plan.removed, plan.synced, plan.conflicts, plan.users
+        for key in local.keys() | remote.keys():
+            theirs, tombstone = remote.get(key, (None, None))
+            if tombstone is not None and now - tombstone < TOMBSTONE_TTL:
+                merged[key] = (theirs, tombstone)
+            if key not in local:
+                if tombstone is None:
+                    pulled.append(theirs)
+                    merged[key] = (theirs, None)
+                    users.add(theirs[user])
+                continue
+            values, rev, dirty, deleted, last = local[key]
+            if not dirty:
+                if tombstone is not None:
+                    removed.append(key)
+                    users.add(values[user])
+                elif theirs is None:
+                    # 沒有刪除標記卻不見了：補寫回去
+                    merged[key] = (values, None)
+                    conflicts.append((key, values, None))
+                    plan.restored += 1
+                else:
+                    if _row_hash(theirs) != last:
+                        pulled.append(theirs)
+                        users.add(theirs[user])
+                    merged[key] = (theirs, None)
+                continue
+            # 本機有未同步的修改
+            remote_hash = None if theirs is None or tombstone is not None else _row_hash(theirs)
+            local_hash = None if deleted else _row_hash(values)
+            if remote_hash not in (last, local_hash):
+                conflicts.append((key, None if deleted else values, None if tombstone is not None else theirs))
+            if deleted:
+                merged[key] = (values, tombstone or now)
+                synced.append((key, rev, None))
+            else:
+                merged[key] = (values, None)
+                synced.append((key, rev, _row_hash(values)))
+
+        if synced or plan.restored:
+            plan.out = pd.DataFrame(
+                [values + (tombstone,) for values, tombstone in merged.values()],
+                columns=[*spec.columns, TOMBSTONE],
+            )
+        return plan
@@ -0,0 +1,33 @@
+"""日記資料模型。"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+# 餐別 (key -> 顯示名稱)
+MEALS = {
+    "breakfast": "早餐",
+    "lunch": "午餐",
+    "dinner": "晚餐",
+    "snack": "點心",
+}
+# 運動消耗也記在日記裡，熱量算在「燃燒」
+EXERCISE = "exercise"
+
+
+@dataclass(frozen=True)
+class Entry:
+    """日記中的一筆紀錄 (一項食物或一次運動)。"""
+
+    entry_id: str
+    user_id: str
+    day: date
+    meal: str
+    name: str
+    kcal: float
+    protein: float = 0.0
+
+    @property
+    def is_exercise(self) -> bool:
+        return self.meal == EXERCISE
@@ -0,0 +1,142 @@
+"""靈感廚房的食譜推薦。
+
+依當天剩餘熱量與蛋白質缺口，以 NumPy 一次為整個食譜庫 (上萬筆) 計分，
+依飲食類型篩選後取前 k 名。結果依 (使用者, 當日狀態區間, 篩選) 快取，
+切換分頁時不必重新排序整個食譜庫。
+"""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from .cache import LRUCache
+from .models import MEALS
+
+RECIPES_CSV = Path(__file__).parent / "data" / "recipes.csv"
+
+# 篩選標籤 (key -> 顯示名稱)
+FILTERS = {
+    "vegan": "全素推薦",
+    "lacto-ovo": "蛋奶素",
+    "light": "低卡輕食",
+}
+DIETS = ("vegan", "lacto-ovo")
+LIGHT_KCAL = 350
+
+# 快取鍵的區間寬度：剩餘熱量每 50 kcal、蛋白質缺口每 5g 算同一個狀態
+KCAL_BUCKET = 50
+PROTEIN_BUCKET = 5
+
+
+@dataclass(frozen=True)
+class Recipe:
+    name: str
+    meal: str
+    kcal: float
+    protein: float
+    diet: str
+    image: str = ""
+
+    @property
+    def meal_label(self) -> str:
+        return MEALS.get(self.meal, "")
+
+
+class RecipeCatalog:
+    """食譜庫；營養欄位另存成 NumPy 陣列供向量化計分。"""
+
+    def __init__(self, recipes: Sequence[Recipe]):
+        self.recipes = tuple(recipes)
+        self.kcal = np.array([r.kcal for r in self.recipes], dtype=float)
+        self.protein = np.array([r.protein for r in self.recipes], dtype=float)
+        self.diet = np.array([DIETS.index(r.diet) for r in self.recipes], dtype=np.int8)
+
+    @classmethod
+    def from_csv(cls, path: Path = RECIPES_CSV) -> RecipeCatalog:
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(
+                [
+                    Recipe(
+                        name=row["name"],
+                        meal=row["meal"],
+                        kcal=float(row["kcal"]),
+                        protein=float(row["protein"]),
+                        diet=row["diet"],
+                        image=row.get("image") or "",
+                    )
+                    for row in csv.DictReader(f)
+                ]
+            )
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def mask(self, diet_filter: str) -> np.ndarray:
+        if diet_filter == "vegan":
+            return self.diet == DIETS.index("vegan")
+        if diet_filter == "light":
+            return self.kcal <= LIGHT_KCAL
+        # 蛋奶素也可以吃全素的食譜
+        return np.ones(len(self.recipes), dtype=bool)
+
+    def score(self, remaining_kcal: float, protein_gap: float) -> np.ndarray:
+        """熱量越接近一餐的合理份量、越能補足蛋白質缺口，分數越高。"""
+        target = float(np.clip(remaining_kcal, 150, 700))
+        kcal_fit = 1 - np.minimum(np.abs(self.kcal - target) / target, 1)
+        if protein_gap > 0:
+            protein_fit = np.minimum(self.protein, protein_gap) / protein_gap
+        else:
+            protein_fit = np.zeros_like(self.protein)
+        # 會讓當天超標的食譜扣分
+        over = self.kcal > max(remaining_kcal, 0) + 50
+        return 0.6 * kcal_fit + 0.4 * protein_fit - 0.5 * over
+
+    def top_k(self, remaining_kcal: float, protein_gap: float, diet_filter: str, k: int = 6) -> list[Recipe]:
+        scores = np.where(self.mask(diet_filter), self.score(remaining_kcal, protein_gap), -np.inf)
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.recipes[i] for i in top]
+
+
+class RecipeRecommender:
+    """以當日狀態區間快取的推薦結果。"""
+
+    def __init__(self, catalog: RecipeCatalog, cache: LRUCache[tuple[Recipe, ...]] | None = None):
+        self.catalog = catalog
+        self.cache = cache if cache is not None else LRUCache(maxsize=2048, name="recipes")
+
+    def recommend(
+        self,
+        user_id: str,
+        remaining_kcal: float,
+        protein_gap: float,
+        diet_filter: str = "vegan",
+        k: int = 6,
+    ) -> list[Recipe]:
+        kcal_bucket = int(remaining_kcal // KCAL_BUCKET)
+        protein_bucket = int(max(protein_gap, 0) // PROTEIN_BUCKET)
+        key = (user_id, kcal_bucket, protein_bucket, diet_filter, k)
+        cached = self.cache.get(key)
+        if cached is None:
+            # 以區間中點計分，同一區間內的結果一致
+            cached = tuple(
+                self.catalog.top_k(
+                    (kcal_bucket + 0.5) * KCAL_BUCKET,
+                    (protein_bucket + 0.5) * PROTEIN_BUCKET if protein_gap > 0 else 0.0,
+                    diet_filter,
+                    k,
+                )
+            )
+            self.cache.set(key, cached)
+        return list(cached)
+
+    def invalidate_user(self, user_id: str) -> int:
+        return self.cache.discard(lambda key: key[0] == user_id)
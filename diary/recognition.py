@@ -0,0 +1,255 @@
+"""Gemini 食物辨識。
+
+照片或文字 (例如「地瓜 (中)」) 送給 Gemini，回傳結構化的熱量/蛋白質。
+結果以輸入內容的雜湊快取，相同的輸入同時進來時只呼叫模型一次。
+同一張便當、豆漿照片一天會被記錄上百次，重複的輸入應該立即回傳。
+
+一個輸入可能有多項食物 (便當照片、「無糖豆漿 + 地瓜(中)」)，模型一次回傳每一項。
+``recognize_batch`` 把多筆文字合成一個 prompt，補齊大量舊紀錄時不必逐筆呼叫。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Protocol, Sequence
+
+from . import trace
+from .cache import LRUCache
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+PROMPT = """你是營養師。請辨識輸入中的每一項食物，估計份量與營養。
+輸入可能有多項食物 (例如「無糖豆漿 + 地瓜(中)」或一整個便當)，每一項分開列出。
+只回傳 JSON 陣列，每一項格式為 {"name": 食物名稱(繁體中文), "kcal": 熱量(大卡), "protein": 蛋白質(公克)}。"""
+
+BATCH_PROMPT = """你是營養師。輸入的每一行是一筆飲食紀錄，行首為編號。
+請辨識每一筆中的每一項食物，估計份量與營養；一筆有多項食物時分開列出。
+只回傳 JSON 物件，key 為編號，value 為該筆的食物陣列，
+每一項格式為 {"name": 食物名稱(繁體中文), "kcal": 熱量(大卡), "protein": 蛋白質(公克)}。"""
+
+# 文字輸入中分隔多項食物的符號 (NFKC 之後全形已轉成半形)
+SEPARATORS = re.compile(r"\s*[+、,;&]\s*")
+
+
+class RecognitionError(Exception):
+    """模型回應無法解析。"""
+
+
+class RequestTooLargeError(RecognitionError):
+    """請求超過模型的大小或 token 上限 (HTTP 413、400)，拆成較小的請求再送。"""
+
+
+class RateLimitError(Exception):
+    """模型的速率限制或配額用盡 (HTTP 429)，稍後重試即可。"""
+
+
+@dataclass(frozen=True)
+class FoodItem:
+    name: str
+    kcal: float
+    protein: float = 0.0
+
+
+class Model(Protocol):
+    def generate(self, prompt: str, image: bytes | None = None) -> str: ...
+
+
+class GeminiModel:
+    """google-generativeai 的包裝。"""
+
+    def __init__(self, api_key: str, model_name: str = DEFAULT_MODEL):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(
+            model_name,
+            generation_config={"response_mime_type": "application/json"},
+        )
+
+    def generate(self, prompt: str, image: bytes | None = None) -> str:
+        parts: list[object] = [prompt]
+        if image is not None:
+            parts.append({"mime_type": "image/jpeg", "data": image})
+        try:
+            return self._model.generate_content(parts).text
+        except Exception as exc:
+            # google.api_core.exceptions.ResourceExhausted (429)
+            code = getattr(exc, "code", None)
+            if code == 429 or type(exc).__name__ == "ResourceExhausted":
+                raise RateLimitError(str(exc)) from exc
+            # google.api_core.exceptions.InvalidArgument：輸入 token 超過上限
+            if code == 413 or (code == 400 and any(w in str(exc).lower() for w in ("token", "size", "too large"))):
+                raise RequestTooLargeError(str(exc)) from exc
+            raise
+
+
+class StubModel:
+    """離線用的假模型：依文字查表回應，不需要網路。"""
+
+    def __init__(self, responses: dict[str, list[dict]] | None = None, delay: float = 0.0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, image: bytes | None = None) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if prompt.startswith(BATCH_PROMPT):
+            lines = re.findall(r"^(\d+)\. (.*)$", prompt, flags=re.M)
+            return json.dumps({n: self._lookup(text) for n, text in lines}, ensure_ascii=False)
+        _, marker, text = prompt.rpartition("輸入：")
+        return json.dumps(self._lookup(text) if marker else [], ensure_ascii=False)
+
+    def _lookup(self, text: str) -> list[dict]:
+        items: list[dict] = []
+        for part in split_text(text):
+            items.extend(next((v for k, v in self.responses.items() if k in part), []))
+        return items
+
+
+def normalize_text(text: str) -> str:
+    # 全形/半形、多餘空白不影響快取命中
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def split_text(text: str) -> list[str]:
+    """「無糖豆漿 + 地瓜(中)」-> ["無糖豆漿", "地瓜(中)"]。"""
+    return [part for part in SEPARATORS.split(normalize_text(text)) if part]
+
+
+def input_key(text: str | None = None, image: bytes | None = None) -> str:
+    digest = hashlib.sha256()
+    if text:
+        digest.update(b"text:" + normalize_text(text).encode("utf-8"))
+    if image is not None:
+        digest.update(b"image:" + hashlib.sha256(image).digest())
+    return digest.hexdigest()
+
+
+def _load_json(raw: str):
+    # 模型偶爾會包上 ```json ... ```
+    raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise RecognitionError(f"模型回應不是 JSON: {raw[:80]!r}") from exc
+
+
+def _to_items(data) -> list[FoodItem]:
+    if isinstance(data, dict):
+        data = data.get("items", [data])
+    try:
+        return [
+            FoodItem(str(item["name"]), float(item["kcal"]), float(item.get("protein") or 0))
+            for item in data
+        ]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise RecognitionError(f"模型回應格式錯誤: {str(data)[:80]!r}") from exc
+
+
+def parse_items(raw: str) -> list[FoodItem]:
+    return _to_items(_load_json(raw))
+
+
+def parse_batch(raw: str) -> dict[str, list[FoodItem]]:
+    """批次回應 -> {編號: 食物}；格式錯誤的那幾筆略過，不影響其他筆。"""
+    data = _load_json(raw)
+    if isinstance(data, list):
+        # 也接受 [{"id": 1, "items": [...]}, ...]
+        data = {str(row.get("id")): row.get("items", []) for row in data if isinstance(row, dict)}
+    if not isinstance(data, dict):
+        raise RecognitionError(f"模型回應格式錯誤: {raw[:80]!r}")
+    out = {}
+    for number, items in data.items():
+        try:
+            out[str(number)] = _to_items(items)
+        except RecognitionError:
+            continue
+    return out
+
+
+class FoodRecognizer:
+    """有快取、會合併相同請求的辨識流程。"""
+
+    def __init__(self, model: Model, cache: LRUCache[tuple[FoodItem, ...]] | None = None):
+        self.model = model
+        self.cache = cache if cache is not None else LRUCache(maxsize=4096, name="gemini")
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+
+    def recognize(self, text: str | None = None, image: bytes | None = None) -> list[FoodItem]:
+        if not text and image is None:
+            return []
+        key = input_key(text, image)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        with self._lock:
+            # 取得鎖之前，前一個請求可能剛好完成
+            cached = self.cache.get(key)
+            if cached is not None:
+                return list(cached)
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            # 已有相同請求在跑，等它的結果
+            return list(future.result())
+
+        try:
+            prompt = PROMPT if not text else f"{PROMPT}\n\n輸入：{normalize_text(text)}"
+            with trace.span("gemini.generate"):
+                items = tuple(parse_items(self.model.generate(prompt, image)))
+            self.cache.set(key, items)
+            future.set_result(items)
+            return list(items)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def recognize_batch(self, texts: Sequence[str]) -> dict[str, list[FoodItem]]:
+        """多筆文字一次呼叫模型；回傳 {原文字: 食物}。
+
+        已快取的不送出，相同內容只送一次。模型漏掉或格式錯誤的筆不在結果中，
+        由呼叫端決定是否重試。
+        """
+        results: dict[str, list[FoodItem]] = {}
+        todo: dict[str, list[str]] = {}
+        for text in texts:
+            if not text:
+                continue
+            key = input_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[text] = list(cached)
+            else:
+                todo.setdefault(key, []).append(text)
+        if not todo:
+            return results
+        keys = list(todo)
+        lines = "\n".join(f"{n}. {normalize_text(todo[key][0])}" for n, key in enumerate(keys, 1))
+        with trace.span("gemini.batch"):
+            parsed = parse_batch(self.model.generate(f"{BATCH_PROMPT}\n\n輸入：\n{lines}"))
+        trace.count("gemini.batch_items", len(keys))
+        for n, key in enumerate(keys, 1):
+            items = parsed.get(str(n))
+            if items is None:
+                continue
+            self.cache.set(key, tuple(items))
+            for text in todo[key]:
+                results[text] = list(items)
+        return results
@@ -0,0 +1,227 @@
+"""每週報告的批次工作。
+
+所有使用者一起處理：一個查詢讀出該週的每日累計，以 pandas 向量化算出每人的記錄天數、
+達標天數與平均，寫入 ``weekly_reports``。
+
+連續天數沿用上一週的報告：整週都達標就是上週的連續天數 + 7，否則只看週內從週日往回數。
+沒有上一週報告的使用者 (第一次執行、新使用者) 才讀完整歷史重算。
+已有報告的週又有紀錄變動 (補登、修改、同步拉回、批次補齊)，本機資料庫的 trigger 會把那一週
+記到 ``stale_reports``；``WeeklyReportJob`` 從最早的一週起逐週重產，之後各週的連續天數跟著更正。
+
+    python -m diary.reports                     # 上一個完整的週
+    python -m diary.reports --since 2024-01-01  # 從該週起到上一週，逐週重產
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable
+
+from . import trace
+from .goals import ADAPTIVE_DAYS, DEFAULT_GOALS, GoalEngine, Goals, IntakeSource
+from .local import LocalDatabase, LocalDiaryStore, LocalProfileStore, LocalReportStore, LocalWeightStore
+from .streaks import WeeklyReport, trailing_streak, week_start
+from .weights import WeightSeries
+
+log = logging.getLogger(__name__)
+
+
+def last_complete_week(today: date) -> date:
+    return week_start(today) - timedelta(days=7)
+
+
+class ReportBuilder:
+    def __init__(self, db: LocalDatabase):
+        self.diary = LocalDiaryStore(db)
+        self.weights = LocalWeightStore(db)
+        self.profiles = LocalProfileStore(db)
+        self.reports = LocalReportStore(db)
+
+    def build(self, week: date) -> list[WeeklyReport]:
+        week = week_start(week)
+        end = week + timedelta(days=6)
+        with trace.span("reports.build"):
+            frame = self.diary.all_daily_totals(week, end)
+            previous = self.reports.week(week - timedelta(days=7))
+            series = self._series(end)
+            # 這週沒有紀錄、上週還有連續天數的使用者也要一份報告 (連續天數歸零)
+            users = sorted(set(frame["user_id"]) | {u for u, r in previous.items() if r.streak or r.protein_streak})
+            goals = self._goals(users, series)
+
+            frame["logged"] = frame["intake"] > 0
+            frame["under"] = frame["logged"] & (frame["intake"] <= frame["user_id"].map(lambda u: goals[u].target_kcal))
+            frame["hit"] = frame["logged"] & (frame["protein"] >= frame["user_id"].map(lambda u: goals[u].protein_goal))
+            logged = frame[frame["logged"]]
+            counts = frame.groupby("user_id")[["logged", "under", "hit"]].sum()
+            means = logged.groupby("user_id")[["intake", "protein"]].mean()
+            days = {
+                metric: frame[frame[metric]].groupby("user_id")["day"].agg(lambda d: [date.fromisoformat(x) for x in d]).to_dict()
+                for metric in ("under", "hit")
+            }
+
+            streaks = {}
+            bootstrap = []
+            for user in users:
+                values = []
+                for metric, field in (("under", "streak"), ("hit", "protein_streak")):
+                    run = trailing_streak(days[metric].get(user, ()), end)
+                    if run == 7:
+                        prev = previous.get(user)
+                        if prev is None:
+                            bootstrap.append(user)
+                            run = None
+                        else:
+                            run = getattr(prev, field) + 7
+                    values.append(run)
+                streaks[user] = values
+            if bootstrap:
+                self._bootstrap(set(bootstrap), end, goals, streaks)
+
+            reports = []
+            for user in users:
+                count = counts.loc[user] if user in counts.index else None
+                mean = means.loc[user] if user in means.index else None
+                reports.append(
+                    WeeklyReport(
+                        user_id=user,
+                        week=week,
+                        days_logged=int(count["logged"]) if count is not None else 0,
+                        days_under_target=int(count["under"]) if count is not None else 0,
+                        protein_days=int(count["hit"]) if count is not None else 0,
+                        avg_intake=round(float(mean["intake"])) if mean is not None else 0.0,
+                        avg_protein=round(float(mean["protein"]), 1) if mean is not None else 0.0,
+                        weight_change=series[user].change(week, end) if user in series else None,
+                        streak=streaks[user][0],
+                        protein_streak=streaks[user][1],
+                    )
+                )
+        return reports
+
+    def run(self, week: date) -> list[WeeklyReport]:
+        reports = self.build(week)
+        self.reports.save(reports)
+        log.info("weekly reports for %s: %d users", week_start(week), len(reports))
+        return reports
+
+    def run_since(self, since: date, until: date) -> int:
+        """從 ``since`` 那一週逐週重產到 ``until`` 那一週，每週沿用前一週剛算好的連續天數。"""
+        week, total = week_start(since), 0
+        while week <= week_start(until):
+            total += len(self.run(week))
+            week += timedelta(days=7)
+        return total
+
+    def _series(self, end: date) -> dict[str, WeightSeries]:
+        by_user = defaultdict(list)
+        for weigh_in in self.weights.all_weigh_ins(end):
+            by_user[weigh_in.user_id].append(weigh_in)
+        return {user: WeightSeries(weigh_ins) for user, weigh_ins in by_user.items()}
+
+    def _goals(self, users: list[str], series: dict[str, WeightSeries]) -> dict[str, Goals]:
+        """和畫面上相同的目標 (同一個 GoalEngine)；沒有個人資料的使用者用預設值。"""
+        engine = GoalEngine(self._intake([series[u] for u in users if u in series]))
+        profiles = {p.user_id: p for p in self.profiles.all()}
+        return {
+            user: engine.goals(user, profiles.get(user), series[user]) if user in series else DEFAULT_GOALS
+            for user in users
+        }
+
+    def _intake(self, series: list[WeightSeries]) -> IntakeSource:
+        """一個查詢讀出所有人校正期間的每日攝取，取代每位使用者各查一次。"""
+        latest = [s.latest_day for s in series if s.latest_day is not None]
+        if not latest:
+            return lambda user_id, start, end: []
+        frame = self.diary.all_daily_totals(min(latest) - timedelta(days=ADAPTIVE_DAYS - 1), max(latest))
+        frame = frame[frame["intake"] > 0]
+        by_user = {user: rows for user, rows in frame.groupby("user_id")}
+
+        def intake(user_id: str, start: date, end: date) -> list[float]:
+            rows = by_user.get(user_id)
+            if rows is None:
+                return []
+            return rows.loc[rows["day"].between(start.isoformat(), end.isoformat()), "intake"].tolist()
+
+        return intake
+
+    def _bootstrap(self, users: set[str], end: date, goals: dict[str, Goals], streaks: dict[str, list]) -> None:
+        """沒有上週報告、整週又都達標的使用者，讀完整歷史算連續天數。"""
+        history = self.diary.all_daily_totals(None, end)
+        history = history[history["user_id"].isin(users) & (history["intake"] > 0)]
+        for user, rows in history.groupby("user_id"):
+            target, protein = goals[user].target_kcal, goals[user].protein_goal
+            days = [date.fromisoformat(d) for d in rows["day"]]
+            under = [d for d, kcal in zip(days, rows["intake"]) if kcal <= target]
+            hit = [d for d, grams in zip(days, rows["protein"]) if grams >= protein]
+            values = streaks[user]
+            if values[0] is None:
+                values[0] = trailing_streak(under, end)
+            if values[1] is None:
+                values[1] = trailing_streak(hit, end)
+
+
+class WeeklyReportJob:
+    """背景排程：每 ``interval`` 秒重產過期的週，並檢查上一個完整的週是否已有報告，沒有就產生。"""
+
+    def __init__(self, db: LocalDatabase, interval: float = 3600.0, today: Callable[[], date] = date.today):
+        self.builder = ReportBuilder(db)
+        self.interval = interval
+        self.today = today
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def run_pending(self) -> bool:
+        week = last_complete_week(self.today())
+        since, marker = self.builder.reports.stale()
+        if since is not None:
+            # 從最早被改動的一週重產到上一週 (上一週還沒有報告也一起產生)
+            self.builder.run_since(min(since, week), week)
+            self.builder.reports.clear_stale(marker)
+            return True
+        if self.builder.reports.has_week(week):
+            return False
+        self.builder.run(week)
+        return True
+
+    def start(self) -> WeeklyReportJob:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="weekly-reports", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                log.exception("weekly report job failed")
+            self._stop.wait(self.interval)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m diary.reports", description="產生所有使用者的每週報告")
+    parser.add_argument("--week", type=date.fromisoformat, help="該週的任一天；預設為上一個完整的週")
+    parser.add_argument("--since", type=date.fromisoformat, help="從該週起逐週重產到 --week")
+    parser.add_argument("--db", help="SQLite 路徑 (預設同 App)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    db = LocalDatabase(args.db) if args.db else LocalDatabase()
+    builder = ReportBuilder(db)
+    week = args.week or last_complete_week(date.today())
+    if args.since:
+        builder.run_since(args.since, week)
+    else:
+        builder.run(week)
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
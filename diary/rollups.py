@@ -0,0 +1,110 @@
+"""餐別熱量的日/週/月彙總表。
+
+熱量來源甜甜圈圖與各區間的檢視只讀一列預先算好的彙總，不必每次把所有餐點分組加總。
+每列是一個依 MEALS 順序排列的 NumPy 向量，紀錄變動時以向量加減更新；
+``rebuild`` 以 pandas 從原始日記整批重算，``verify`` 檢查兩者一致。
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from . import trace
+from .models import MEALS, Entry
+
+MEAL_KEYS = list(MEALS)
+MEAL_INDEX = {meal: i for i, meal in enumerate(MEAL_KEYS)}
+PERIODS = ("day", "week", "month")
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"unknown period: {period}")
+
+
+class MealRollups:
+    """每個 (使用者, 區間, 起始日) 一個餐別熱量向量。"""
+
+    def __init__(self, entries: Iterable[Entry] = ()):
+        self._lock = threading.Lock()
+        self._tables: dict[str, dict[tuple[str, date], np.ndarray]] = {p: {} for p in PERIODS}
+        self.rebuild(entries)
+
+    def apply(self, entry: Entry, sign: int) -> None:
+        """SummaryEngine 的監聽器：紀錄新增 (+1) 或刪除 (-1) 時更新三張表。"""
+        meal = MEAL_INDEX.get(entry.meal)
+        if meal is None:
+            return
+        with self._lock:
+            for period, table in self._tables.items():
+                key = (entry.user_id, period_start(entry.day, period))
+                row = table.get(key)
+                if row is None:
+                    row = table[key] = np.zeros(len(MEAL_KEYS))
+                row[meal] += sign * entry.kcal
+
+    def row(self, user_id: str, day: date, period: str = "day") -> np.ndarray:
+        with self._lock:
+            row = self._tables[period].get((user_id, period_start(day, period)))
+            return row.copy() if row is not None else np.zeros(len(MEAL_KEYS))
+
+    def breakdown(self, user_id: str, day: date, period: str = "day") -> dict[str, float]:
+        """各餐別佔該區間總熱量的百分比。"""
+        row = self.row(user_id, day, period)
+        total = row.sum()
+        pct = row / total * 100 if total > 0 else np.zeros_like(row)
+        return dict(zip(MEAL_KEYS, pct.round(1).tolist()))
+
+    def rebuild(self, entries: Iterable[Entry]) -> None:
+        """從原始紀錄整批重算所有彙總表。"""
+        with trace.span("aggregate.rollups"):
+            tables = _build_tables(entries)
+        with self._lock:
+            self._tables = tables
+
+    def verify(self, entries: Iterable[Entry]) -> bool:
+        """增量維護的彙總是否與原始紀錄重算的結果一致。"""
+        expected = _build_tables(entries)
+        with self._lock:
+            for period in PERIODS:
+                # 全為 0 的列 (例如紀錄都刪光了) 視同不存在
+                actual = {k: v for k, v in self._tables[period].items() if v.any()}
+                wanted = {k: v for k, v in expected[period].items() if v.any()}
+                if actual.keys() != wanted.keys():
+                    return False
+                if any(not np.allclose(actual[k], wanted[k]) for k in actual):
+                    return False
+        return True
+
+
+def _build_tables(entries: Iterable[Entry]) -> dict[str, dict[tuple[str, date], np.ndarray]]:
+    rows = [(e.user_id, e.day, e.meal, float(e.kcal)) for e in entries if e.meal in MEAL_INDEX]
+    tables: dict[str, dict[tuple[str, date], np.ndarray]] = {p: {} for p in PERIODS}
+    if not rows:
+        return tables
+    frame = pd.DataFrame(rows, columns=["user_id", "day", "meal", "kcal"])
+    days = pd.to_datetime(frame["day"])
+    starts = {
+        "day": days,
+        "week": days - pd.to_timedelta(days.dt.weekday, unit="D"),
+        "month": days.dt.to_period("M").dt.to_timestamp(),
+    }
+    for period, start in starts.items():
+        pivot = (
+            frame.assign(start=start.dt.date)
+            .pivot_table(index=["user_id", "start"], columns="meal", values="kcal", aggfunc="sum", fill_value=0.0)
+            .reindex(columns=MEAL_KEYS, fill_value=0.0)
+        )
+        values = pivot.to_numpy(dtype=float)
+        tables[period] = {key: values[i].copy() for i, key in enumerate(pivot.index)}
+    return tables
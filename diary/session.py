@@ -0,0 +1,80 @@
+"""多使用者的快取分層。
+
+一個 Streamlit 程序同時服務許多使用者：
+- session 層 (``SessionState``)：只放目前使用者的資料 (當天累計、體重、分頁快取)，
+  換使用者就整個重建，每個 session 的記憶體不隨使用者人數成長。
+- 程序層 (``st.cache_resource``)：食物索引、食譜庫、Gemini 結果等不可變或以內容為鍵的資料，
+  所有 session 共用，各自有容量上限。
+``UserVersions`` 記錄每位使用者的寫入，同一使用者在別的 session (例如手機與電腦)
+寫入後，這個 session 會在下一次 rerun 重新載入。
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable
+
+
+class UserVersions:
+    """每位使用者的寫入版本號，並記得最近幾次寫入來自哪個 session。"""
+
+    def __init__(self, history: int = 64):
+        self.history = history
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self._origins: dict[str, deque[tuple[int, str]]] = {}
+
+    def current(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str, origin: str = "") -> int:
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            self._origins.setdefault(user_id, deque(maxlen=self.history)).append((version, origin))
+            return version
+
+    def changed_elsewhere(self, user_id: str, origin: str, seen: int) -> bool:
+        """``seen`` 之後是否有其他 session 寫入過這位使用者的資料。"""
+        with self._lock:
+            if self._versions.get(user_id, 0) <= seen:
+                return False
+            log = self._origins[user_id]
+            if log[0][0] > seen + 1:
+                # 紀錄已被擠掉，無法確認，保守地視為有變動
+                return True
+            return any(version > seen and who != origin for version, who in log)
+
+
+class SessionState:
+    """單一瀏覽器 session、單一使用者的狀態。"""
+
+    def __init__(self, user_id: str, display_name: str, versions: UserVersions):
+        self.user_id = user_id
+        self.display_name = display_name
+        self.session_id = uuid.uuid4().hex
+        self.versions = versions
+        self.seen = versions.current(user_id)
+        self._items: dict[str, Any] = {}
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name not in self._items:
+            self._items[name] = factory()
+        return self._items[name]
+
+    def peek(self, name: str) -> Any | None:
+        """已載入的資料；不存在時回傳 None，不會建立 (背景執行緒也可以呼叫)。"""
+        return self._items.get(name)
+
+    def set(self, name: str, value: Any) -> None:
+        self._items[name] = value
+
+    def refresh(self) -> bool:
+        """其他 session 寫入過就丟掉所有資料，讓下次 ``get`` 重新載入；回傳是否有重置。"""
+        stale = self.versions.changed_elsewhere(self.user_id, self.session_id, self.seen)
+        self.seen = self.versions.current(self.user_id)
+        if stale:
+            self._items.clear()
+        return stale
@@ -0,0 +1,149 @@
+"""Google Sheets 後端與工作表欄位格式。
+
+App 一律讀寫本機 SQLite (``diary.local``)，由 ``SheetSync`` 整張讀寫工作表做同步；
+這裡只有工作表的讀寫介面，以及紀錄與 DataFrame 之間的轉換。
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Iterable, Protocol
+
+import pandas as pd
+
+from .goals import Profile
+from .models import Entry
+from .weights import WeighIn
+
+ENTRIES_WORKSHEET = "diary"
+ENTRY_COLUMNS = ["entry_id", "user_id", "day", "meal", "name", "kcal", "protein"]
+WEIGHTS_WORKSHEET = "weights"
+WEIGHT_COLUMNS = ["user_id", "day", "weight", "body_fat"]
+PROFILES_WORKSHEET = "profiles"
+PROFILE_COLUMNS = ["user_id", "sex", "age", "height", "activity", "goal"]
+# 刪除標記欄：刪除的列留在工作表上，這欄記下刪除時間 (epoch 秒)；空白表示仍有效。
+# 工作表上少了一列不代表被刪除 (可能是另一個程序整張覆寫時蓋掉的)，只有刪除標記才算。
+TOMBSTONE = "deleted"
+
+
+class SheetBackend(Protocol):
+    """工作表的讀寫介面；整張讀、整張寫。"""
+
+    def read(self, worksheet: str) -> pd.DataFrame: ...
+
+    def write(self, worksheet: str, frame: pd.DataFrame) -> None: ...
+
+
+class GSheetsBackend:
+    """透過 st-gsheets-connection 存取 Google Sheets。"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def read(self, worksheet: str) -> pd.DataFrame:
+        # 本機資料庫才是快取，同步時一律讀最新內容
+        return self.conn.read(worksheet=worksheet, ttl=0)
+
+    def write(self, worksheet: str, frame: pd.DataFrame) -> None:
+        self.conn.update(worksheet=worksheet, data=frame)
+
+
+class InMemoryBackend:
+    """本機假的 Sheets 後端，用於開發與測試，不需要網路。"""
+
+    def __init__(self, sheets: dict[str, pd.DataFrame] | None = None, latency: float = 0.0):
+        self.sheets = {name: frame.copy() for name, frame in (sheets or {}).items()}
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+
+    def read(self, worksheet: str) -> pd.DataFrame:
+        self.reads += 1
+        time.sleep(self.latency)
+        return self.sheets.get(worksheet, pd.DataFrame()).copy()
+
+    def write(self, worksheet: str, frame: pd.DataFrame) -> None:
+        self.writes += 1
+        time.sleep(self.latency)
+        self.sheets[worksheet] = frame.copy()
+
+
+def entries_to_frame(entries: Iterable[Entry]) -> pd.DataFrame:
+    rows = [
+        {
+            "entry_id": e.entry_id,
+            "user_id": e.user_id,
+            "day": e.day.isoformat(),
+            "meal": e.meal,
+            "name": e.name,
+            "kcal": float(e.kcal),
+            "protein": float(e.protein),
+        }
+        for e in entries
+    ]
+    return pd.DataFrame(rows, columns=ENTRY_COLUMNS)
+
+
+def frame_to_entries(frame: pd.DataFrame) -> list[Entry]:
+    return [
+        Entry(
+            entry_id=str(row.entry_id),
+            user_id=str(row.user_id),
+            day=date.fromisoformat(str(row.day)[:10]),
+            meal=str(row.meal),
+            name=str(row.name),
+            kcal=float(row.kcal),
+            protein=float(row.protein) if pd.notna(row.protein) else 0.0,
+        )
+        for row in frame.itertuples(index=False)
+    ]
+
+
+def weigh_ins_to_frame(weigh_ins: Iterable[WeighIn]) -> pd.DataFrame:
+    rows = [
+        {"user_id": w.user_id, "day": w.day.isoformat(), "weight": float(w.weight), "body_fat": w.body_fat}
+        for w in weigh_ins
+    ]
+    return pd.DataFrame(rows, columns=WEIGHT_COLUMNS)
+
+
+def frame_to_weigh_ins(frame: pd.DataFrame) -> list[WeighIn]:
+    return [
+        WeighIn(
+            user_id=str(row.user_id),
+            day=date.fromisoformat(str(row.day)[:10]),
+            weight=float(row.weight),
+            body_fat=float(row.body_fat) if pd.notna(row.body_fat) else None,
+        )
+        for row in frame.itertuples(index=False)
+    ]
+
+
+def profiles_to_frame(profiles: Iterable[Profile]) -> pd.DataFrame:
+    rows = [
+        {
+            "user_id": p.user_id,
+            "sex": p.sex,
+            "age": int(p.age),
+            "height": float(p.height),
+            "activity": p.activity,
+            "goal": p.goal,
+        }
+        for p in profiles
+    ]
+    return pd.DataFrame(rows, columns=PROFILE_COLUMNS)
+
+
+def frame_to_profiles(frame: pd.DataFrame) -> list[Profile]:
+    return [
+        Profile(
+            user_id=str(row.user_id),
+            sex=str(row.sex),
+            age=int(row.age),
+            height=float(row.height),
+            activity=str(row.activity),
+            goal=str(row.goal),
+        )
+        for row in frame.itertuples(index=False)
+    ]
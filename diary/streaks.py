@@ -0,0 +1,228 @@
+"""連續達標天數、達標率與每週報告。
+
+判定與首頁熱量環相同：有記錄飲食且攝取不超過熱量目標的日子算「在目標內」，
+蛋白質達到目標算「蛋白質達標」。
+
+``StreakTracker`` 訂閱 ``SummaryEngine``：新增、修改或補記以前的紀錄時只重新判定那一天。
+每個指標的達標日存成依日期排序的連續區間，目前連續天數、最長紀錄都直接從區間得到，
+不必每次 rerun 掃描整本日記。目標改變時以 ``recompute(since)`` 重算該日之後的判定。
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable
+
+from . import trace
+from .goals import Goals
+from .models import Entry
+from .summary import DayTotals, SummaryEngine
+
+UNDER_TARGET = "under_target"
+PROTEIN = "protein"
+METRICS = (UNDER_TARGET, PROTEIN)
+
+
+def qualifies(totals: DayTotals, goals: Goals) -> dict[str, bool]:
+    """這一天各指標是否達標；沒有記錄飲食的日子都不算。"""
+    logged = totals.intake > 0
+    return {
+        UNDER_TARGET: logged and totals.intake <= goals.target_kcal,
+        PROTEIN: logged and totals.protein >= goals.protein_goal,
+    }
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+@dataclass(frozen=True)
+class WeeklyReport:
+    user_id: str
+    # 該週的星期一
+    week: date
+    days_logged: int
+    days_under_target: int
+    protein_days: int
+    # 有記錄的日子的平均
+    avg_intake: float
+    avg_protein: float
+    # 週內最後一筆與第一筆體重的差；不到兩筆時為 None
+    weight_change: float | None
+    # 到週日為止的連續天數
+    streak: int
+    protein_streak: int
+
+
+class Runs:
+    """依日期排序、互不重疊的連續日期區間 (以 ordinal 存)。"""
+
+    def __init__(self):
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+
+    def _find(self, day: int) -> int:
+        """包含 ``day`` 的區間索引；沒有時為 -1。"""
+        i = bisect_right(self.starts, day) - 1
+        return i if i >= 0 and self.ends[i] >= day else -1
+
+    def __contains__(self, day: int) -> bool:
+        return self._find(day) >= 0
+
+    def add(self, day: int) -> None:
+        if day in self:
+            return
+        i = bisect_right(self.starts, day)
+        joins_left = i > 0 and self.ends[i - 1] == day - 1
+        joins_right = i < len(self.starts) and self.starts[i] == day + 1
+        if joins_left and joins_right:
+            self.ends[i - 1] = self.ends[i]
+            del self.starts[i], self.ends[i]
+        elif joins_left:
+            self.ends[i - 1] = day
+        elif joins_right:
+            self.starts[i] = day
+        else:
+            self.starts.insert(i, day)
+            self.ends.insert(i, day)
+
+    def discard(self, day: int) -> None:
+        i = self._find(day)
+        if i < 0:
+            return
+        start, end = self.starts[i], self.ends[i]
+        if start == end:
+            del self.starts[i], self.ends[i]
+        elif day == start:
+            self.starts[i] = day + 1
+        elif day == end:
+            self.ends[i] = day - 1
+        else:
+            # 從中間斷開
+            self.ends[i] = day - 1
+            self.starts.insert(i + 1, day + 1)
+            self.ends.insert(i + 1, end)
+
+    def truncate(self, since: int) -> None:
+        """移除 ``since`` (含) 之後的日子。"""
+        i = bisect_left(self.starts, since)
+        del self.starts[i:], self.ends[i:]
+        if i > 0 and self.ends[i - 1] >= since:
+            self.ends[i - 1] = since - 1
+
+    def run_ending(self, day: int) -> int:
+        """到 ``day`` 為止的連續天數。"""
+        i = self._find(day)
+        return day - self.starts[i] + 1 if i >= 0 else 0
+
+    def longest(self) -> int:
+        return max((end - start + 1 for start, end in zip(self.starts, self.ends)), default=0)
+
+    def count(self, start: int, end: int) -> int:
+        """[start, end] 之間的天數。"""
+        total = 0
+        for i in range(max(0, bisect_right(self.starts, start) - 1), len(self.starts)):
+            if self.starts[i] > end:
+                break
+            total += max(0, min(end, self.ends[i]) - max(start, self.starts[i]) + 1)
+        return total
+
+
+class StreakTracker:
+    """單一使用者的連續達標天數，跟著 ``SummaryEngine`` 的紀錄變動增量更新。"""
+
+    def __init__(self, engine: SummaryEngine, user_id: str, goals: Goals):
+        self.engine = engine
+        self.user_id = user_id
+        self.goals = goals
+        self._lock = threading.Lock()
+        self._runs = {metric: Runs() for metric in METRICS}
+        self._logged = Runs()
+        # 判定有變動時遞增，供畫面判斷快取是否過期
+        self.version = 0
+
+    # ---- SummaryEngine 的監聽器 ----
+
+    def rebuild(self, entries: list[Entry]) -> None:
+        days = {entry.day for entry in entries if entry.user_id == self.user_id}
+        with trace.span("streaks.rebuild"):
+            self._apply_days({day: self.engine.totals(self.user_id, day) for day in days}, None)
+
+    def apply(self, entry: Entry, sign: int) -> None:
+        if entry.user_id == self.user_id:
+            self._apply_days({entry.day: self.engine.totals(self.user_id, entry.day)}, None)
+
+    # ---- 重算 ----
+
+    def set_goals(self, goals: Goals) -> None:
+        """目標改變時，以前的判定全部重算。"""
+        if goals == self.goals:
+            return
+        self.goals = goals
+        first = self._logged.starts[0] if self._logged.starts else None
+        if first is not None:
+            self.recompute(date.fromordinal(first))
+
+    def recompute(self, since: date) -> None:
+        """重算 ``since`` (含) 之後每一天的判定，例如修改了以前的目標或大量補登。"""
+        with trace.span("streaks.recompute"):
+            while True:
+                version = self.engine.version
+                days = self.engine.days(self.user_id, since)
+                totals = {day: self.engine.totals(self.user_id, day) for day in days}
+                if self._apply_days(totals, since, version):
+                    return
+
+    def _apply_days(self, totals: dict[date, DayTotals], since: date | None, version: int | None = None) -> bool:
+        with self._lock:
+            # 讀取期間有新的紀錄進來：放棄這次結果，由呼叫端重讀
+            if version is not None and self.engine.version != version:
+                return False
+            if since is not None:
+                for runs in (*self._runs.values(), self._logged):
+                    runs.truncate(since.toordinal())
+            for day, day_totals in totals.items():
+                ordinal = day.toordinal()
+                if day_totals.intake > 0:
+                    self._logged.add(ordinal)
+                else:
+                    self._logged.discard(ordinal)
+                for metric, hit in qualifies(day_totals, self.goals).items():
+                    if hit:
+                        self._runs[metric].add(ordinal)
+                    else:
+                        self._runs[metric].discard(ordinal)
+            self.version += 1
+            return True
+
+    # ---- 查詢 ----
+
+    def streak(self, metric: str, today: date) -> int:
+        """目前的連續天數；今天還沒達標不算中斷，從昨天往回算。"""
+        with self._lock:
+            runs = self._runs[metric]
+            ordinal = today.toordinal()
+            return runs.run_ending(ordinal) or runs.run_ending(ordinal - 1)
+
+    def longest(self, metric: str) -> int:
+        with self._lock:
+            return self._runs[metric].longest()
+
+    def adherence(self, metric: str, start: date, end: date) -> tuple[int, int]:
+        """(達標天數, 有記錄的天數)。"""
+        with self._lock:
+            span = (start.toordinal(), end.toordinal())
+            return self._runs[metric].count(*span), self._logged.count(*span)
+
+
+def trailing_streak(days: Iterable[date], end: date) -> int:
+    """到 ``end`` 為止連續出現的天數 (``days`` 不必排序)。"""
+    ordinals = set(day.toordinal() for day in days)
+    ordinal = end.toordinal()
+    count = 0
+    while ordinal - count in ordinals:
+        count += 1
+    return count
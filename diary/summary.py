@@ -0,0 +1,179 @@
+"""首頁熱量環的每日彙總。
+
+每個 (使用者, 日期) 維護一份累計值，新增或刪除紀錄時直接加減，
+畫面重繪時只讀取累計值，不再掃描整本日記。
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Iterable
+
+from . import trace
+from .models import Entry
+
+DEFAULT_TARGET_KCAL = 2114
+DEFAULT_PROTEIN_GOAL = 138
+
+# 進度環 SVG 的周長 (r=52)
+RING_CIRCUMFERENCE = 326
+
+# 紀錄變動的監聽器：(紀錄, +1 新增 / -1 刪除)
+Listener = Callable[[Entry, int], None]
+
+
+@dataclass
+class DayTotals:
+    intake: float = 0.0
+    burned: float = 0.0
+    protein: float = 0.0
+    meals: dict[str, float] = field(default_factory=dict)
+    count: int = 0
+
+    def apply(self, entry: Entry, sign: int) -> None:
+        self.count += sign
+        if entry.is_exercise:
+            self.burned += sign * entry.kcal
+        else:
+            self.intake += sign * entry.kcal
+            self.protein += sign * entry.protein
+            self.meals[entry.meal] = self.meals.get(entry.meal, 0.0) + sign * entry.kcal
+        if self.count == 0:
+            # 清空時歸零，避免浮點誤差累積
+            self.intake = self.burned = self.protein = 0.0
+            self.meals.clear()
+
+    def copy(self) -> DayTotals:
+        return DayTotals(self.intake, self.burned, self.protein, dict(self.meals), self.count)
+
+
+@dataclass(frozen=True)
+class DailySummary:
+    target: float
+    intake: float
+    burned: float
+    protein: float
+    protein_goal: float
+
+    @property
+    def remaining(self) -> float:
+        return self.target - self.intake
+
+    @property
+    def protein_pct(self) -> int:
+        if self.protein_goal <= 0:
+            return 100
+        return min(100, round(self.protein / self.protein_goal * 100))
+
+    @property
+    def protein_left(self) -> float:
+        return max(0.0, self.protein_goal - self.protein)
+
+    @property
+    def ring_offset(self) -> int:
+        """進度環的 stroke-dashoffset，攝取越多綠色越短。"""
+        if self.target <= 0:
+            return RING_CIRCUMFERENCE
+        used = min(1.0, max(0.0, self.intake / self.target))
+        return round(RING_CIRCUMFERENCE * used)
+
+
+class SummaryEngine:
+    """以紀錄增減維護每日累計值。"""
+
+    def __init__(self, entries: Iterable[Entry] = ()):
+        self._lock = threading.RLock()
+        self._entries: dict[str, Entry] = {}
+        self._days: dict[tuple[str, date], dict[str, Entry]] = {}
+        self._totals: dict[tuple[str, date], DayTotals] = {}
+        self._listeners: list[Listener] = []
+        # 每次新增/刪除遞增，供畫面判斷快取是否過期
+        self.version = 0
+        self.load(entries)
+
+    def subscribe(self, listener: Listener, init: Callable[[list[Entry]], None] | None = None) -> None:
+        """讓其他增量彙總 (例如餐別彙總表) 跟著紀錄變動更新。
+
+        ``init`` 會在同一把鎖內收到目前所有紀錄，用來建立初始狀態，
+        避免建立期間背景執行緒新增的紀錄被漏掉。
+        """
+        with self._lock:
+            if init is not None:
+                init(list(self._entries.values()))
+            self._listeners.append(listener)
+
+    def load(self, entries: Iterable[Entry]) -> None:
+        with trace.span("aggregate.load"), self._lock:
+            for entry in entries:
+                self.add(entry)
+
+    def add(self, entry: Entry) -> None:
+        """新增紀錄；同一個 entry_id 視為修改。"""
+        with self._lock:
+            if entry.entry_id in self._entries:
+                self.remove(entry.entry_id)
+            key = (entry.user_id, entry.day)
+            self._entries[entry.entry_id] = entry
+            self._days.setdefault(key, {})[entry.entry_id] = entry
+            self._totals.setdefault(key, DayTotals()).apply(entry, +1)
+            self.version += 1
+            for listener in self._listeners:
+                listener(entry, +1)
+
+    def remove(self, entry_id: str) -> Entry | None:
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return None
+            key = (entry.user_id, entry.day)
+            day = self._days[key]
+            del day[entry_id]
+            totals = self._totals[key]
+            totals.apply(entry, -1)
+            self.version += 1
+            for listener in self._listeners:
+                listener(entry, -1)
+            if not day:
+                del self._days[key]
+                del self._totals[key]
+            return entry
+
+    def get(self, entry_id: str) -> Entry | None:
+        return self._entries.get(entry_id)
+
+    def all_entries(self) -> list[Entry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def totals(self, user_id: str, day: date) -> DayTotals:
+        with self._lock:
+            totals = self._totals.get((user_id, day))
+            return totals.copy() if totals else DayTotals()
+
+    def days(self, user_id: str, since: date | None = None) -> list[date]:
+        """有紀錄的日子 (依日期排序)。"""
+        with self._lock:
+            days = [d for u, d in self._totals if u == user_id and (since is None or d >= since)]
+        return sorted(days)
+
+    def entries_for(self, user_id: str, day: date) -> list[Entry]:
+        with self._lock:
+            return list(self._days.get((user_id, day), {}).values())
+
+    def summary(
+        self,
+        user_id: str,
+        day: date,
+        target: float = DEFAULT_TARGET_KCAL,
+        protein_goal: float = DEFAULT_PROTEIN_GOAL,
+    ) -> DailySummary:
+        totals = self.totals(user_id, day)
+        return DailySummary(
+            target=target,
+            intake=totals.intake,
+            burned=totals.burned,
+            protein=totals.protein,
+            protein_goal=protein_goal,
+        )
@@ -0,0 +1,42 @@
+"""分頁的延遲建置。
+
+只有目前顯示的分頁會讀資料、建圖表；其他分頁第一次被打開時才建置，
+結果依輸入的 key 記住，key 沒變就直接重用。
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Hashable
+
+from . import trace
+
+
+class LazyTabs:
+    def __init__(self):
+        self._builders: dict[str, tuple[Callable[[], str], Callable[[], Hashable]]] = {}
+        self._memo: dict[str, tuple[Hashable, str]] = {}
+        self.builds = 0
+
+    def register(self, name: str, build: Callable[[], str], key: Callable[[], Hashable]) -> None:
+        """註冊分頁；``key`` 應便宜且能反映 ``build`` 的所有輸入。"""
+        self._builders[name] = (build, key)
+
+    def render(self, name: str) -> str:
+        build, key = self._builders[name]
+        current = key()
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == current:
+            trace.count("tabs.hit")
+            return memo[1]
+        trace.count("tabs.miss")
+        with trace.span(f"tab.{name}"):
+            html = build()
+        self.builds += 1
+        self._memo[name] = (current, html)
+        return html
+
+    def invalidate(self, name: str | None = None) -> None:
+        if name is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(name, None)
@@ -0,0 +1,219 @@
+"""每次 rerun 的計時追蹤與指標。
+
+- ``span(name)`` / ``@traced(name)``：量測一個資料階段 (讀取儲存、呼叫 Gemini、彙總、
+  圖表序列化…)，同時記進目前 rerun 的追蹤與整個程序的延遲分布。
+- ``count(name)``：計數器，例如快取命中/未命中。
+- ``rerun(...)``：包住一次 Streamlit rerun；結束時寫一行 JSON 結構化日誌，
+  超過 ``slow_ms`` 以 WARNING 記錄，可選擇以 cProfile 取樣。
+- ``METRICS``：程序層的指標，可匯出 JSON 或 Prometheus 文字格式。
+
+沒有進行中的 rerun 時 (背景執行緒) 只更新 ``METRICS``。
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+log = logging.getLogger("diary.trace")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 延遲分布的上界 (ms)
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLOW_RERUN_MS = 500.0
+
+
+@dataclass
+class Span:
+    name: str
+    # 相對於 rerun 開始的時間 (ms)
+    start_ms: float
+    duration_ms: float
+    depth: int
+
+
+@dataclass
+class Trace:
+    name: str
+    attrs: dict[str, Any] = field(default_factory=dict)
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: float = field(default_factory=time.time)
+    spans: list[Span] = field(default_factory=list)
+    counters: Counter = field(default_factory=Counter)
+    total_ms: float = 0.0
+    profile: str | None = None
+    _t0: int = field(default_factory=time.perf_counter_ns, repr=False)
+    _depth: int = field(default=0, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": round(self.started_at, 3),
+            "total_ms": round(self.total_ms, 2),
+            **self.attrs,
+            "spans": [
+                {"name": s.name, "start_ms": round(s.start_ms, 2), "ms": round(s.duration_ms, 2), "depth": s.depth}
+                for s in self.spans
+            ],
+            "counters": dict(self.counters),
+        }
+
+
+class Metrics:
+    """程序層的計數器與延遲分布，執行緒安全。"""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS_MS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+        # name -> [各區間次數..., 超過最大區間的次數], 總和, 次數
+        self._histograms: dict[str, tuple[list[int], list[float]]] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            counts, totals = hist
+            for i, bound in enumerate(self.buckets):
+                if ms <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            totals[0] += ms
+            totals[1] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "latency_ms": {
+                    name: {
+                        "count": int(totals[1]),
+                        "mean": round(totals[0] / totals[1], 3) if totals[1] else 0.0,
+                        "buckets": dict(zip([*map(str, self.buckets), "+Inf"], counts)),
+                    }
+                    for name, (counts, totals) in self._histograms.items()
+                },
+            }
+
+    def prometheus(self, prefix: str = "diary") -> str:
+        """Prometheus 文字格式 (counter + histogram)。"""
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_events_total counter"]
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        lines.append(f"# TYPE {prefix}_stage_ms histogram")
+        for name, hist in sorted(snap["latency_ms"].items()):
+            cumulative = 0
+            for bound, count in hist["buckets"].items():
+                cumulative += count
+                lines.append(f'{prefix}_stage_ms_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_ms_sum{{stage="{name}"}} {hist["mean"] * hist["count"]:.3f}')
+            lines.append(f'{prefix}_stage_ms_count{{stage="{name}"}} {hist["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+METRICS = Metrics()
+# 最近的 rerun 與慢 rerun，給除錯面板看
+RECENT: deque[Trace] = deque(maxlen=50)
+SLOW: deque[Trace] = deque(maxlen=20)
+
+_current: ContextVar[Trace | None] = ContextVar("diary_trace", default=None)
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    trace = _current.get()
+    depth = 0
+    if trace is not None:
+        depth = trace._depth
+        trace._depth += 1
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        ms = (end - start) / 1e6
+        METRICS.observe(name, ms)
+        if trace is not None:
+            trace._depth = depth
+            trace.spans.append(Span(name, (start - trace._t0) / 1e6, ms, depth))
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    METRICS.incr(name, n)
+    trace = _current.get()
+    if trace is not None:
+        trace.counters[name] += n
+
+
+@contextmanager
+def rerun(name: str = "rerun", slow_ms: float = SLOW_RERUN_MS, profile: bool = False, **attrs) -> Iterator[Trace]:
+    trace = Trace(name, dict(attrs))
+    token = _current.set(trace)
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # 同一個執行緒已有其他 profiler
+            profiler = None
+    try:
+        yield trace
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            trace.profile = out.getvalue()
+        trace.total_ms = (time.perf_counter_ns() - trace._t0) / 1e6
+        _current.reset(token)
+        METRICS.observe(name, trace.total_ms)
+        RECENT.append(trace)
+        record = json.dumps(trace.to_dict(), ensure_ascii=False)
+        if trace.total_ms >= slow_ms:
+            SLOW.append(trace)
+            log.warning("slow %s %s", name, record)
+        else:
+            log.info("%s %s", name, record)
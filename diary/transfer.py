@@ -0,0 +1,239 @@
+"""日記與體重歷史的匯入/匯出。
+
+匯入：CSV/JSONL 分塊串流讀取 (一次只解析 ``chunksize`` 列)，每塊以向量化方式
+整理欄位後就寫入本機 SQLite (一塊一個交易)，記憶體用量只跟 ``chunksize`` 有關；
+Sheets 由背景同步整批推送，不會逐列打 API。JSON 陣列無法串流解析，整份讀入後再分塊。
+匯出：Parquet (壓縮、適合備份與分析) 或 Arrow IPC (可 memory-map，零複製重新載入)。
+pyarrow.parquet 只在匯出/讀回時才載入，不拖慢 App 啟動。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+from collections import Counter
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import IO, Iterator, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from .models import EXERCISE, MEALS
+from .local import LocalTable
+from .storage import ENTRY_COLUMNS, WEIGHT_COLUMNS
+
+Source = Union[str, Path, IO]
+
+CHUNKSIZE = 10_000
+
+# 其他記錄 App 常見的欄位名稱
+ALIASES = {
+    "date": "day",
+    "日期": "day",
+    "meal_type": "meal",
+    "餐別": "meal",
+    "food": "name",
+    "食物": "name",
+    "calories": "kcal",
+    "energy": "kcal",
+    "熱量": "kcal",
+    "蛋白質": "protein",
+    "weight_kg": "weight",
+    "體重": "weight",
+    "fat": "body_fat",
+    "體脂": "body_fat",
+}
+# 餐別接受中文標籤
+MEAL_LABELS = {label: key for key, label in MEALS.items()} | {"運動": EXERCISE}
+MEAL_KEYS = set(MEALS) | {EXERCISE}
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+
+
+def detect_format(name: str) -> str:
+    suffix = Path(name).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".json":
+        return "json"
+    if suffix == ".csv":
+        return "csv"
+    raise ValueError(f"unsupported import format: {name}")
+
+
+def read_chunks(source: Source, fmt: str, chunksize: int = CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """逐塊讀取，欄位名稱轉成內部名稱。"""
+    if fmt == "csv":
+        reader = pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        reader = pd.read_json(source, lines=True, chunksize=chunksize, dtype=False)
+    elif fmt == "json":
+        frame = pd.read_json(source, orient="records", dtype=False)
+        reader = contextlib.nullcontext(frame.iloc[i : i + chunksize] for i in range(0, len(frame), chunksize))
+    else:
+        raise ValueError(f"unsupported import format: {fmt}")
+    with reader as chunks:
+        for chunk in chunks:
+            chunk.columns = [ALIASES.get(str(c).strip().lower(), str(c).strip().lower()) for c in chunk.columns]
+            yield chunk
+
+
+def _days(column: pd.Series) -> pd.Series:
+    return pd.to_datetime(column, errors="coerce").dt.strftime("%Y-%m-%d")
+
+
+def _numbers(frame: pd.DataFrame, column: str) -> pd.Series:
+    if column not in frame:
+        return pd.Series(float("nan"), index=frame.index)
+    return pd.to_numeric(frame[column], errors="coerce")
+
+
+def normalize_entries(chunk: pd.DataFrame, user_id: str, counts: Counter | None = None) -> pd.DataFrame:
+    """整理成 ENTRY_COLUMNS；缺日期、餐別的列丟棄。
+
+    只有名稱沒有熱量的列以 0 kcal 匯入，之後由批次辨識 (``diary.backfill``) 補上。
+    ``counts`` 是前面各塊已出現的相同內容次數，分塊讀取時 entry_id 才會和一次讀完相同。
+    """
+    meal = chunk.get("meal", pd.Series("", index=chunk.index)).astype(str).str.strip()
+    frame = pd.DataFrame(
+        {
+            "user_id": user_id,
+            "day": _days(chunk["day"]) if "day" in chunk else None,
+            "meal": meal.map(lambda m: MEAL_LABELS.get(m, m.lower())),
+            "name": chunk.get("name", pd.Series("", index=chunk.index)).fillna("").astype(str).str.strip(),
+            "kcal": _numbers(chunk, "kcal"),
+            "protein": _numbers(chunk, "protein").fillna(0.0),
+        },
+        index=chunk.index,
+    )
+    frame = frame[frame["day"].notna() & frame["meal"].isin(MEAL_KEYS) & (frame["kcal"].notna() | frame["name"].ne(""))]
+    frame["kcal"] = frame["kcal"].fillna(0.0)
+    # 沒有 entry_id 的列依內容產生固定的 id，重複匯入同一份檔案不會重複
+    if "entry_id" in chunk and chunk["entry_id"].astype(str).str.len().gt(0).all():
+        ids = chunk.loc[frame.index, "entry_id"].astype(str)
+    else:
+        # entry_id 全域唯一，雜湊要含 user_id：兩位使用者匯入同樣內容不會互相覆蓋
+        hashes = pd.util.hash_pandas_object(frame[["user_id", "day", "meal", "name", "kcal"]], index=False).map("{:016x}".format)
+        # 同一天同一餐吃兩次一樣的東西時，以出現順序 (跨塊累計) 區分
+        ordinal = hashes.groupby(hashes).cumcount()
+        if counts is not None:
+            ordinal += hashes.map(lambda h: counts[h]).astype(int)
+            counts.update(hashes.value_counts().to_dict())
+        ids = "import-" + hashes + "-" + ordinal.astype(str)
+    frame.insert(0, "entry_id", ids)
+    return frame[ENTRY_COLUMNS]
+
+
+def normalize_weigh_ins(chunk: pd.DataFrame, user_id: str) -> pd.DataFrame:
+    frame = pd.DataFrame(
+        {
+            "user_id": user_id,
+            "day": _days(chunk["day"]) if "day" in chunk else None,
+            "weight": _numbers(chunk, "weight"),
+            "body_fat": _numbers(chunk, "body_fat"),
+        },
+        index=chunk.index,
+    )
+    return frame[frame["day"].notna() & frame["weight"].between(20, 300)][WEIGHT_COLUMNS]
+
+
+def _own_keys(sheet: LocalTable, frame: pd.DataFrame, key: str, user_id: str) -> pd.DataFrame:
+    """檔案裡的 entry_id 已屬於其他使用者時，改成以 user_id 與原 id 雜湊的 id。
+
+    entry_id 是全域主鍵，照用會把對方的紀錄改成自己的。換過的 id 固定不變，重複匯入
+    仍會視為重複；換過還是別人的 (刻意撞 id) 就丟棄。
+    """
+    keys = frame[key].astype(str)
+    owners = sheet.owners(keys)
+    taken = keys.map(lambda k: owners.get(k, user_id) != user_id)
+    if not taken.any():
+        return frame
+    rekeyed = keys[taken].map(lambda k: "import-" + hashlib.sha1(f"{user_id}\0{k}".encode("utf-8")).hexdigest()[:16])
+    owners = sheet.owners(rekeyed)
+    frame = frame.copy()
+    frame.loc[taken, key] = rekeyed
+    return frame[~frame[key].map(lambda k: owners.get(k, user_id) != user_id)]
+
+
+def _import(sheet: LocalTable, chunks: Iterator[pd.DataFrame], normalize, key: str, user_id: str) -> ImportResult:
+    result = ImportResult()
+    seen = set(sheet.user_frame(user_id)[key].astype(str))
+    # 主鍵不含 user_id 的表 (entries) 要先確認 id 沒有被其他使用者用掉
+    shared = "user_id" not in sheet.spec.key
+    for chunk in chunks:
+        result.chunks += 1
+        frame = normalize(chunk, user_id)
+        if shared:
+            frame = _own_keys(sheet, frame, key, user_id)
+        result.skipped += len(chunk) - len(frame)
+        keys = frame[key].astype(str)
+        known = pd.Series([k in seen for k in keys], index=frame.index, dtype=bool)
+        fresh = ~known & ~keys.duplicated(keep="last")
+        result.duplicates += len(frame) - int(fresh.sum())
+        frame = frame[fresh]
+        seen.update(keys[fresh])
+        # 每塊整理完立即寫入，不把整個檔案留在記憶體
+        sheet.upsert(frame)
+        result.rows += len(frame)
+    return result
+
+
+def import_entries(sheet: LocalTable, source: Source, user_id: str, fmt: str, chunksize: int = CHUNKSIZE) -> ImportResult:
+    """匯入餐點紀錄；entry_id 已存在的列略過，已屬於其他使用者的 entry_id 換成自己的。"""
+    normalize = partial(normalize_entries, counts=Counter())
+    return _import(sheet, read_chunks(source, fmt, chunksize), normalize, "entry_id", user_id)
+
+
+def import_weigh_ins(sheet: LocalTable, source: Source, user_id: str, fmt: str, chunksize: int = CHUNKSIZE) -> ImportResult:
+    """匯入體重紀錄；同一天已有紀錄的略過。"""
+    return _import(sheet, read_chunks(source, fmt, chunksize), normalize_weigh_ins, "day", user_id)
+
+
+def to_table(frame: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+
+
+def export(frame: pd.DataFrame, path: str | Path) -> Path:
+    """依副檔名寫成 Parquet 或 Arrow IPC (.arrow/.feather)。"""
+    path = Path(path)
+    table = to_table(frame)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path, compression="zstd")
+    elif path.suffix in (".arrow", ".feather"):
+        # 不壓縮，讀取時才能直接 memory-map
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"unsupported export format: {path}")
+    return path
+
+
+def export_bytes(frame: pd.DataFrame) -> bytes:
+    """Parquet 位元組，給下載按鈕用。"""
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    pq.write_table(to_table(frame), buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def load(path: str | Path) -> pa.Table:
+    """以 memory-map 讀回匯出的檔案；Arrow IPC 不會複製資料。"""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True)
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all()
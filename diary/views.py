@@ -0,0 +1,292 @@
+"""把資料轉成 templates/ 裡各畫面需要的替換值，並組出整頁 HTML。"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+from string import Template
+from typing import Callable
+
+from . import trace
+from .models import MEALS, Entry
+from .recipes import FILTERS, Recipe
+from .streaks import PROTEIN, UNDER_TARGET, StreakTracker, WeeklyReport
+from .summary import DailySummary
+from .weights import TREND_WINDOW, WeightSeries
+from .writer import EntryStatus
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+# 預先編譯的 Tailwind (python -m diary.assets 產生)
+STYLESHEET = Path(__file__).parent.parent / "static" / "tailwind.css"
+# 只有這些分頁有圖表；其他分頁不載入 Chart.js
+CHART_TABS = {"home", "stats"}
+CHART_SCRIPT = '    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js" defer></script>'
+
+# 底部導航的分頁 (key -> 顯示名稱)
+TABS = {
+    "home": "首頁",
+    "log": "日記",
+    "stats": "追蹤",
+    "recipe": "靈感",
+}
+
+# 餐別區塊的圖示 (底色, 文字色, icon)
+MEAL_ICONS = {
+    "breakfast": ("bg-yellow-100", "text-yellow-600", "fa-sun"),
+    "lunch": ("bg-orange-100", "text-orange-600", "fa-utensils"),
+    "dinner": ("bg-indigo-100", "text-indigo-600", "fa-moon"),
+    "snack": ("bg-pink-100", "text-pink-600", "fa-cookie-bite"),
+}
+
+
+@lru_cache(maxsize=None)
+def template(name: str) -> Template:
+    return Template((TEMPLATES_DIR / f"{name}.html").read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=None)
+def stylesheet() -> str:
+    return STYLESHEET.read_text(encoding="utf-8")
+
+
+def render_screen(tab: str, context: dict[str, object]) -> str:
+    with trace.span(f"render.{tab}"):
+        return template(tab).safe_substitute(context)
+
+
+def render_page(tab: str, screen: str) -> str:
+    """手機外框 + 目前分頁的畫面；其他分頁不輸出。"""
+    nav = {f"nav_{key}": "active" if key == tab else "" for key in TABS}
+    return template("app").safe_substitute(
+        screen=screen,
+        tailwind=stylesheet(),
+        chart_script=CHART_SCRIPT if tab in CHART_TABS else "",
+        **nav,
+    )
+
+
+def greeting(hour: int) -> str:
+    if 5 <= hour < 11:
+        return "早安"
+    if 11 <= hour < 18:
+        return "午安"
+    return "晚安"
+
+
+def home_context(summary: DailySummary, display_name: str = "小明", hour: int | None = None) -> dict[str, object]:
+    if hour is None:
+        hour = datetime.now().hour
+    if summary.protein_left > 0:
+        protein_hint = f"加油！還差 {summary.protein_left:.0f}g"
+    else:
+        protein_hint = "蛋白質達標 🎉"
+    return {
+        "greeting": greeting(hour),
+        "display_name": escape(display_name),
+        "target": f"{summary.target:.0f}",
+        "intake": f"{summary.intake:.0f}",
+        "burned": f"{summary.burned:.0f}",
+        "remaining": f"{summary.remaining:.0f}",
+        # 如果超標，文字變紅
+        "remaining_class": "text-red-500" if summary.remaining < 0 else "text-gray-800",
+        "ring_offset": summary.ring_offset,
+        "protein": f"{summary.protein:.0f}",
+        "protein_goal": f"{summary.protein_goal:.0f}",
+        "protein_pct": summary.protein_pct,
+        "protein_hint": protein_hint,
+    }
+
+
+# 熱量來源甜甜圈圖的顏色 (Chart.js 色碼, 圖例的 Tailwind class)
+MEAL_COLORS = {
+    "breakfast": ("#22c55e", "bg-green-500"),
+    "lunch": ("#86efac", "bg-green-300"),
+    "dinner": ("#dcfce7", "bg-green-100"),
+    "snack": ("#bbf7d0", "bg-green-200"),
+}
+
+
+def meal_chart_context(breakdown: dict[str, float]) -> dict[str, object]:
+    # 早/午/晚餐一定顯示；點心有紀錄才顯示
+    meals = [meal for meal, pct in breakdown.items() if pct or meal != "snack"]
+    legend = "\n".join(
+        f"""                        <div class="flex items-center justify-between text-xs">
+                            <div class="flex items-center gap-2"><div class="w-2 h-2 rounded-full {MEAL_COLORS[meal][1]}"></div>{MEALS[meal]}</div>
+                            <span class="font-bold">{breakdown[meal]:.0f}%</span>
+                        </div>"""
+        for meal in meals
+    )
+    chart = {
+        "labels": [MEALS[meal] for meal in meals],
+        "data": [breakdown[meal] for meal in meals],
+        "colors": [MEAL_COLORS[meal][0] for meal in meals],
+    }
+    return {"meal_legend": legend, "meal_chart": json.dumps(chart, ensure_ascii=False)}
+
+
+# 背景同步狀態的標示
+STATUS_BADGES = {
+    EntryStatus.PENDING: '<i class="fas fa-circle-notch fa-spin text-gray-300 ml-1" title="同步中"></i>',
+    EntryStatus.FAILED: '<i class="fas fa-exclamation-circle text-red-500 ml-1" title="同步失敗"></i>',
+}
+
+StatusLookup = Callable[[str], EntryStatus]
+
+
+def _saved(entry_id: str) -> EntryStatus:
+    return EntryStatus.SAVED
+
+
+def meal_section(meal: str, entries: list[Entry], status: StatusLookup = _saved) -> str:
+    bg, fg, icon = MEAL_ICONS[meal]
+    label = MEALS[meal]
+    total = sum(e.kcal for e in entries)
+    items = "".join(
+        f"""
+                        <div class="flex justify-between text-sm">
+                            <span>{escape(e.name)}{STATUS_BADGES.get(status(e.entry_id), "")}</span>
+                            <span class="text-gray-500">{e.kcal:.0f} kcal</span>
+                        </div>"""
+        for e in entries
+    )
+    return f"""
+                <div class="bg-white rounded-2xl p-4 shadow-sm">
+                    <div class="flex justify-between items-center mb-3">
+                        <div class="flex items-center gap-2">
+                            <div class="{bg} p-2 rounded-lg {fg}"><i class="fas {icon}"></i></div>
+                            <span class="font-bold text-gray-800">{label}</span>
+                        </div>
+                        <span class="text-sm text-gray-500">{total:.0f} kcal</span>
+                    </div>
+                    <div class="border-l-2 border-gray-100 pl-3 space-y-3">{items}
+                    </div>
+                    <button class="w-full mt-3 py-2 text-green-600 text-sm font-bold border border-green-200 rounded-xl hover:bg-green-50">+ 新增{label}</button>
+                </div>"""
+
+
+def log_context(day: date, entries: list[Entry], status: StatusLookup = _saved) -> dict[str, object]:
+    by_meal: dict[str, list[Entry]] = {meal: [] for meal in MEALS}
+    for entry in entries:
+        if entry.meal in by_meal:
+            by_meal[entry.meal].append(entry)
+    # 早餐、午餐一定顯示；晚餐、點心有紀錄才顯示
+    sections = [
+        meal_section(meal, items, status)
+        for meal, items in by_meal.items()
+        if items or meal in ("breakfast", "lunch")
+    ]
+    prefix = "今天, " if day == date.today() else ""
+    return {
+        "log_date": f"{prefix}{day.month}月 {day.day}日",
+        "log_sections": "\n".join(sections),
+    }
+
+
+def stats_context(series: WeightSeries) -> dict[str, object]:
+    badges = []
+    if series.body_fat is not None:
+        badges.append(f"體脂 {series.body_fat:.1f}%")
+    delta = series.month_delta()
+    if delta:
+        badges.append(f"{'↓' if delta < 0 else '↑'} {abs(delta):.1f}kg (本月)")
+    return {
+        "weight": f"{series.latest:.1f}" if series.latest is not None else "--",
+        "weight_badges": "\n".join(
+            f'<span class="bg-white/20 px-3 py-1 rounded-full text-xs">{badge}</span>' for badge in badges
+        ),
+        "weight_series": _weight_series_json(series),
+        "trend_label": f"{TREND_WINDOW} 筆平均",
+    }
+
+
+def streak_context(tracker: StreakTracker, today: date, report: WeeklyReport | None = None) -> dict[str, object]:
+    under, logged = tracker.adherence(UNDER_TARGET, today - timedelta(days=6), today)
+    protein, _ = tracker.adherence(PROTEIN, today - timedelta(days=6), today)
+    return {
+        "streak": tracker.streak(UNDER_TARGET, today),
+        "streak_best": tracker.longest(UNDER_TARGET),
+        "protein_streak": tracker.streak(PROTEIN, today),
+        "adherence": f"{under}/{logged}" if logged else "--",
+        "protein_adherence": f"{protein}/{logged}" if logged else "--",
+        "weekly_report": weekly_report_html(report),
+    }
+
+
+def weekly_report_html(report: WeeklyReport | None) -> str:
+    if report is None:
+        return '<p class="text-xs text-gray-400">第一份週報會在下週一產生</p>'
+    end = report.week + timedelta(days=6)
+    items = [
+        f"記錄 {report.days_logged}/7 天",
+        f"在目標內 {report.days_under_target} 天",
+        f"蛋白質達標 {report.protein_days} 天",
+    ]
+    if report.days_logged:
+        items.append(f"平均 {report.avg_intake:.0f} kcal・蛋白質 {report.avg_protein:.0f}g")
+    if report.weight_change is not None:
+        items.append(f"體重 {'↓' if report.weight_change < 0 else '↑'} {abs(report.weight_change):.1f}kg")
+    return (
+        f'<p class="text-xs text-gray-400 mb-1">上週 ({report.week:%m/%d}–{end:%m/%d})</p>'
+        f'<p class="text-sm text-gray-600">{"・".join(items)}</p>'
+    )
+
+
+@trace.traced("chart.weights")
+def _weight_series_json(series: WeightSeries) -> str:
+    return json.dumps({"week": series.chart("week"), "month": series.chart("month")})
+
+
+ImageSource = Callable[[str], str]
+
+
+def _original(url: str) -> str:
+    return url
+
+
+def recipe_card(recipe: Recipe, diet_filter: str, visible: bool, image_src: ImageSource = _original) -> str:
+    if recipe.image:
+        src = escape(image_src(recipe.image))
+        image = f'<img src="{src}" class="w-full h-full object-cover" alt="{escape(recipe.name)}" loading="lazy">'
+    else:
+        image = '<div class="w-full h-full flex items-center justify-center text-green-300 text-3xl"><i class="fas fa-leaf"></i></div>'
+    style = "" if visible else ' style="display: none"'
+    return f"""
+                <div class="recipe-card bg-white rounded-2xl overflow-hidden shadow-sm" data-filter="{diet_filter}"{style}>
+                    <div class="h-32 bg-gray-200 relative">
+                        {image}
+                        <span class="absolute top-2 left-2 bg-white/90 px-2 py-1 rounded-md text-xs font-bold">{recipe.meal_label}</span>
+                    </div>
+                    <div class="p-3">
+                        <h3 class="font-bold text-gray-800 text-sm">{escape(recipe.name)}</h3>
+                        <div class="flex justify-between mt-2 text-xs text-gray-500">
+                            <span>{recipe.kcal:.0f} kcal</span>
+                            <span>{recipe.protein:.0f}g 蛋白</span>
+                        </div>
+                    </div>
+                </div>"""
+
+
+def recipe_context(
+    recommendations: dict[str, list[Recipe]],
+    active: str = "vegan",
+    image_src: ImageSource = _original,
+) -> dict[str, object]:
+    pills = []
+    for key, label in FILTERS.items():
+        if key == active:
+            cls = "bg-green-600 text-white font-bold"
+        else:
+            cls = "bg-white border border-gray-200 text-gray-600"
+        pills.append(
+            f'                    <span class="recipe-filter {cls} px-4 py-2 rounded-full text-sm whitespace-nowrap cursor-pointer"'
+            f' data-filter="{key}" onclick="showRecipes(\'{key}\')">{label}</span>'
+        )
+    cards = [
+        recipe_card(recipe, key, key == active, image_src)
+        for key, recipes in recommendations.items()
+        for recipe in recipes
+    ]
+    return {"recipe_filters": "\n".join(pills), "recipe_cards": "\n".join(cards)}
@@ -0,0 +1,180 @@
+"""體重趨勢。
+
+體重紀錄以 array 儲存 (日期序號 + 數值)，並維護前綴和，
+移動平均、週/月區間與「本月變化」都能在新增體重時增量更新。
+多年的紀錄送到瀏覽器前以 LTTB 降採樣到固定點數，
+不必每次 rerun 都把上千個點交給 Chart.js。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Sequence
+
+# 週/月切換對應的天數
+PERIODS = {"week": 7, "month": 31, "year": 365}
+MAX_CHART_POINTS = 60
+# 圖表上趨勢線的移動平均筆數
+TREND_WINDOW = 7
+
+
+@dataclass(frozen=True)
+class WeighIn:
+    user_id: str
+    day: date
+    weight: float
+    body_fat: float | None = None
+
+
+class WeightSeries:
+    """單一使用者依日期排序的體重序列，每天最多一筆。"""
+
+    def __init__(self, weigh_ins: Iterable[WeighIn] = ()):
+        self._lock = threading.RLock()
+        self._days = array("l")
+        self._values = array("d")
+        # _prefix[i] = 前 i 筆體重的總和
+        self._prefix = array("d", [0.0])
+        self.body_fat: float | None = None
+        self._body_fat_day: date | None = None
+        # chart() 的結果，新增體重時清空
+        self._charts: dict[tuple[str, int], dict[str, object]] = {}
+        self.version = 0
+        for weigh_in in sorted(weigh_ins, key=lambda w: w.day):
+            self.add(weigh_in)
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def add(self, weigh_in: WeighIn) -> None:
+        """新增體重；最新一天是 O(1)，補登過去的日子才需要重算後段前綴和。"""
+        ordinal = weigh_in.day.toordinal()
+        with self._lock:
+            self._charts.clear()
+            self.version += 1
+            if weigh_in.body_fat is not None and (self._body_fat_day is None or weigh_in.day >= self._body_fat_day):
+                self.body_fat = weigh_in.body_fat
+                self._body_fat_day = weigh_in.day
+            if not self._days or ordinal > self._days[-1]:
+                self._days.append(ordinal)
+                self._values.append(weigh_in.weight)
+                self._prefix.append(self._prefix[-1] + weigh_in.weight)
+                return
+            i = bisect_left(self._days, ordinal)
+            if i < len(self._days) and self._days[i] == ordinal:
+                self._values[i] = weigh_in.weight
+            else:
+                self._days.insert(i, ordinal)
+                self._values.insert(i, weigh_in.weight)
+                self._prefix.append(0.0)
+            for j in range(i, len(self._values)):
+                self._prefix[j + 1] = self._prefix[j] + self._values[j]
+
+    @property
+    def latest(self) -> float | None:
+        return self._values[-1] if self._values else None
+
+    @property
+    def latest_day(self) -> date | None:
+        return date.fromordinal(self._days[-1]) if self._days else None
+
+    def moving_average(self, window: int = TREND_WINDOW) -> list[float]:
+        """以最近 ``window`` 筆紀錄計算的移動平均，每點 O(1)。"""
+        with self._lock:
+            return [self._average(i, window) for i in range(len(self._values))]
+
+    def _average(self, i: int, window: int) -> float:
+        """到第 ``i`` 筆為止 (含) 最近 ``window`` 筆的平均。"""
+        p = self._prefix
+        return (p[i + 1] - p[max(0, i + 1 - window)]) / min(window, i + 1)
+
+    def month_delta(self) -> float | None:
+        """最新體重與本月第一筆的差 (「↓ 1.5kg (本月)」)。"""
+        with self._lock:
+            if not self._days:
+                return None
+            latest = date.fromordinal(self._days[-1])
+            first = bisect_left(self._days, latest.replace(day=1).toordinal())
+            return self._values[-1] - self._values[first]
+
+    def change(self, start: date, end: date) -> float | None:
+        """[start, end] 期間最後一筆與第一筆的差；不到兩筆時為 None。"""
+        with self._lock:
+            i = bisect_left(self._days, start.toordinal())
+            j = bisect_left(self._days, end.toordinal() + 1)
+            if j - i < 2:
+                return None
+            return round(self._values[j - 1] - self._values[i], 2)
+
+    def _window_start(self, days: int | None) -> int:
+        if not self._days or days is None:
+            return 0
+        return bisect_left(self._days, self._days[-1] - days + 1)
+
+    def window(self, days: int | None) -> tuple[list[date], list[float]]:
+        with self._lock:
+            if not self._days:
+                return [], []
+            start = self._window_start(days)
+            return (
+                [date.fromordinal(d) for d in self._days[start:]],
+                list(self._values[start:]),
+            )
+
+    def chart(self, period: str = "month", max_points: int = MAX_CHART_POINTS) -> dict[str, object]:
+        """weightChart 需要的 labels/data、移動平均趨勢線 (trend) 與 y 軸範圍，點數不超過 ``max_points``。"""
+        key = (period, max_points)
+        with self._lock:
+            if key not in self._charts:
+                self._charts[key] = self._chart(period, max_points)
+            return self._charts[key]
+
+    def _chart(self, period: str, max_points: int) -> dict[str, object]:
+        days, values = self.window(PERIODS.get(period))
+        start = self._window_start(PERIODS.get(period))
+        xs = [d.toordinal() for d in days]
+        keep = lttb(xs, values, max_points)
+        # 趨勢線只算保留的點；區間開頭的平均也包含區間之前的紀錄
+        trend = [round(self._average(start + i, TREND_WINDOW), 1) for i in keep]
+        values = [round(values[i], 1) for i in keep]
+        labels = [days[i].strftime("%m/%d") for i in keep]
+        if values:
+            y_min, y_max = math.floor(min(values + trend)) - 1, math.ceil(max(values + trend)) + 1
+        else:
+            y_min, y_max = 0, 1
+        return {"labels": labels, "data": values, "trend": trend, "min": y_min, "max": y_max}
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """Largest-Triangle-Three-Buckets 降採樣，回傳保留的索引。"""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    keep = [0]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        # 下一個桶的平均點
+        next_start, next_end = end, min(int((i + 2) * bucket) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        best, best_area = start, -1.0
+        ax, ay = xs[a], ys[a]
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
@@ -0,0 +1,317 @@
+"""非同步記錄餐點。
+
+記錄一筆餐點時先更新本地的每日累計 (樂觀更新) 並立即返回，
+Sheets 寫入與 Gemini 辨識在背景完成，失敗會重試，每筆紀錄都有
+同步中/失敗的狀態可顯示。Streamlit 的 rerun 不必等任何網路呼叫。
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import replace
+from datetime import date
+from enum import Enum
+from typing import Callable, Hashable, Iterable, Protocol, Sequence
+
+from .models import Entry
+from .recognition import FoodItem, FoodRecognizer
+from .summary import SummaryEngine
+
+log = logging.getLogger(__name__)
+
+
+class EntryStatus(str, Enum):
+    PENDING = "pending"
+    SAVED = "saved"
+    FAILED = "failed"
+
+
+class Sink(Protocol):
+    """背景寫入的目的地，LocalDiaryStore 即符合此介面。
+
+    ``add`` 以 entry_id 覆蓋 (upsert)：失敗後重送同一批不會多出重複的列。
+    """
+
+    def add(self, entries: Iterable[Entry]) -> None: ...
+
+    def flush(self) -> None: ...
+
+
+class InMemorySink:
+    """記憶體中的寫入目的地，用於開發與測試；``failures`` 次數內寫入會失敗。"""
+
+    def __init__(self, failures: int = 0):
+        self.entries: list[Entry] = []
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def add(self, entries: Iterable[Entry]) -> None:
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("sink unavailable")
+            self.entries.extend(entries)
+
+    def flush(self) -> None:
+        pass
+
+
+def split_entry(entry: Entry, items: Sequence[FoodItem]) -> list[Entry]:
+    """依辨識結果填入熱量；多項食物拆成多筆。
+
+    第一筆沿用原本的 entry_id (同步狀態、重試都跟著它)，其餘以 ``-1``、``-2``… 結尾，
+    重複處理同一筆紀錄會得到相同的 id。
+    """
+    if len(items) <= 1:
+        return [replace(entry, kcal=sum(i.kcal for i in items), protein=sum(i.protein for i in items))]
+    return [
+        replace(
+            entry,
+            entry_id=entry.entry_id if n == 0 else f"{entry.entry_id}-{n}",
+            name=item.name,
+            kcal=item.kcal,
+            protein=item.protein,
+        )
+        for n, item in enumerate(items)
+    ]
+
+
+class WriteBehindQueue:
+    """背景批次寫入。單一 worker 依序寫入，保留紀錄的先後順序。"""
+
+    def __init__(
+        self,
+        sink: Sink,
+        batch_size: int = 50,
+        retries: int = 3,
+        backoff: float = 0.5,
+        on_write: Callable[[Entry, str], None] | None = None,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        # 每筆寫入成功後以 (紀錄, 來源 session) 呼叫，用來讓共用快取失效
+        self.on_write = on_write
+        self._queue: queue.Queue[tuple[Entry, str]] = queue.Queue()
+        self._lock = threading.Lock()
+        # 只記錄尚未寫入或失敗的紀錄，寫入成功即移除
+        self._status: dict[str, EntryStatus] = {}
+        self._errors: dict[str, str] = {}
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+
+    def submit(self, entry: Entry, origin: str = "") -> None:
+        with self._lock:
+            self._status[entry.entry_id] = EntryStatus.PENDING
+            self._errors.pop(entry.entry_id, None)
+        self._queue.put((entry, origin))
+
+    def status(self, entry_id: str) -> EntryStatus:
+        return self._status.get(entry_id, EntryStatus.SAVED)
+
+    def error(self, entry_id: str) -> str | None:
+        return self._errors.get(entry_id)
+
+    def mark(self, entry_id: str, status: EntryStatus, error: str | None = None) -> None:
+        with self._lock:
+            if status is EntryStatus.SAVED:
+                self._status.pop(entry_id, None)
+                self._errors.pop(entry_id, None)
+            else:
+                self._status[entry_id] = status
+                if error:
+                    self._errors[entry_id] = error
+
+    def join(self, timeout: float | None = None) -> bool:
+        """等待佇列清空；回傳是否在時限內完成。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: list[tuple[Entry, str]]) -> None:
+        entries = [entry for entry, _ in batch]
+        added = False
+        for attempt in range(self.retries + 1):
+            try:
+                # add 成功、只有 flush 失敗時只重試 flush，不再 add 一次
+                if not added:
+                    self.sink.add(entries)
+                    added = True
+                self.sink.flush()
+            except Exception as exc:
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+                    continue
+                log.warning("write-behind failed for %d entries: %s", len(batch), exc)
+                for entry in entries:
+                    self.mark(entry.entry_id, EntryStatus.FAILED, str(exc))
+                return
+            for entry, origin in batch:
+                self.mark(entry.entry_id, EntryStatus.SAVED)
+                if self.on_write is not None:
+                    try:
+                        self.on_write(entry, origin)
+                    except Exception:
+                        log.exception("on_write failed for %s", entry.entry_id)
+            return
+
+
+class BackgroundWrites:
+    """紀錄以外的單筆背景寫入 (例如體重)：失敗以指數退避重試，狀態與重試方式同 ``WriteBehindQueue``。
+
+    以 ``key`` (例如 (使用者, 日期)) 追蹤；同一個 key 又送出新的寫入時，只看最新那一次的結果。
+    """
+
+    def __init__(self, executor: Executor, retries: int = 3, backoff: float = 0.5):
+        self.executor = executor
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        # 尚未完成或失敗的寫入 (重試時再執行一次)，寫入成功即移除
+        self._writes: dict[Hashable, Callable[[], None]] = {}
+        self._status: dict[Hashable, EntryStatus] = {}
+        self._errors: dict[Hashable, str] = {}
+
+    def submit(self, key: Hashable, write: Callable[[], None]) -> None:
+        with self._lock:
+            self._writes[key] = write
+            self._status[key] = EntryStatus.PENDING
+            self._errors.pop(key, None)
+        self.executor.submit(self._run, key, write)
+
+    def status(self, key: Hashable) -> EntryStatus:
+        return self._status.get(key, EntryStatus.SAVED)
+
+    def error(self, key: Hashable) -> str | None:
+        return self._errors.get(key)
+
+    def retry(self, key: Hashable) -> None:
+        write = self._writes.get(key)
+        if write is not None and self.status(key) is EntryStatus.FAILED:
+            self.submit(key, write)
+
+    def _run(self, key: Hashable, write: Callable[[], None]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                write()
+            except Exception as exc:
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+                    continue
+                log.warning("background write failed for %s: %s", key, exc)
+                self._finish(key, write, EntryStatus.FAILED, str(exc))
+                return
+            self._finish(key, write, EntryStatus.SAVED)
+            return
+
+    def _finish(self, key: Hashable, write: Callable[[], None], status: EntryStatus, error: str | None = None) -> None:
+        with self._lock:
+            if self._writes.get(key) is not write:
+                # 期間又送出了新的寫入，狀態以新的為準
+                return
+            if status is EntryStatus.SAVED:
+                del self._writes[key]
+                self._status.pop(key, None)
+            else:
+                self._status[key] = status
+                self._errors[key] = error or ""
+
+
+class MealLogger:
+    """記錄餐點：更新本地累計後立即返回，其餘交給背景。"""
+
+    def __init__(
+        self,
+        engine: SummaryEngine,
+        writer: WriteBehindQueue,
+        recognizer: FoodRecognizer | None = None,
+        executor: Executor | None = None,
+        origin: str = "",
+        current_engine: Callable[[], SummaryEngine | None] | None = None,
+    ):
+        self.engine = engine
+        # 目前 session 使用中的累計；session 重新載入後會換成新的 SummaryEngine
+        self.current_engine = current_engine
+        self.writer = writer
+        # 寫入的來源 (session id)，其他 session 據此判斷是否要重新載入
+        self.origin = origin
+        self.recognizer = recognizer
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="recognize")
+        # 辨識失敗、重試時需要重新辨識的紀錄
+        self._unrecognized: dict[str, bytes | None] = {}
+
+    def log(
+        self,
+        user_id: str,
+        day: date,
+        meal: str,
+        name: str,
+        kcal: float | None = None,
+        protein: float = 0.0,
+        image: bytes | None = None,
+    ) -> Entry:
+        entry = Entry(uuid.uuid4().hex, user_id, day, meal, name, kcal or 0.0, protein)
+        self.engine.add(entry)
+        if kcal is not None or self.recognizer is None:
+            self.writer.submit(entry, self.origin)
+            return entry
+        # 熱量未知：先以 0 kcal 顯示為同步中，辨識完成後更新並寫入
+        self.writer.mark(entry.entry_id, EntryStatus.PENDING)
+        self.executor.submit(self._recognize, entry, image)
+        return entry
+
+    def retry(self, entry_id: str) -> None:
+        entry = self.engine.get(entry_id)
+        if entry is None or self.writer.status(entry_id) is not EntryStatus.FAILED:
+            return
+        if entry_id in self._unrecognized:
+            self.writer.mark(entry_id, EntryStatus.PENDING)
+            self.executor.submit(self._recognize, entry, self._unrecognized.pop(entry_id))
+        else:
+            self.writer.submit(entry, self.origin)
+
+    def _recognize(self, entry: Entry, image: bytes | None) -> None:
+        try:
+            items = self.recognizer.recognize(text=entry.name, image=image)
+        except Exception as exc:
+            log.warning("recognition failed for %s: %s", entry.entry_id, exc)
+            self._unrecognized[entry.entry_id] = image
+            self.writer.mark(entry.entry_id, EntryStatus.FAILED, str(exc))
+            return
+        if self.current_engine is not None and self.current_engine() is not self.engine:
+            # 辨識期間 session 因其他 session 的寫入重新載入過：新的累計沒有這筆暫時紀錄，
+            # 不標來源寫入，寫入完成後這個 session 也會重新載入而看到結果
+            for part in split_entry(entry, items):
+                self.writer.submit(part)
+            return
+        if self.engine.get(entry.entry_id) is None:
+            # 辨識期間紀錄已被刪除
+            self.writer.mark(entry.entry_id, EntryStatus.SAVED)
+            return
+        # 「無糖豆漿 + 地瓜(中)」、便當照片：每項食物各一筆
+        for part in split_entry(entry, items):
+            self.engine.add(part)
+            self.writer.submit(part, self.origin)
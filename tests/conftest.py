@@ -0,0 +1,8 @@
+import os
+import tempfile
+from pathlib import Path
+
+# App 的本機資料庫與縮圖快取放到暫存目錄 (要在載入 diary 之前設定)
+_TMP = Path(tempfile.mkdtemp(prefix="diary-tests-"))
+os.environ.setdefault("DIARY_DB", str(_TMP / "diary.sqlite3"))
+os.environ.setdefault("DIARY_IMAGE_CACHE", str(_TMP / "images"))
@@ -0,0 +1,106 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from diary.local import LocalDiaryStore
+from diary.models import Entry
+
+APP = Path(__file__).parent.parent / "app.py"
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = AppTest.from_file(str(APP), default_timeout=60)
+    app.run()
+    app.radio(key="tab").set_value("log").run()
+    assert not app.exception
+    return app
+
+
+def log(app, text: str) -> list[tuple[str, float]]:
+    engine = app.session_state.diary_session.get("summary_engine", None)
+    before = len(engine.all_entries())
+    app.text_input[0].input(text)
+    app.button[0].click()
+    app.run()
+    assert not app.exception
+    return [(e.name, e.kcal) for e in engine.all_entries()[before:]]
+
+
+def test_exact_food_names_are_filled_from_the_index(app):
+    assert sorted(log(app, "無糖豆漿 + 地瓜 (中)")) == [("地瓜 (中)", 315.0), ("無糖豆漿", 135.0)]
+
+
+@pytest.mark.parametrize("text", ["豆漿", "dj"])
+def test_partial_matches_keep_the_typed_text(app, text):
+    # 部分相符不代換成索引的第一筆 (「豆漿」不是「豆漿紅茶」)，交給模型辨識
+    assert [name for name, _ in log(app, text)] == [text]
+
+
+@pytest.mark.parametrize(("token", "given"), [(None, "1"), ("s3cret", "1"), ("s3cret", None)])
+def test_debug_panel_needs_the_configured_token(monkeypatch, token, given):
+    if token:
+        monkeypatch.setenv("DIARY_DEBUG_TOKEN", token)
+    else:
+        monkeypatch.delenv("DIARY_DEBUG_TOKEN", raising=False)
+    app = AppTest.from_file(str(APP), default_timeout=60)
+    if given:
+        app.query_params["debug"] = given
+    app.session_state["profile_next"] = True
+    app.run()
+    assert not app.exception
+    assert not app.expander
+    assert not any(c.language == "text" for c in app.code)
+
+
+def test_debug_panel_opens_with_the_token(monkeypatch):
+    monkeypatch.setenv("DIARY_DEBUG_TOKEN", "s3cret")
+    app = AppTest.from_file(str(APP), default_timeout=60)
+    app.query_params["debug"] = "s3cret"
+    app.run()
+    assert not app.exception
+    assert app.expander[0].label.startswith("🔧 rerun")
+    app.checkbox(key="profile_next").check().run()
+    assert app.code
+
+
+def goals_caption(app: AppTest) -> str:
+    return next(c.value for c in app.caption if "kcal" in c.value)
+
+
+def test_profile_saved_in_one_session_reaches_the_others():
+    first, second = (AppTest.from_file(str(APP), default_timeout=60) for _ in range(2))
+    for app in (first, second):
+        app.run()
+        app.radio(key="tab").set_value("stats").run()
+    before = goals_caption(second)
+    [activity, goal] = first.selectbox
+    activity.set_value("very_active")
+    goal.set_value("gain")
+    first.button(key="FormSubmitter:profile-儲存").click().run()
+    assert not first.exception
+    assert goals_caption(first) != before
+    # 同一使用者在另一個 session：下一次 rerun 就看到新的目標
+    second.run()
+    assert goals_caption(second) == goals_caption(first)
+
+
+def test_unparsed_entries_are_only_queried_after_a_change(monkeypatch):
+    calls = []
+    unparsed = LocalDiaryStore.unparsed
+    monkeypatch.setattr(LocalDiaryStore, "unparsed", lambda self, *args: calls.append(args) or unparsed(self, *args))
+    app = AppTest.from_file(str(APP), default_timeout=60)
+    app.run()
+    app.radio(key="tab").set_value("stats").run()
+    app.run()
+    app.run()
+    assert len(calls) == 1
+    app.number_input[0].set_value(60.0)
+    app.button(key="FormSubmitter:log_weight-紀錄").click().run()
+    assert len(calls) == 1
+    # 新增紀錄 (資料版本改變) 才重新查詢
+    app.session_state.diary_session.get("summary_engine", None).add(Entry("new", "demo", date.today(), "lunch", "粥", 0))
+    app.run()
+    assert len(calls) == 2
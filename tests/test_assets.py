@@ -0,0 +1,54 @@
+from diary import assets
+from diary.assets import compile_css, main, unknown_classes
+
+TEMPLATE = """<html><head><style>
+.phone-frame { width: 375px; }
+.nav-item.active { color: #16a34a; }
+</style></head><body>
+<div class="phone-frame p-4 bg-green-650 hover:text-purple-500">
+  <a class="nav-item $nav_home fas fa-home tracking-wide">首頁</a>
+  <span class="{cls} text-sm focus:bg-green-50 visited:text-gray-500"></span>
+</div>
+<script>el.classList.add('mt-huge'); el.classList.toggle('active');</script>
+</body></html>
+"""
+
+
+def test_check_passes_on_the_templates():
+    # 模板或 views.py 加了編譯不出規則的 class、或 tailwind.css 沒重建，這裡就會失敗
+    assert unknown_classes() == set()
+    assert main(["--check"]) == 0
+
+
+def test_unknown_utility_classes_are_reported(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(TEMPLATE, encoding="utf-8")
+    views = tmp_path / "views.py"
+    views.write_text('COLORS = {"x": ("bg-yellow-100", "text-yelow-600")}\n'
+                     "HTML = f'<p class=\"mb-1 ml-wide\">{1}</p>'\n", encoding="utf-8")
+
+    assert unknown_classes([page, views]) == {
+        "bg-green-650", "hover:text-purple-500", "tracking-wide", "visited:text-gray-500", "mt-huge",
+        "text-yelow-600", "ml-wide",
+    }
+
+
+def test_check_fails_on_unknown_classes(tmp_path, monkeypatch, capsys):
+    page = tmp_path / "page.html"
+    page.write_text('<div class="p-4 bg-green-650"></div>', encoding="utf-8")
+    css = tmp_path / "tailwind.css"
+    monkeypatch.setattr(assets, "CONTENT", [page])
+    monkeypatch.setattr(assets, "CSS_PATH", css)
+    css.write_text(assets.build([page]), encoding="utf-8")
+
+    assert main(["--check"]) == 1
+    assert "bg-green-650" in capsys.readouterr().err
+
+
+def test_compiled_rules():
+    css = compile_css({"p-4", "hover:bg-green-50", "w-1/2", "bg-white/90", "nope"})
+
+    assert ".p-4{padding:1rem}" in css.replace(" ", "").replace("\n", "")
+    assert ".hover\\:bg-green-50:hover" in css
+    assert ".w-1\\/2" in css
+    assert "nope" not in css
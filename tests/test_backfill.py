@@ -0,0 +1,64 @@
+from datetime import date
+
+from diary.backfill import Backfill
+from diary.models import Entry
+from diary.recognition import FoodRecognizer, RateLimitError, RecognitionError, StubModel
+from diary.writer import InMemorySink
+
+
+def entries(*names: str) -> list[Entry]:
+    return [Entry(f"e{n}", "u", date(2026, 10, 1), "lunch", name, 0) for n, name in enumerate(names)]
+
+
+class Model(StubModel):
+    """依 ``fail(prompt, calls)`` 丟出例外，其餘照查表回應。"""
+
+    def __init__(self, fail):
+        super().__init__({"豆漿": [{"name": "無糖豆漿", "kcal": 135, "protein": 11}]})
+        self.fail = fail
+
+    def generate(self, prompt, image=None):
+        error = self.fail(prompt, self.calls)
+        if error is not None:
+            with self._lock:
+                self.calls += 1
+            raise error
+        return super().generate(prompt, image)
+
+
+def backfill(model, **options) -> tuple[Backfill, InMemorySink]:
+    sink = InMemorySink()
+    return Backfill(FoodRecognizer(model), sink, sleep=lambda s: None, backoff=0.0, **options), sink
+
+
+def test_outage_backs_off_and_stops_instead_of_splitting():
+    model = Model(lambda prompt, calls: ConnectionError("network down"))
+    job, sink = backfill(model, batch_size=25, concurrency=1, retries=3)
+    result = job.run(entries(*(f"豆漿 {n}" for n in range(60))))
+    # 第一批試 4 次後停止，其他批次不再送出
+    assert model.calls == 4
+    assert result.stopped and result.updated == 0 and result.failed == 60
+    assert sink.entries == []
+
+
+def test_transient_error_retries_the_whole_batch():
+    model = Model(lambda prompt, calls: TimeoutError("slow") if calls == 0 else None)
+    job, sink = backfill(model, batch_size=25)
+    result = job.run(entries("豆漿", "無糖豆漿"))
+    assert (model.calls, result.updated, result.stopped) == (2, 2, False)
+
+
+def test_unparseable_response_splits_down_to_the_bad_name():
+    model = Model(lambda prompt, calls: RecognitionError("bad json") if "壞掉" in prompt else None)
+    job, sink = backfill(model, batch_size=4, concurrency=1)
+    result = job.run(entries("豆漿 1", "豆漿 2", "壞掉", "豆漿 3"))
+    assert (result.updated, result.failed, result.stopped) == (3, 1, False)
+    # 4 → 2 + 2 → 壞掉的那半再拆成 1 + 1
+    assert model.calls == 5
+
+
+def test_rate_limit_gives_up_on_the_batch_but_keeps_going():
+    model = Model(lambda prompt, calls: RateLimitError("429") if "豆漿 1" in prompt else None)
+    job, sink = backfill(model, batch_size=1, concurrency=1, retries=2)
+    result = job.run(entries("豆漿 1", "豆漿 2"))
+    assert (result.updated, result.rate_limited, result.stopped) == (1, 3, False)
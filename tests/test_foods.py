@@ -0,0 +1,32 @@
+import pytest
+
+from diary.foods import CONFIDENT_SCORE, FoodIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FoodIndex.from_csv()
+
+
+def top(index, query):
+    match = index.search(query, limit=1, fuzzy=False)[0]
+    return match.food.name, match.score
+
+
+@pytest.mark.parametrize(
+    "query, name",
+    [("地瓜", "地瓜 (中)"), ("地瓜 (小)", "地瓜 (小)"), ("地瓜（小）", "地瓜 (小)"), ("無糖豆漿", "無糖豆漿"), ("wutangdoujiang", "無糖豆漿"), ("wtdj", "無糖豆漿"), ("地瓜葉", "地瓜葉")],
+)
+def test_exact_matches_are_confident(index, query, name):
+    assert top(index, query) == (name, 1.0)
+
+
+@pytest.mark.parametrize("query", ["豆漿", "dj", "doujiang"])
+def test_partial_matches_are_not_confident(index, query):
+    assert top(index, query)[1] < CONFIDENT_SCORE
+
+
+def test_partial_hit_scores_by_coverage(index):
+    scores = {m.food.name: m.score for m in index.search("地瓜")}
+    assert scores["地瓜 (中)"] == 1.0
+    assert scores["地瓜葉"] == pytest.approx(2 / 3)
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+import pytest
+
+from diary.goals import (
+    DEFAULT_GOALS,
+    MIN_TARGET_KCAL,
+    GoalEngine,
+    Profile,
+    adaptive_tdee,
+    bmr,
+    compute_goals,
+    tdee,
+    weight_slope,
+)
+from diary.weights import WeighIn, WeightSeries
+
+START = date(2026, 9, 1)
+MAN = Profile("m", "male", 30, 175, activity="light")
+WOMAN = Profile("w", "female", 30, 165, activity="moderate")
+
+
+def series(user_id: str, weights: list[float], every: int = 1) -> WeightSeries:
+    return WeightSeries(WeighIn(user_id, START + timedelta(days=i * every), w) for i, w in enumerate(weights))
+
+
+def test_mifflin_st_jeor_reference_values():
+    # 10 × 70 + 6.25 × 175 − 5 × 30 + 5
+    assert bmr(MAN, 70) == pytest.approx(1648.75)
+    # 10 × 60 + 6.25 × 165 − 5 × 30 − 161
+    assert bmr(WOMAN, 60) == pytest.approx(1320.25)
+    assert tdee(MAN, 70) == pytest.approx(1648.75 * 1.375)
+    assert tdee(WOMAN, 60) == pytest.approx(1320.25 * 1.55)
+
+
+def test_formula_goals_without_enough_intake():
+    goals = compute_goals(MAN, series("m", [70.0]))
+    assert (goals.bmr, goals.tdee, goals.adaptive_tdee) == (1649, 2267, None)
+    assert (goals.target_kcal, goals.protein_goal) == (2267, 112)
+    cut = compute_goals(Profile("m", "male", 30, 175, goal="lose"), series("m", [70.0]))
+    assert (cut.target_kcal, cut.protein_goal) == (round(1648.75 * 1.375 * 0.8), 140)
+    assert compute_goals(MAN, WeightSeries()) == DEFAULT_GOALS
+
+
+def test_target_never_drops_below_the_floor():
+    tiny = Profile("w", "female", 80, 140, activity="sedentary", goal="lose")
+    assert compute_goals(tiny, series("w", [40.0])).target_kcal == MIN_TARGET_KCAL
+
+
+def test_weight_slope_is_least_squares():
+    days = [START + timedelta(days=i) for i in range(5)]
+    assert weight_slope(days, [60, 59.9, 59.8, 59.7, 59.6]) == pytest.approx(-0.1)
+    assert weight_slope(days[:1], [60]) == 0.0
+
+
+def test_adaptive_tdee_from_intake_and_weight_trend():
+    # 28 天每天 -0.05 kg、平均攝取 2000 kcal → 實際消耗 2000 + 0.05 × 7700 = 2385
+    weights = series("w", [60 - i * 0.05 for i in range(28)])
+    estimate = tdee(WOMAN, weights.latest)
+    assert adaptive_tdee(weights, [2000.0] * 28, estimate) == pytest.approx(2385)
+    assert compute_goals(WOMAN, weights, [2000.0] * 28).adaptive_tdee == 2385
+    # 記錄天數不足時不校正
+    assert adaptive_tdee(weights, [2000.0] * 13, estimate) is None
+    # 攝取漏記太多時以公式值的 ±25% 為限
+    assert adaptive_tdee(weights, [500.0] * 28, estimate) == pytest.approx(estimate * 0.75)
+
+
+def test_engine_memoizes_until_profile_or_weight_changes():
+    calls = []
+
+    def intake(user_id, start, end):
+        calls.append((user_id, start, end))
+        return [2000.0] * 28
+
+    engine = GoalEngine(intake)
+    weights = series("w", [60 - i * 0.05 for i in range(28)])
+    first = engine.goals("w", WOMAN, weights)
+    assert engine.goals("w", WOMAN, weights) is first
+    assert engine.computes == 1
+    # 校正期間是最後一筆體重往前 28 天
+    assert calls == [("w", START, START + timedelta(days=27))]
+
+    heavier = Profile("w", "female", 30, 165, activity="active")
+    assert engine.goals("w", heavier, weights) != first
+    assert engine.computes == 2
+
+    weights.add(WeighIn("w", START + timedelta(days=28), 58.0))
+    updated = engine.goals("w", heavier, weights)
+    assert engine.computes == 3
+    assert updated.protein_goal == round(58.0 * 1.6)
+    assert engine.goals("w", None, weights) == DEFAULT_GOALS
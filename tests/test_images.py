@@ -0,0 +1,125 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from diary import images
+from diary.images import THUMBNAIL_SIZE, UPLOAD_MAX_SIDE, ImageCache, make_thumbnail, prepare_upload
+
+ORIENTATION = 0x0112
+
+
+def jpeg(size: tuple[int, int], orientation: int | None = None, color=(120, 180, 90)) -> bytes:
+    image = Image.new("RGB", size, color)
+    # 左上角做記號，才看得出有沒有轉正
+    image.paste((255, 0, 0), (0, 0, size[0] // 4, size[1] // 4))
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    image.save(buffer, format="JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def opened(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_upload_is_downscaled_and_rotated_upright():
+    # 相機橫拍、EXIF 標示要順時針轉 90 度
+    data = prepare_upload(jpeg((3000, 2000), orientation=6))
+    image = opened(data)
+    assert image.size == (round(UPLOAD_MAX_SIDE * 2000 / 3000), UPLOAD_MAX_SIDE)
+    assert image.getexif().get(ORIENTATION) in (None, 1)
+    # 紅色記號轉到右上角
+    assert image.getpixel((image.width - 5, 5))[0] > 200
+    assert prepare_upload(jpeg((3000, 2000), orientation=6)) == data
+
+
+def test_small_upload_is_not_enlarged():
+    assert opened(prepare_upload(jpeg((400, 300)))).size == (400, 300)
+
+
+def test_thumbnail_is_cropped_to_the_card_size():
+    assert opened(make_thumbnail(jpeg((1000, 300)))).size == THUMBNAIL_SIZE
+
+
+def test_lru_eviction_keeps_the_cache_under_its_cap(tmp_path):
+    cache = ImageCache(tmp_path, max_bytes=250)
+    for key in "abc":
+        cache.put(key, bytes(100))
+    # c 讓總量超過上限，最久沒用的 a 被淘汰
+    assert cache.get("a") is None and not (tmp_path / "a.jpg").exists()
+    cache.get("b")
+    cache.put("d", bytes(100))
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.jpg")) <= 250
+    # 重新開啟時從磁碟讀回目前的大小
+    reopened = ImageCache(tmp_path, max_bytes=250)
+    reopened.put("e", bytes(100))
+    assert len(list(tmp_path.glob("*.jpg"))) == 2
+
+
+def test_single_file_larger_than_the_cap_is_kept(tmp_path):
+    cache = ImageCache(tmp_path, max_bytes=10)
+    cache.put("big", bytes(100))
+    assert cache.get("big") == bytes(100)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "STATIC_DIR", tmp_path)
+    return tmp_path / "thumbs"
+
+
+def test_thumbnail_is_built_in_the_background_and_served_statically(static, monkeypatch):
+    fetched = []
+    monkeypatch.setattr(images, "fetch", lambda url: fetched.append(url) or jpeg((800, 600)))
+    executor = ThreadPoolExecutor(1)
+    cache = ImageCache(static, executor=executor)
+    url = "https://example.com/bowl.jpg"
+    assert cache.thumbnail_src(url) == url
+    executor.shutdown(wait=True)
+    src = cache.thumbnail_src(url)
+    assert src.startswith("app/static/thumbs/") and src.endswith(".jpg")
+    assert (static / src.rsplit("/", 1)[1]).exists()
+    assert cache.version == 1 and fetched == [url]
+    # 重啟後從 .ref 找回縮圖，不再下載
+    assert ImageCache(static, executor=ThreadPoolExecutor(1)).thumbnail_src(url) == src
+    assert fetched == [url]
+
+
+def test_failed_download_is_not_retried_until_the_ttl(static, monkeypatch):
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        raise OSError("404")
+
+    monkeypatch.setattr(images, "fetch", fetch)
+    clock = Clock()
+    executor = ThreadPoolExecutor(1)
+    cache = ImageCache(static, executor=executor, failure_ttl=60, clock=clock)
+    url = "https://example.com/missing.jpg"
+    cache.thumbnail_src(url)
+    executor.shutdown(wait=True)
+    cache.executor = ThreadPoolExecutor(1)
+    assert cache.thumbnail_src(url) == url
+    clock.now = 61
+    cache.thumbnail_src(url)
+    cache.executor.shutdown(wait=True)
+    assert len(calls) == 2
+
+
+def test_cache_outside_static_returns_the_original_url(tmp_path):
+    assert ImageCache(tmp_path / "elsewhere").thumbnail_src("https://example.com/a.jpg") == "https://example.com/a.jpg"
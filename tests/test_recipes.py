@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from diary.recipes import DIETS, LIGHT_KCAL, Recipe, RecipeCatalog, RecipeRecommender
+
+
+def catalog(n: int = 500, seed: int = 0) -> RecipeCatalog:
+    rng = random.Random(seed)
+    return RecipeCatalog(
+        [
+            Recipe(f"r{i}", "lunch", rng.uniform(80, 1200), rng.uniform(0, 60), rng.choice(DIETS))
+            for i in range(n)
+        ]
+    )
+
+
+def naive_score(recipe: Recipe, remaining: float, gap: float) -> float:
+    target = min(max(remaining, 150), 700)
+    kcal_fit = 1 - min(abs(recipe.kcal - target) / target, 1)
+    protein_fit = min(recipe.protein, gap) / gap if gap > 0 else 0.0
+    over = recipe.kcal > max(remaining, 0) + 50
+    return 0.6 * kcal_fit + 0.4 * protein_fit - 0.5 * over
+
+
+def allowed(recipe: Recipe, diet_filter: str) -> bool:
+    if diet_filter == "vegan":
+        return recipe.diet == "vegan"
+    if diet_filter == "light":
+        return recipe.kcal <= LIGHT_KCAL
+    return True
+
+
+@pytest.mark.parametrize("diet_filter", ["vegan", "lacto-ovo", "light"])
+@pytest.mark.parametrize(("remaining", "gap"), [(600, 30), (100, 0), (-200, 10), (1500, 80)])
+def test_top_k_matches_naive_sorting(diet_filter, remaining, gap):
+    recipes = catalog()
+    expected = sorted(
+        (r for r in recipes.recipes if allowed(r, diet_filter)), key=lambda r: -naive_score(r, remaining, gap)
+    )[:6]
+    got = recipes.top_k(remaining, gap, diet_filter, k=6)
+    assert [naive_score(r, remaining, gap) for r in got] == pytest.approx([naive_score(r, remaining, gap) for r in expected])
+    assert got == expected
+
+
+def test_top_k_with_fewer_matches_than_k():
+    recipes = RecipeCatalog([Recipe("a", "lunch", 300, 10, "vegan"), Recipe("b", "lunch", 900, 30, "lacto-ovo")])
+    assert [r.name for r in recipes.top_k(500, 20, "vegan", k=6)] == ["a"]
+    assert recipes.top_k(500, 20, "light", k=0) == []
+
+
+class CountingCatalog(RecipeCatalog):
+    def __init__(self, recipes):
+        super().__init__(recipes)
+        self.calls = []
+
+    def top_k(self, remaining_kcal, protein_gap, diet_filter, k=6):
+        self.calls.append((remaining_kcal, protein_gap, diet_filter))
+        return super().top_k(remaining_kcal, protein_gap, diet_filter, k)
+
+
+def test_same_bucket_hits_the_cache_and_a_new_bucket_recomputes():
+    recipes = CountingCatalog(catalog().recipes)
+    recommender = RecipeRecommender(recipes)
+    first = recommender.recommend("u", 1010, 22)
+    # 1040 kcal、24g 與 1010 kcal、22g 落在同一個區間
+    assert recommender.recommend("u", 1040, 24) == first
+    assert recipes.calls == [(1025.0, 22.5, "vegan")]
+    recommender.recommend("u", 1060, 22)
+    recommender.recommend("u", 1010, 26)
+    recommender.recommend("u", 1010, 22, "light")
+    recommender.recommend("v", 1010, 22)
+    assert len(recipes.calls) == 5
+    # 紀錄變動後清掉這位使用者的快取
+    assert recommender.invalidate_user("u") == 4
+    recommender.recommend("u", 1010, 22)
+    recommender.recommend("v", 1010, 22)
+    assert len(recipes.calls) == 6
@@ -0,0 +1,46 @@
+import threading
+
+from diary.recognition import FoodItem, FoodRecognizer, StubModel
+
+RESPONSES = {
+    "豆漿": [{"name": "無糖豆漿", "kcal": 135, "protein": 11}],
+    "地瓜": [{"name": "地瓜 (中)", "kcal": 315, "protein": 4}],
+}
+
+
+def test_cache_hit_skips_the_model():
+    model = StubModel(RESPONSES)
+    recognizer = FoodRecognizer(model)
+    first = recognizer.recognize(text="無糖豆漿")
+    # 全形空白、多餘空白視為同一個輸入
+    again = recognizer.recognize(text="  無糖豆漿　")
+    assert first == again == [FoodItem("無糖豆漿", 135, 11)]
+    assert model.calls == 1
+
+
+def test_identical_requests_are_coalesced():
+    model = StubModel(RESPONSES, delay=0.2)
+    recognizer = FoodRecognizer(model)
+    results = []
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        results.append(recognizer.recognize(text="地瓜"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.calls == 1
+    assert results == [[FoodItem("地瓜 (中)", 315, 4)]] * 8
+
+
+def test_batch_uses_cache_and_one_call():
+    model = StubModel(RESPONSES)
+    recognizer = FoodRecognizer(model)
+    recognizer.recognize(text="豆漿")
+    found = recognizer.recognize_batch(["豆漿", "地瓜", "地瓜"])
+    assert found == {"豆漿": [FoodItem("無糖豆漿", 135, 11)], "地瓜": [FoodItem("地瓜 (中)", 315, 4)]}
+    assert model.calls == 2
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import pytest
+
+from diary.goals import GoalEngine, Profile
+from diary.local import LocalDatabase, LocalDiaryStore, LocalProfileStore, LocalReportStore, LocalWeightStore
+from diary.models import Entry
+from diary.reports import ReportBuilder, WeeklyReportJob
+from diary.weights import WeighIn
+
+# 2026-09-28、10-05、10-12 都是星期一
+WEEK1, WEEK2, WEEK3 = date(2026, 9, 28), date(2026, 10, 5), date(2026, 10, 12)
+TODAY = date(2026, 10, 21)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return LocalDatabase(tmp_path / "diary.sqlite3")
+
+
+def log(db, user: str, start: date, days: int, kcal: float = 1500) -> None:
+    LocalDiaryStore(db).add(
+        Entry(f"{user}-{start + timedelta(days=i)}", user, start + timedelta(days=i), "lunch", "飯", kcal, 150) for i in range(days)
+    )
+
+
+def streaks(db, week: date) -> dict[str, tuple[int, int]]:
+    return {u: (r.streak, r.protein_streak) for u, r in LocalReportStore(db).week(week).items()}
+
+
+def test_first_report_reads_history_then_chains(db):
+    # 從第一週的星期三開始每天達標
+    log(db, "u", WEEK1 + timedelta(days=2), 19)
+    builder = ReportBuilder(db)
+    builder.run(WEEK2)
+    assert streaks(db, WEEK2) == {"u": (12, 12)}
+    builder.run(WEEK3)
+    assert streaks(db, WEEK3) == {"u": (19, 19)}
+
+
+def test_missing_sunday_resets_the_streak_at_the_week_boundary(db):
+    log(db, "u", WEEK1, 13)
+    builder = ReportBuilder(db)
+    builder.run_since(WEEK1, WEEK2)
+    assert streaks(db, WEEK1) == {"u": (7, 7)}
+    # 第二週週一到週六達標、週日沒記錄
+    report = LocalReportStore(db).week(WEEK2)["u"]
+    assert (report.streak, report.days_logged, report.days_under_target) == (0, 6, 6)
+    # 下一週沒有紀錄也沒有連續天數的使用者不產生報告
+    assert builder.build(WEEK3) == []
+
+
+def test_user_with_a_streak_gets_a_zero_report_for_an_empty_week(db):
+    log(db, "u", WEEK1, 7)
+    builder = ReportBuilder(db)
+    builder.run(WEEK1)
+    [report] = builder.build(WEEK2)
+    assert (report.streak, report.days_logged, report.avg_intake) == (0, 0, 0.0)
+
+
+def test_backdated_delete_rebuilds_later_weeks(db):
+    log(db, "u", WEEK1, 21)
+    job = WeeklyReportJob(db, today=lambda: TODAY)
+    job.builder.run_since(WEEK1, WEEK3)
+    assert streaks(db, WEEK3) == {"u": (21, 21)}
+    assert not job.run_pending()
+    # 刪掉第二週的星期三：第二週、第三週的連續天數都要更正
+    LocalDiaryStore(db).remove([f"u-{WEEK2 + timedelta(days=2)}"])
+    assert LocalReportStore(db).stale()[0] == WEEK2
+    assert job.run_pending()
+    assert streaks(db, WEEK1) == {"u": (7, 7)}
+    assert streaks(db, WEEK2) == {"u": (4, 4)}
+    assert streaks(db, WEEK3) == {"u": (11, 11)}
+    assert LocalReportStore(db).stale()[0] is None
+    assert not job.run_pending()
+
+
+def test_backdated_insert_and_weigh_in_mark_their_week(db):
+    log(db, "u", WEEK2, 7)
+    ReportBuilder(db).run(WEEK2)
+    reports = LocalReportStore(db)
+    # 報告之後的週不算；已有報告的週與之前的週才標記
+    log(db, "u", WEEK3, 1)
+    assert reports.stale()[0] is None
+    LocalWeightStore(db).add([WeighIn("u", WEEK2 + timedelta(days=3), 60.0)])
+    assert reports.stale()[0] == WEEK2
+    log(db, "v", WEEK1 + timedelta(days=6), 1)
+    since, marker = reports.stale()
+    assert since == WEEK1
+    reports.clear_stale(marker)
+    assert reports.stale()[0] is None
+
+
+def test_goals_read_intake_for_all_users_in_one_query(db, monkeypatch):
+    start = WEEK1 - timedelta(days=21)
+    weights = LocalWeightStore(db)
+    for user, kcal in (("a", 1800), ("b", 2600)):
+        LocalProfileStore(db).save(Profile(user, "female", 30, 165))
+        log(db, user, start, 28, kcal)
+        weights.add([WeighIn(user, start + timedelta(days=i), 60 - i * 0.05) for i in range(0, 28, 3)])
+    builder = ReportBuilder(db)
+    series = builder._series(WEEK1 + timedelta(days=6))
+    expected = {u: GoalEngine(builder.diary.logged_intake).goals(u, LocalProfileStore(db).get(u), series[u]) for u in series}
+
+    calls = []
+    monkeypatch.setattr(builder.diary, "logged_intake", lambda *args: calls.append(args))
+    query = db.query
+    queries = []
+    monkeypatch.setattr(db, "query", lambda sql, params=(): queries.append(sql) or query(sql, params))
+    goals = builder._goals(["a", "b"], series)
+    assert goals == expected
+    assert goals["a"].adaptive_tdee is not None
+    assert calls == []
+    assert sum("daily_totals" in sql for sql in queries) == 1
@@ -0,0 +1,43 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from diary.models import MEALS, Entry
+from diary.rollups import MealRollups
+from diary.summary import SummaryEngine
+
+START = date(2026, 1, 1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_rollups_match_a_rebuild(seed):
+    rng = random.Random(seed)
+    engine = SummaryEngine()
+    rollups = MealRollups()
+    engine.subscribe(rollups.apply, init=rollups.rebuild)
+    meals = [*MEALS, "exercise"]
+    ids = []
+    for n in range(500):
+        op = rng.random()
+        if ids and op < 0.3:
+            engine.remove(ids.pop(rng.randrange(len(ids))))
+        else:
+            # 同一個 entry_id 再加一次是修改 (換日期、餐別、熱量)
+            entry_id = rng.choice(ids) if ids and op < 0.45 else f"e{n}"
+            day = START + timedelta(days=rng.randrange(90))
+            entry = Entry(entry_id, rng.choice(["u1", "u2"]), day, rng.choice(meals), "x", rng.randrange(50, 900))
+            engine.add(entry)
+            if entry_id not in ids:
+                ids.append(entry_id)
+        if n % 50 == 0:
+            assert rollups.verify(engine.all_entries())
+    assert rollups.verify(engine.all_entries())
+
+
+def test_verify_detects_drift():
+    entries = [Entry("e1", "u", START, "lunch", "x", 500)]
+    rollups = MealRollups(entries)
+    assert rollups.verify(entries)
+    rollups.apply(Entry("ghost", "u", START, "dinner", "x", 100), 1)
+    assert not rollups.verify(entries)
@@ -0,0 +1,42 @@
+from diary.session import SessionState, UserVersions
+
+
+def test_own_writes_are_not_changes_elsewhere():
+    versions = UserVersions()
+    versions.bump("u", "a")
+    versions.bump("u", "a")
+    assert not versions.changed_elsewhere("u", "a", 0)
+    assert versions.changed_elsewhere("u", "b", 0)
+    # 已經看過的寫入不算
+    versions.bump("u", "b")
+    assert not versions.changed_elsewhere("u", "a", 3)
+    assert versions.changed_elsewhere("u", "a", 2)
+    # 其他使用者的寫入無關
+    versions.bump("v", "b")
+    assert not versions.changed_elsewhere("u", "a", 3)
+
+
+def test_overflowed_history_counts_as_changed():
+    versions = UserVersions(history=2)
+    for _ in range(3):
+        versions.bump("u", "a")
+    # 版本 1 已被擠掉，無法確認是不是自己寫的
+    assert versions.changed_elsewhere("u", "a", 0)
+    assert not versions.changed_elsewhere("u", "a", 1)
+
+
+def test_refresh_reloads_only_after_another_sessions_write():
+    versions = UserVersions()
+    first = SessionState("u", "小明", versions)
+    second = SessionState("u", "小明", versions)
+    loads = []
+    for session in (first, second):
+        session.get("entries", lambda: loads.append(session.session_id) or [])
+    versions.bump("u", first.session_id)
+    assert not first.refresh()
+    assert second.refresh()
+    # 重置後 get 重新載入，已看過的版本不再觸發重置
+    second.get("entries", lambda: loads.append(second.session_id) or [])
+    assert loads == [first.session_id, second.session_id, second.session_id]
+    assert not second.refresh()
+    assert not SessionState("v", "小華", versions).refresh()
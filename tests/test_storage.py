@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+from diary.local import LocalDatabase, LocalDiaryStore, LocalWeightStore
+from diary.models import Entry
+from diary.storage import (
+    InMemoryBackend,
+    entries_to_frame,
+    frame_to_entries,
+    frame_to_weigh_ins,
+    weigh_ins_to_frame,
+)
+from diary.weights import WeighIn
+
+DAY = date(2026, 10, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return LocalDatabase(tmp_path / "diary.sqlite3")
+
+
+def entry(entry_id: str, day: date = DAY, user_id: str = "u", kcal: float = 100.0) -> Entry:
+    return Entry(entry_id, user_id, day, "lunch", "飯", kcal)
+
+
+def test_frames_round_trip():
+    entries = [entry("e1"), Entry("e2", "u", DAY, "dinner", "麵", 450.0, 12.5)]
+    weigh_ins = [WeighIn("u", DAY, 60.2, 21.5), WeighIn("u", date(2026, 10, 2), 60.0)]
+    assert frame_to_entries(entries_to_frame(entries)) == entries
+    assert frame_to_weigh_ins(weigh_ins_to_frame(weigh_ins)) == weigh_ins
+
+
+def test_backend_returns_copies():
+    backend = InMemoryBackend()
+    frame = entries_to_frame([entry("e1")])
+    backend.write("diary", frame)
+    frame.loc[0, "kcal"] = 999
+    read = backend.read("diary")
+    read.loc[0, "kcal"] = 0
+    assert backend.read("diary").loc[0, "kcal"] == 100
+    assert (backend.reads, backend.writes) == (2, 1)
+    assert backend.read("missing").empty
+
+
+def test_add_is_an_upsert_by_entry_id(db):
+    store = LocalDiaryStore(db)
+    store.add([entry("e1"), entry("e2", date(2026, 10, 2))])
+    store.add([entry("e1", kcal=250)])
+    assert [(e.entry_id, e.kcal) for e in store.entries("u", DAY)] == [("e1", 250)]
+    store.remove(["e1"])
+    assert [e.entry_id for e in store.user_entries("u")] == ["e2"]
+
+
+def test_weigh_ins_upsert_on_user_and_day(db):
+    store = LocalWeightStore(db)
+    store.add([WeighIn("u", DAY, 61.0)])
+    store.add([WeighIn("u", DAY, 60.4), WeighIn("v", DAY, 70.0)])
+    # 同一天再量一次會覆蓋，不會多出一筆
+    assert store.user_weigh_ins("u") == [WeighIn("u", DAY, 60.4)]
+    assert store.user_weigh_ins("v") == [WeighIn("v", DAY, 70.0)]
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+
+import pytest
+
+from diary.goals import Goals
+from diary.models import Entry
+from diary.streaks import PROTEIN, UNDER_TARGET, Runs, StreakTracker, trailing_streak, week_start
+from diary.summary import SummaryEngine
+
+# 2026-10-05 是星期一
+MONDAY = date(2026, 10, 5)
+GOALS = Goals(target_kcal=2000, protein_goal=100)
+
+
+def runs(*days: int) -> Runs:
+    out = Runs()
+    for day in days:
+        out.add(day)
+    return out
+
+
+def spans(r: Runs) -> list[tuple[int, int]]:
+    return list(zip(r.starts, r.ends))
+
+
+def test_add_merges_neighbouring_runs():
+    r = runs(1, 2, 5, 6)
+    assert spans(r) == [(1, 2), (5, 6)]
+    r.add(4)
+    assert spans(r) == [(1, 2), (4, 6)]
+    # 補上中間的一天，左右兩段接成一段
+    r.add(3)
+    assert spans(r) == [(1, 6)]
+    r.add(3)
+    assert spans(r) == [(1, 6)]
+
+
+def test_discard_splits_a_run():
+    r = runs(*range(1, 8))
+    r.discard(4)
+    assert spans(r) == [(1, 3), (5, 7)]
+    r.discard(1)
+    r.discard(7)
+    assert spans(r) == [(2, 3), (5, 6)]
+    r.discard(9)
+    assert spans(r) == [(2, 3), (5, 6)]
+
+
+def test_truncate_cuts_a_run_in_the_middle():
+    r = runs(1, 2, 3, 4, 8, 9)
+    r.truncate(3)
+    assert spans(r) == [(1, 2)]
+
+
+def test_count_and_run_ending():
+    r = runs(1, 2, 3, 6, 7)
+    assert r.count(2, 6) == 3
+    assert r.count(4, 5) == 0
+    assert r.run_ending(3) == 3
+    assert r.run_ending(4) == 0
+    assert r.longest() == 3
+
+
+def test_trailing_streak():
+    days = [MONDAY + timedelta(days=i) for i in (0, 1, 2, 4, 5, 6)]
+    assert trailing_streak(days, MONDAY + timedelta(days=6)) == 3
+    assert trailing_streak(days, MONDAY + timedelta(days=3)) == 0
+    assert week_start(MONDAY + timedelta(days=6)) == MONDAY
+
+
+class Diary:
+    def __init__(self):
+        self.engine = SummaryEngine()
+        self.tracker = StreakTracker(self.engine, "u", GOALS)
+        self.engine.subscribe(self.tracker.apply, init=self.tracker.rebuild)
+
+    def log(self, offset: int, kcal: float = 1500, protein: float = 120, entry_id: str | None = None) -> str:
+        entry_id = entry_id or f"e{offset}"
+        self.engine.add(Entry(entry_id, "u", MONDAY + timedelta(days=offset), "lunch", "飯", kcal, protein))
+        return entry_id
+
+
+def day(offset: int) -> date:
+    return MONDAY + timedelta(days=offset)
+
+
+def test_gap_breaks_the_streak_and_backdated_entry_joins_it():
+    diary = Diary()
+    for offset in (0, 1, 2, 4, 5):
+        diary.log(offset)
+    assert diary.tracker.streak(UNDER_TARGET, day(5)) == 2
+    assert diary.tracker.longest(UNDER_TARGET) == 3
+    # 補記中間漏掉的一天
+    diary.log(3)
+    assert diary.tracker.streak(UNDER_TARGET, day(5)) == 6
+    assert diary.tracker.longest(UNDER_TARGET) == 6
+
+
+def test_today_without_a_log_does_not_break_the_streak():
+    diary = Diary()
+    for offset in range(3):
+        diary.log(offset)
+    assert diary.tracker.streak(UNDER_TARGET, day(3)) == 3
+    assert diary.tracker.streak(UNDER_TARGET, day(4)) == 0
+
+
+def test_delete_and_over_target_edit_split_the_run():
+    diary = Diary()
+    ids = [diary.log(offset) for offset in range(7)]
+    diary.engine.remove(ids[2])
+    assert diary.tracker.streak(UNDER_TARGET, day(6)) == 4
+    assert diary.tracker.longest(UNDER_TARGET) == 4
+    # 改成超過目標：有記錄但不算達標
+    diary.log(5, kcal=2500, entry_id=ids[5])
+    assert diary.tracker.streak(UNDER_TARGET, day(6)) == 1
+    assert diary.tracker.streak(PROTEIN, day(6)) == 4
+    assert diary.tracker.adherence(UNDER_TARGET, day(0), day(6)) == (5, 6)
+
+
+def test_adherence_respects_week_boundaries():
+    diary = Diary()
+    # 上週日與本週一、二；蛋白質只有週一不足
+    for offset in (-1, 0, 1):
+        diary.log(offset, protein=50 if offset == 0 else 120)
+    assert diary.tracker.adherence(UNDER_TARGET, day(0), day(6)) == (2, 2)
+    assert diary.tracker.adherence(PROTEIN, day(0), day(6)) == (1, 2)
+    assert diary.tracker.adherence(UNDER_TARGET, day(-7), day(-1)) == (1, 1)
+    assert diary.tracker.streak(UNDER_TARGET, day(1)) == 3
+    assert diary.tracker.streak(PROTEIN, day(1)) == 1
+
+
+@pytest.mark.parametrize("target", [1400, 1600])
+def test_new_goals_recompute_past_days(target):
+    diary = Diary()
+    for offset in range(5):
+        diary.log(offset)
+    diary.tracker.set_goals(Goals(target_kcal=target, protein_goal=100))
+    assert diary.tracker.streak(UNDER_TARGET, day(4)) == (0 if target < 1500 else 5)
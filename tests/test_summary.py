@@ -0,0 +1,97 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from diary.models import EXERCISE, MEALS, Entry
+from diary.summary import RING_CIRCUMFERENCE, DailySummary, SummaryEngine
+
+START = date(2026, 1, 1)
+
+
+def recompute(entries: list[Entry], user_id: str, day: date) -> tuple[float, float, float, dict[str, float], int]:
+    rows = [e for e in entries if e.user_id == user_id and e.day == day]
+    food = [e for e in rows if e.meal != EXERCISE]
+    meals: dict[str, float] = {}
+    for e in food:
+        meals[e.meal] = meals.get(e.meal, 0.0) + e.kcal
+    return (
+        sum(e.kcal for e in food),
+        sum(e.kcal for e in rows if e.meal == EXERCISE),
+        sum(e.protein for e in food),
+        meals,
+        len(rows),
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_totals_match_a_recompute(seed):
+    rng = random.Random(seed)
+    engine = SummaryEngine()
+    live: dict[str, Entry] = {}
+    meals = [*MEALS, EXERCISE]
+    for n in range(500):
+        op = rng.random()
+        if live and op < 0.3:
+            entry_id = rng.choice(list(live))
+            assert engine.remove(entry_id) == live.pop(entry_id)
+        else:
+            # 同一個 entry_id 再加一次是修改 (換日期、使用者、餐別、熱量)
+            entry_id = rng.choice(list(live)) if live and op < 0.45 else f"e{n}"
+            entry = Entry(
+                entry_id, rng.choice(["u1", "u2"]), START + timedelta(days=rng.randrange(10)), rng.choice(meals), "x",
+                rng.randrange(50, 900), rng.randrange(0, 40),
+            )
+            engine.add(entry)
+            live[entry_id] = entry
+    entries = list(live.values())
+    assert sorted(e.entry_id for e in engine.all_entries()) == sorted(live)
+    for user_id in ("u1", "u2"):
+        assert engine.days(user_id) == sorted({e.day for e in entries if e.user_id == user_id})
+        for offset in range(10):
+            day = START + timedelta(days=offset)
+            totals = engine.totals(user_id, day)
+            intake, burned, protein, by_meal, count = recompute(entries, user_id, day)
+            assert totals.intake == pytest.approx(intake)
+            assert totals.burned == pytest.approx(burned)
+            assert totals.protein == pytest.approx(protein)
+            assert {m: v for m, v in totals.meals.items() if v} == pytest.approx(by_meal)
+            assert totals.count == count
+            assert sorted(e.entry_id for e in engine.entries_for(user_id, day)) == sorted(
+                e.entry_id for e in entries if e.user_id == user_id and e.day == day
+            )
+
+
+def test_emptied_day_resets_to_zero():
+    engine = SummaryEngine([Entry("a", "u", START, "lunch", "x", 0.1), Entry("b", "u", START, "lunch", "x", 0.2)])
+    engine.remove("a")
+    engine.remove("b")
+    totals = engine.totals("u", START)
+    assert (totals.intake, totals.count, totals.meals) == (0.0, 0, {})
+    assert engine.days("u") == []
+
+
+@pytest.mark.parametrize(
+    ("intake", "offset"),
+    [(0, 0), (1057, RING_CIRCUMFERENCE // 2), (2114, RING_CIRCUMFERENCE), (3000, RING_CIRCUMFERENCE)],
+)
+def test_ring_offset(intake, offset):
+    summary = DailySummary(target=2114, intake=intake, burned=0, protein=0, protein_goal=138)
+    assert summary.ring_offset == offset
+    assert summary.remaining == 2114 - intake
+
+
+def test_summary_uses_the_days_totals():
+    engine = SummaryEngine(
+        [
+            Entry("a", "u", START, "breakfast", "豆漿", 135, 11),
+            Entry("b", "u", START, EXERCISE, "快走", 350),
+            Entry("c", "u", START + timedelta(days=1), "lunch", "便當", 700, 25),
+            Entry("d", "v", START, "lunch", "便當", 700, 25),
+        ]
+    )
+    summary = engine.summary("u", START, target=2000, protein_goal=100)
+    assert (summary.intake, summary.burned, summary.protein) == (135, 350, 11)
+    assert (summary.remaining, summary.protein_pct, summary.protein_left) == (1865, 11, 89)
+    assert DailySummary(2000, 0, 0, 120, 0).protein_pct == 100
+    assert DailySummary(0, 500, 0, 0, 100).ring_offset == RING_CIRCUMFERENCE
@@ -0,0 +1,93 @@
+from datetime import date
+
+import pytest
+
+from diary.local import ENTRIES, LocalDatabase, LocalDiaryStore, LocalTable, SheetSync
+from diary.models import Entry
+from diary.storage import ENTRIES_WORKSHEET, InMemoryBackend
+
+
+def entry(entry_id: str) -> Entry:
+    return Entry(entry_id, "u", date(2026, 10, 1), "lunch", entry_id, 100)
+
+
+class Process:
+    """一個 App 程序：自己的 SQLite，共用同一張工作表。"""
+
+    def __init__(self, path, backend):
+        self.db = LocalDatabase(path)
+        self.store = LocalDiaryStore(self.db)
+        self.sync = SheetSync(self.db, backend, tables=[LocalTable(self.db, ENTRIES)])
+
+    def ids(self) -> list[str]:
+        return sorted(e.entry_id for e in self.store.user_entries("u"))
+
+
+class InterleavedBackend:
+    """第一次讀取工作表後，先讓 ``hook`` 執行 (另一個程序在這段時間寫入)。"""
+
+    def __init__(self, backend: InMemoryBackend):
+        self.backend = backend
+        self.hook = None
+
+    def read(self, worksheet):
+        frame = self.backend.read(worksheet)
+        hook, self.hook = self.hook, None
+        if hook is not None:
+            hook()
+        return frame
+
+    def write(self, worksheet, frame):
+        self.backend.write(worksheet, frame)
+
+
+@pytest.fixture
+def shared():
+    return InMemoryBackend()
+
+
+def sheet_ids(backend: InMemoryBackend) -> list[str]:
+    sheet = backend.sheets[ENTRIES_WORKSHEET]
+    return sorted(sheet.loc[sheet["deleted"].isna(), "entry_id"])
+
+
+def test_concurrent_writers_keep_both_rows(tmp_path, shared):
+    racy = InterleavedBackend(shared)
+    a = Process(tmp_path / "a.sqlite3", shared)
+    b = Process(tmp_path / "b.sqlite3", racy)
+    a.store.add([entry("a1")])
+    b.store.add([entry("b1")])
+    # B 讀完工作表後、寫入前，A 推送了自己的紀錄
+    racy.hook = a.sync.sync
+    b.sync.sync()
+    a.sync.sync()
+    assert sheet_ids(shared) == ["a1", "b1"]
+    assert a.ids() == b.ids() == ["a1", "b1"]
+
+
+def test_missing_row_is_restored_not_deleted(tmp_path, shared):
+    a = Process(tmp_path / "a.sqlite3", shared)
+    a.store.add([entry("a1")])
+    a.sync.sync()
+    # 另一個程序整張覆寫時蓋掉了 a1 (沒有刪除標記)
+    shared.sheets[ENTRIES_WORKSHEET] = shared.sheets[ENTRIES_WORKSHEET].iloc[0:0]
+    result = a.sync.sync()
+    assert (result.removed, result.restored) == (0, 1)
+    assert a.ids() == ["a1"]
+    assert sheet_ids(shared) == ["a1"]
+    assert a.db.query("SELECT COUNT(*) FROM conflicts")[0][0] == 1
+
+
+def test_delete_propagates_through_tombstone(tmp_path, shared):
+    a = Process(tmp_path / "a.sqlite3", shared)
+    b = Process(tmp_path / "b.sqlite3", shared)
+    a.store.add([entry("a1"), entry("a2")])
+    a.sync.sync()
+    b.sync.sync()
+    assert b.ids() == ["a1", "a2"]
+    b.store.remove(["a1"])
+    b.sync.sync()
+    result = a.sync.sync()
+    assert result.removed == 1
+    assert a.ids() == b.ids() == ["a2"]
+    assert sheet_ids(shared) == ["a2"]
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+from diary.local import ENTRIES, LocalDatabase, LocalTable
+from diary.transfer import detect_format, import_entries
+
+# 同一天同一餐吃了四次一樣的東西
+CSV = "date,meal,food,calories\n" + "2026-10-01,lunch,飯,300\n" * 4
+
+
+@pytest.mark.parametrize("chunksize", [10, 2, 1])
+def test_identical_rows_survive_any_chunk_size(tmp_path, chunksize):
+    table = LocalTable(LocalDatabase(tmp_path / "diary.sqlite3"), ENTRIES)
+    result = import_entries(table, io.StringIO(CSV), "u", "csv", chunksize=chunksize)
+    assert result.rows == 4
+    assert len(table.user_frame("u")) == 4
+    # 以不同的分塊大小重新匯入同一份檔案，全部視為重複
+    again = import_entries(table, io.StringIO(CSV), "u", "csv", chunksize=3)
+    assert (again.rows, again.duplicates) == (0, 4)
+
+
+def test_import_only_reads_the_users_rows(tmp_path):
+    table = LocalTable(LocalDatabase(tmp_path / "diary.sqlite3"), ENTRIES)
+    import_entries(table, io.StringIO(CSV), "other", "csv")
+    result = import_entries(table, io.StringIO(CSV), "u", "csv")
+    # 內容相同、使用者不同的紀錄不算重複，也不會覆蓋對方的紀錄
+    assert result.rows == 4
+    assert len(table.user_frame("other")) == len(table.user_frame("u")) == 4
+
+
+def test_supplied_ids_never_take_over_another_users_entries(tmp_path):
+    table = LocalTable(LocalDatabase(tmp_path / "diary.sqlite3"), ENTRIES)
+    csv = "entry_id,date,meal,food,calories\n1,2026-10-01,lunch,飯,300\n"
+    import_entries(table, io.StringIO(csv), "alice", "csv")
+    result = import_entries(table, io.StringIO(csv.replace("飯", "麵")), "bob", "csv")
+    assert result.rows == 1
+    assert table.user_frame("alice")[["entry_id", "name"]].values.tolist() == [["1", "飯"]]
+    bob = table.user_frame("bob")
+    assert bob["name"].tolist() == ["麵"] and bob["entry_id"].tolist() != ["1"]
+    # 換過的 id 固定不變，重新匯入同一份檔案仍是重複
+    again = import_entries(table, io.StringIO(csv.replace("飯", "麵")), "bob", "csv")
+    assert (again.rows, again.duplicates) == (0, 1)
+
+
+def test_rekeyed_id_owned_by_someone_else_is_dropped(tmp_path):
+    csv = "entry_id,date,meal,food,calories\n{},2026-10-01,lunch,飯,300\n"
+    probe = LocalTable(LocalDatabase(tmp_path / "probe.sqlite3"), ENTRIES)
+    import_entries(probe, io.StringIO(csv.format("1")), "alice", "csv")
+    import_entries(probe, io.StringIO(csv.format("1")), "bob", "csv")
+    bobs_id = probe.user_frame("bob")["entry_id"].iloc[0]
+    # carol 先占用 bob 換過的 id：bob 匯入的列丟棄，不搶走 carol 的紀錄
+    table = LocalTable(LocalDatabase(tmp_path / "diary.sqlite3"), ENTRIES)
+    import_entries(table, io.StringIO(csv.format(bobs_id)), "carol", "csv")
+    import_entries(table, io.StringIO(csv.format("1")), "alice", "csv")
+    result = import_entries(table, io.StringIO(csv.format("1")), "bob", "csv")
+    assert (result.rows, result.skipped) == (0, 1)
+    assert table.user_frame("carol")["entry_id"].tolist() == [bobs_id]
+    assert table.user_frame("bob").empty
+
+
+def test_json_array_is_imported(tmp_path):
+    table = LocalTable(LocalDatabase(tmp_path / "diary.sqlite3"), ENTRIES)
+    data = '[{"date": "2026-10-01", "meal": "午餐", "food": "飯", "calories": 300}, {"date": "2026-10-02", "meal": "dinner", "food": "麵", "calories": 450}]'
+    assert detect_format("history.json") == "json"
+    result = import_entries(table, io.StringIO(data), "u", "json", chunksize=1)
+    assert (result.rows, result.chunks) == (2, 2)
+    assert table.user_frame("u")["name"].tolist() == ["飯", "麵"]
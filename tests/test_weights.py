@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from diary.weights import TREND_WINDOW, WeighIn, WeightSeries
+
+START = date(2026, 1, 1)
+
+
+def _series(n):
+    return WeightSeries([WeighIn("u1", START + timedelta(days=i), 70 - i * 0.02 + (i % 3) * 0.4) for i in range(n)])
+
+
+def test_chart_trend_follows_moving_average():
+    series = _series(400)
+    average = series.moving_average(TREND_WINDOW)
+    for period in ("week", "month", "year"):
+        chart = series.chart(period)
+        assert len(chart["trend"]) == len(chart["data"])
+        # 最後一點一定保留，且區間開頭的平均包含區間之前的紀錄
+        assert chart["trend"][-1] == round(average[-1], 1)
+        assert chart["min"] <= min(chart["trend"]) and max(chart["trend"]) <= chart["max"]
+
+
+def test_chart_trend_matches_every_point_when_not_downsampled():
+    series = _series(20)
+    chart = series.chart("month")
+    assert chart["trend"] == [round(v, 1) for v in series.moving_average(TREND_WINDOW)]
@@ -0,0 +1,150 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from diary.local import LocalDatabase, LocalDiaryStore
+from diary.models import Entry
+from diary.recognition import FoodItem
+from diary.summary import SummaryEngine
+from diary.writer import BackgroundWrites, EntryStatus, InMemorySink, MealLogger, WriteBehindQueue
+
+DAY = date(2026, 10, 1)
+ENTRY = Entry("e1", "u", DAY, "lunch", "飯", 300)
+
+
+def test_retries_until_saved():
+    sink = InMemorySink(failures=2)
+    queue = WriteBehindQueue(sink, retries=3, backoff=0.001)
+    queue.submit(ENTRY)
+    assert queue.join(5)
+    assert queue.status("e1") is EntryStatus.SAVED
+    assert sink.entries == [ENTRY]
+
+
+def test_marks_failed_after_retries():
+    sink = InMemorySink(failures=10)
+    queue = WriteBehindQueue(sink, retries=2, backoff=0.001)
+    queue.submit(ENTRY)
+    assert queue.join(5)
+    assert queue.status("e1") is EntryStatus.FAILED
+    assert "sink unavailable" in queue.error("e1")
+    assert sink.entries == []
+
+
+class LostReplyStore(LocalDiaryStore):
+    """第一次寫入成功，但呼叫端收到錯誤 (像是回應在網路上遺失)。"""
+
+    def __init__(self, db: LocalDatabase):
+        super().__init__(db)
+        self.failures = 1
+
+    def add(self, entries):
+        super().add(entries)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("reply lost")
+
+
+def test_failed_write_does_not_duplicate_rows(tmp_path):
+    store = LostReplyStore(LocalDatabase(tmp_path / "diary.sqlite3"))
+    queue = WriteBehindQueue(store, retries=3, backoff=0.001)
+    queue.submit(ENTRY)
+    assert queue.join(5)
+    assert queue.status("e1") is EntryStatus.SAVED
+    assert store.user_entries("u") == [ENTRY]
+
+
+class FlakyFlushSink(InMemorySink):
+    def __init__(self):
+        super().__init__()
+        self.flush_failures = 1
+
+    def flush(self):
+        if self.flush_failures:
+            self.flush_failures -= 1
+            raise ConnectionError("flush failed")
+
+
+def test_retry_only_flushes_after_a_successful_add():
+    sink = FlakyFlushSink()
+    queue = WriteBehindQueue(sink, retries=3, backoff=0.001)
+    queue.submit(ENTRY)
+    assert queue.join(5)
+    assert queue.status("e1") is EntryStatus.SAVED
+    assert sink.entries == [ENTRY]
+
+
+class FailingWrite:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sheets unavailable")
+
+
+def wait(writes: BackgroundWrites, key, timeout: float = 5) -> EntryStatus:
+    deadline = time.monotonic() + timeout
+    while writes.status(key) is EntryStatus.PENDING and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return writes.status(key)
+
+
+def test_background_write_failure_is_visible_and_retryable():
+    writes = BackgroundWrites(ThreadPoolExecutor(1), retries=1, backoff=0.001)
+    write = FailingWrite(failures=2)
+    writes.submit(("u", DAY), write)
+    assert wait(writes, ("u", DAY)) is EntryStatus.FAILED
+    assert "sheets unavailable" in writes.error(("u", DAY))
+    writes.retry(("u", DAY))
+    assert wait(writes, ("u", DAY)) is EntryStatus.SAVED
+    assert write.calls == 3
+
+
+def test_newer_background_write_wins():
+    writes = BackgroundWrites(ThreadPoolExecutor(1), retries=0)
+    gate = threading.Event()
+
+    def old():
+        gate.wait(5)
+        raise ConnectionError("old")
+
+    writes.submit("k", old)
+    # 同一天又紀錄一次：舊的那次失敗不覆蓋新的狀態
+    writes.submit("k", lambda: None)
+    gate.set()
+    writes.executor.shutdown(wait=True)
+    assert writes.status("k") is EntryStatus.SAVED
+
+
+class GatedRecognizer:
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def recognize(self, text=None, image=None):
+        self.gate.wait(5)
+        return [FoodItem("飯", 300, 5)]
+
+
+def test_recognition_after_a_session_reload_is_not_lost():
+    sink = InMemorySink()
+    origins = []
+    queue = WriteBehindQueue(sink, on_write=lambda entry, origin: origins.append(origin))
+    recognizer = GatedRecognizer()
+    session = {"engine": SummaryEngine()}
+    logger = MealLogger(
+        session["engine"], queue, recognizer, ThreadPoolExecutor(1), origin="s1", current_engine=lambda: session.get("engine")
+    )
+    entry = logger.log("u", DAY, "lunch", "飯")
+    # 辨識期間其他 session 寫入，這個 session 重新載入 (換了新的 SummaryEngine)
+    session["engine"] = SummaryEngine()
+    recognizer.gate.set()
+    logger.executor.shutdown(wait=True)
+    assert queue.join(5)
+    assert [e.entry_id for e in sink.entries] == [entry.entry_id]
+    # 不標來源：寫入完成後這個 session 也會重新載入
+    assert origins == [""]